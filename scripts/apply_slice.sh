@@ -340,11 +340,36 @@ apply_thingsboard_config() {
 
 log "Starting topology in screen (PROFILE=$PROFILE)..."
 
-# apply_topo_profile: apply tc/netem to mn.* containers per profile
-apply_topo_profile() {
-  local prof="$1"
-  log "Applying topo profile: $prof"
-  case "$prof" in
+# apply_tc_exec: apply tc/netem on eth0 of one container via docker exec (or nsenter + host tc)
+apply_tc_exec() {
+  local cname="$1"
+  # check if container has eth0
+  if docker exec "$cname" bash -lc "ip link show eth0 >/dev/null 2>&1"; then
+    log "Applying tc on $cname: bw=${BW}mbit delay=${DELAY} loss=${LOSS}%"
+    # prefer to run tc inside the container if available
+    if docker exec "$cname" bash -lc "command -v tc >/dev/null 2>&1"; then
+      # delete existing qdisc quietly, then add shaping
+      docker exec "$cname" bash -lc "tc qdisc del dev eth0 root 2>/dev/null || true; tc qdisc add dev eth0 root handle 1:0 tbf rate ${BW}mbit burst 32kbit latency 400ms || true; tc qdisc add dev eth0 parent 1:0 handle 10: netem delay ${DELAY} loss ${LOSS}% || true" > /dev/null 2>&1 || log "tc apply failed on $cname"
+    else
+      # fallback: try to run tc in the container network namespace from the host using nsenter
+      PID=$(docker inspect -f '{{.State.Pid}}' "$cname" 2>/dev/null || true)
+      if [ -n "$PID" ] && command -v nsenter >/dev/null 2>&1; then
+        log "tc not found in $cname; using nsenter into PID $PID to apply tc"
+        nsenter -t "$PID" -n -- tc qdisc del dev eth0 root 2>/dev/null || true
+        nsenter -t "$PID" -n -- tc qdisc add dev eth0 root handle 1:0 tbf rate ${BW}mbit burst 32kbit latency 400ms || log "nsenter tc tbf failed on $cname"
+        nsenter -t "$PID" -n -- tc qdisc add dev eth0 parent 1:0 handle 10: netem delay ${DELAY} loss ${LOSS}% || log "nsenter tc netem failed on $cname"
+      else
+        log "tc not available inside $cname and nsenter not present on host; skipping tc for $cname"
+      fi
+    fi
+  else
+    log "Skipping $cname: no eth0"
+  fi
+}
+
+# profile_link_params: BW/DELAY/LOSS of a profile (the values apply_topo_profile shapes with)
+profile_link_params() {
+  case "$1" in
     urllc)
       BW=1000; DELAY="0.2ms"; LOSS=0
       ;;
@@ -355,39 +380,66 @@ apply_topo_profile() {
       BW=200; DELAY="50ms"; LOSS=0.5
       ;;
   esac
-  # iterate mn.* containers and apply tc on eth0 where present
-  docker ps --format '{{.Names}}' | grep '^mn\.' | while read -r cname; do
+}
+
+# shaped_containers [--log]: running mn.* containers apply_topo_profile shapes, one per
+# line; --log reports the skipped ones on stderr
+shaped_containers() {
+  local cname
+  while read -r cname; do
     [ -z "$cname" ] && continue
     # skip core services: do not shape influx/thingsboard/middts/neo4j/database containers
     case "$cname" in
       *influx*|*tb*|*thingsboard*|*middts*|*middleware*|*neo4j*|*parser*|*db*|*postgres*)
-        log "Skipping shaping for core container $cname to keep core links at max"
+        [ "${1:-}" = "--log" ] && log "Skipping shaping for core container $cname to keep core links at max" >&2
         continue
         ;;
     esac
-    # check if container has eth0
-    if docker exec "$cname" bash -lc "ip link show eth0 >/dev/null 2>&1"; then
-      log "Applying tc on $cname: bw=${BW}mbit delay=${DELAY} loss=${LOSS}%"
-      # prefer to run tc inside the container if available
-      if docker exec "$cname" bash -lc "command -v tc >/dev/null 2>&1"; then
-        # delete existing qdisc quietly, then add shaping
-        docker exec "$cname" bash -lc "tc qdisc del dev eth0 root 2>/dev/null || true; tc qdisc add dev eth0 root handle 1:0 tbf rate ${BW}mbit burst 32kbit latency 400ms || true; tc qdisc add dev eth0 parent 1:0 handle 10: netem delay ${DELAY} loss ${LOSS}% || true" > /dev/null 2>&1 || log "tc apply failed on $cname"
-      else
-        # fallback: try to run tc in the container network namespace from the host using nsenter
-        PID=$(docker inspect -f '{{.State.Pid}}' "$cname" 2>/dev/null || true)
-        if [ -n "$PID" ] && command -v nsenter >/dev/null 2>&1; then
-          log "tc not found in $cname; using nsenter into PID $PID to apply tc"
-          nsenter -t "$PID" -n -- tc qdisc del dev eth0 root 2>/dev/null || true
-          nsenter -t "$PID" -n -- tc qdisc add dev eth0 root handle 1:0 tbf rate ${BW}mbit burst 32kbit latency 400ms || log "nsenter tc tbf failed on $cname"
-          nsenter -t "$PID" -n -- tc qdisc add dev eth0 parent 1:0 handle 10: netem delay ${DELAY} loss ${LOSS}% || log "nsenter tc netem failed on $cname"
-        else
-          log "tc not available inside $cname and nsenter not present on host; skipping tc for $cname"
-        fi
-      fi
-    else
-      log "Skipping $cname: no eth0"
-    fi
+    echo "$cname"
+  done < <(docker ps --format '{{.Names}}' | grep '^mn\.')
+}
+
+# apply_topo_profile: apply tc/netem to mn.* containers per profile
+apply_topo_profile() {
+  local prof="$1"
+  log "Applying topo profile: $prof"
+  profile_link_params "$prof"
+  # collect the mn.* containers to shape (eth0 where present)
+  local targets=()
+  mapfile -t targets < <(shaped_containers --log)
+  [ "${#targets[@]}" -eq 0 ] && log "No containers to shape"
+
+  # fast path: PIDs from one docker inspect, one tc batch per container netns (verified via
+  # qdisc show), namespaces shaped concurrently; containers it does not report as done fall
+  # back to the docker exec / nsenter path
+  local fallback=("${targets[@]}")
+  local helper="${PWD}/services/topology/netns_config.py"
+  if [ "${#targets[@]}" -gt 0 ] && command -v nsenter >/dev/null 2>&1 && [ -f "$helper" ] \
+     && command -v "${PYTHON:-python3}" >/dev/null 2>&1; then
+    log "Applying tc via netns batch on ${#targets[@]} containers: bw=${BW}mbit delay=${DELAY} loss=${LOSS}%"
+    local -A done_tc=()
+    while read -r cname status detail; do
+      case "$cname" in
+        total) log "tc apply finished: ${status} ${detail}"; continue ;;
+      esac
+      case "$status" in
+        ok) done_tc[$cname]=1; log "tc on $cname: ${detail}" ;;
+        missing) done_tc[$cname]=1; log "Skipping $cname: no eth0" ;;
+        *) log "tc on $cname: ${status} ${detail}" ;;
+      esac
+    done < <("${PYTHON:-python3}" "$helper" shape --dev eth0 --rate-mbit "$BW" --delay "$DELAY" --loss "$LOSS" \
+               --jobs "${TC_APPLY_JOBS:-16}" "${targets[@]}" 2>/dev/null || true)
+    fallback=()
+    for cname in "${targets[@]}"; do
+      [ -n "${done_tc[$cname]:-}" ] || fallback+=("$cname")
+    done
+  fi
+  local pids=()
+  for cname in "${fallback[@]}"; do
+    apply_tc_exec "$cname" &
+    pids+=("$!")
   done
+  [ "${#pids[@]}" -gt 0 ] && wait "${pids[@]}"
   # write profile marker so subsequent invocations can skip redundant apply
   if [ -w . ] || [ -w "$(dirname "$PROFILE_MARKER")" ] 2>/dev/null; then
     echo "${prof}" > "$PROFILE_MARKER" 2>/dev/null || true
@@ -550,6 +602,25 @@ start_scheduler() {
     start_builtin_scheduler "$DURATION"
     return 0
   fi
+  # Preferred: Python scheduler (pre-resolved netns, monotonic clock, planned vs actual
+  # fire times in link_events.jsonl); the bash loop below remains as fallback
+  local helper="${PWD}/services/topology/link_scheduler.py"
+  if [ -f "$helper" ] && command -v "${PYTHON:-python3}" >/dev/null 2>&1; then
+    log "Starting link scheduler daemon from $schedule"
+    # restore after a degrade: profile shaping on the containers apply_topo_profile shapes,
+    # no qdisc on the others (core services are never shaped)
+    [ -n "${BW:-}" ] || profile_link_params "$PROFILE"
+    local shaped
+    shaped=$(shaped_containers | paste -sd, -)
+    local restore_args=(--restore-rate-mbit "$BW" --restore-delay "$DELAY" --restore-loss "$LOSS"
+                        --shaped-containers "$shaped")
+    "${PYTHON:-python3}" "$helper" --schedule "$schedule" --start-epoch "$START_EPOCH" \
+      --events-log "${TEST_DIR:-$RESULTS_DIR}/link_events.jsonl" "${restore_args[@]}" &
+    SCHED_PID=$!
+    echo "$SCHED_PID" > "${SCHED_PID_FILE}" 2>/dev/null || true
+    log "Scheduler started (PID $SCHED_PID)"
+    return 0
+  fi
   log "Starting link scheduler from $schedule"
   (
     while IFS=, read -r start_offset duration target mode params; do
@@ -684,6 +755,12 @@ start_middts_update() {
   local m2s_perf_env="0"
   local m2s_perf_timestamps_only="0"
   local m2s_perf_full="0"
+  # NETWORK_PROFILE (adaptive RPC timeouts) is only set in the middts environment when
+  # topo_qos.py creates the container; export it on every launch, with the same value,
+  # so the commands follow the profile after a warm switch (warm_reset.py) too
+  local network_profile
+  network_profile=$("${PYTHON:-python3}" -c 'import sys; sys.path.insert(0, "services/topology"); from link_profiles import resolve_profile; print(resolve_profile(sys.argv[1]) or sys.argv[1].lower())' "$PROFILE" 2>/dev/null) \
+    || network_profile="${PROFILE,,}"
   if [ "$USE_M2S_PERF" = true ]; then
     m2s_perf_env="1"
     m2s_perf_timestamps_only="1"
@@ -774,11 +851,11 @@ start_middts_update() {
     
     # Start listen_gateway FIRST to capture S2M telemetry from all sensors
     log "🎧 Starting listen_gateway for S2M telemetry capture"
-    docker exec -d "$MID_CNT" bash -lc "if [ -f /middleware-dt/.env ]; then set -a; . /middleware-dt/.env; set +a; fi; export M2S_PERF_MODE=${m2s_perf_env}; export M2S_PERF_TIMESTAMPS_ONLY=${m2s_perf_timestamps_only}; export M2S_PERF_FULL=${m2s_perf_full}; export M2S_DISABLE_RPC_INFLUX_HOTPATH=${m2s_perf_full}; cd /var/condominio-scenario/services/middleware-dt || true; nohup python3 manage.py listen_gateway --use-influxdb --interval ${POLLING_INTERVAL} > /middleware-dt/listen_gateway.out 2>&1 & echo \$! >/tmp/listen_gateway.pid" || log "Failed to exec listen_gateway (non-fatal)"
+    docker exec -d "$MID_CNT" bash -lc "if [ -f /middleware-dt/.env ]; then set -a; . /middleware-dt/.env; set +a; fi; export NETWORK_PROFILE=${network_profile}; export M2S_PERF_MODE=${m2s_perf_env}; export M2S_PERF_TIMESTAMPS_ONLY=${m2s_perf_timestamps_only}; export M2S_PERF_FULL=${m2s_perf_full}; export M2S_DISABLE_RPC_INFLUX_HOTPATH=${m2s_perf_full}; cd /var/condominio-scenario/services/middleware-dt || true; nohup python3 manage.py listen_gateway --use-influxdb --interval ${POLLING_INTERVAL} > /middleware-dt/listen_gateway.out 2>&1 & echo \$! >/tmp/listen_gateway.pid" || log "Failed to exec listen_gateway (non-fatal)"
     sleep 2
     
     # Then start update_causal_property for M2S commands
-    docker exec -d "$MID_CNT" bash -lc "if [ -f /middleware-dt/.env ]; then set -a; . /middleware-dt/.env; set +a; fi; export M2S_PERF_MODE=${m2s_perf_env}; export M2S_PERF_TIMESTAMPS_ONLY=${m2s_perf_timestamps_only}; export M2S_PERF_FULL=${m2s_perf_full}; export M2S_DISABLE_RPC_INFLUX_HOTPATH=${m2s_perf_full}; cd /var/condominio-scenario/services/middleware-dt || true; nohup python3 manage.py update_causal_property --interval ${POLLING_INTERVAL} > /middleware-dt/update_causal_property.out 2>&1 & echo \$! >/tmp/update_causal_property.pid" || log "Failed to exec update_causal_property (non-fatal)"
+    docker exec -d "$MID_CNT" bash -lc "if [ -f /middleware-dt/.env ]; then set -a; . /middleware-dt/.env; set +a; fi; export NETWORK_PROFILE=${network_profile}; export M2S_PERF_MODE=${m2s_perf_env}; export M2S_PERF_TIMESTAMPS_ONLY=${m2s_perf_timestamps_only}; export M2S_PERF_FULL=${m2s_perf_full}; export M2S_DISABLE_RPC_INFLUX_HOTPATH=${m2s_perf_full}; cd /var/condominio-scenario/services/middleware-dt || true; nohup python3 manage.py update_causal_property --interval ${POLLING_INTERVAL} > /middleware-dt/update_causal_property.out 2>&1 & echo \$! >/tmp/update_causal_property.pid" || log "Failed to exec update_causal_property (non-fatal)"
     # brief check
     sleep 1
     
@@ -897,15 +974,7 @@ else
   unset SUPPRESS_LINK_LOG
 fi
 
-log "Running test for ${DURATION}s..."
-sleep "$DURATION"
-
-log "Test duration elapsed; capturing data BEFORE stopping processes..."
-
-# ================================================
-# CRITICAL: Export InfluxDB data BEFORE stopping update_causal_property
-# This ensures M2S command counts are captured correctly
-# ================================================
+# Influx connection (used by the live monitor and the post-run export)
 BUCKET="${BUCKET:-${INFLUXDB_BUCKET:-${IOT_INFLUX_BUCKET:-iot_data}}}"
 OUTFILE="${TEST_DIR}/${PROFILE}_${TEST_TIMESTAMP}.csv"
 INFLUX_ORG="${INFLUXDB_ORG:-${INFLUX_ORG:-minha_org}}"
@@ -928,6 +997,108 @@ fi
 # Recompute URL after selecting execution context (host vs container)
 BASE_INFLUX_URL="http://${INFLUX_HOST}:${INFLUX_PORT}"
 
+log "Running test for ${DURATION}s..."
+# LIVE_MONITOR=1: poll Influx while the workload runs (scripts/influx_live_monitor.py),
+# printing rolling P50/P95/P99, delivery and AoT to <test>_live.log / _live.json.
+# LIVE_ABORT_P95_MS / LIVE_ABORT_MIN_DELIVERY_PCT end a clearly bad run early: the
+# export window is then cut at the abort time.
+LIVE_MONITOR="${LIVE_MONITOR:-0}"
+if [ "$LIVE_MONITOR" = "1" ] && [ -n "$INFLUX_TOKEN" ] && command -v "${PYTHON:-python3}" >/dev/null 2>&1; then
+  LIVE_LOG="${TEST_DIR}/${PROFILE}_${TEST_TIMESTAMP}_live.log"
+  INFLUX_TOKEN="$INFLUX_TOKEN" "${PYTHON:-python3}" "${PWD}/scripts/influx_live_monitor.py" \
+    --url "$BASE_INFLUX_URL" --org "$INFLUX_ORG" --bucket "$BUCKET" --curl "$CURL_CMD" \
+    --start "$WORKLOAD_START_ISO" --duration "$DURATION" --interval "${LIVE_MONITOR_INTERVAL:-5}" \
+    --json-out "${TEST_DIR}/${PROFILE}_${TEST_TIMESTAMP}_live.json" \
+    --abort-p95-ms "${LIVE_ABORT_P95_MS:-0}" --abort-min-delivery-pct "${LIVE_ABORT_MIN_DELIVERY_PCT:-0}" \
+    --grace "${LIVE_ABORT_GRACE:-60}" >"$LIVE_LOG" 2>&1 &
+  LIVE_PID=$!
+  log "Live monitor started (pid ${LIVE_PID}) -> ${LIVE_LOG}"
+  LIVE_RC=""
+  while [ "$(date +%s)" -lt "$WORKLOAD_STOP_EPOCH" ]; do
+    if [ -z "$LIVE_RC" ] && ! kill -0 "$LIVE_PID" 2>/dev/null; then
+      LIVE_RC=0
+      wait "$LIVE_PID" || LIVE_RC=$?
+      [ "$LIVE_RC" -eq 3 ] && break
+      log "Live monitor exited (rc=${LIVE_RC}); continuing the run without it"
+    fi
+    sleep 1
+  done
+  if [ "$LIVE_RC" = "3" ]; then
+    log "⛔ Live monitor aborted the run: $(grep 'ABORT' "$LIVE_LOG" | tail -1)"
+    WORKLOAD_STOP_EPOCH="$(date +%s)"
+    WORKLOAD_STOP_ISO="$(date -u -d "@${WORKLOAD_STOP_EPOCH}" +'%Y-%m-%dT%H:%M:%SZ')"
+    log "Export window cut at ${WORKLOAD_STOP_ISO}"
+  elif [ -z "$LIVE_RC" ]; then
+    kill "$LIVE_PID" 2>/dev/null || true
+    wait "$LIVE_PID" 2>/dev/null || true
+  fi
+else
+  sleep "$DURATION"
+fi
+
+log "Test duration elapsed; capturing data BEFORE stopping processes..."
+
+# ================================================
+# CRITICAL: Export InfluxDB data BEFORE stopping update_causal_property
+# This ensures M2S command counts are captured correctly
+# ================================================
+# Export one measurement of the workload window to $2.
+# Uses scripts/influx_export.py: the window is split into INFLUX_EXPORT_CHUNK_SECONDS
+# sub-ranges fetched by INFLUX_EXPORT_WORKERS parallel curls (each with its own
+# INFLUX_EXPORT_TIMEOUT and INFLUX_EXPORT_RETRIES), so long/high-rate runs no longer
+# lose the export to a single 30s budget. Falls back to one curl if python3 is missing.
+INFLUX_EXPORT_CHUNK_SECONDS="${INFLUX_EXPORT_CHUNK_SECONDS:-60}"
+INFLUX_EXPORT_WORKERS="${INFLUX_EXPORT_WORKERS:-4}"
+INFLUX_EXPORT_TIMEOUT="${INFLUX_EXPORT_TIMEOUT:-30}"
+INFLUX_EXPORT_RETRIES="${INFLUX_EXPORT_RETRIES:-3}"
+# M2S export: raw (every latency_measurement point, default), pushdown (only the
+# per-command pairs computed inside Flux, --mode m2s-pairs) or both (pairs used for
+# the run metrics and cross-checked against the raw export).
+INFLUX_M2S_EXPORT="${INFLUX_M2S_EXPORT:-raw}"
+# Store exports compressed: none (default), gz or zst. gz/zst also ask Influx for a
+# gzip-encoded response; the report generators read .csv.gz/.csv.zst directly.
+INFLUX_EXPORT_COMPRESS="${INFLUX_EXPORT_COMPRESS:-none}"
+case "$INFLUX_EXPORT_COMPRESS" in
+  gz|zst) EXPORT_EXT="csv.${INFLUX_EXPORT_COMPRESS}" ;;
+  *) INFLUX_EXPORT_COMPRESS=none; EXPORT_EXT="csv" ;;
+esac
+# cat an export, decompressing .gz/.zst
+cat_export() {
+  case "$1" in
+    *.gz) gzip -dc "$1" ;;
+    *.zst) zstd -dcq "$1" ;;
+    *) cat "$1" ;;
+  esac
+}
+export_influx_measurement() {
+  local measurement="$1" out="$2" mode="${3:-raw}"
+  if command -v "${PYTHON:-python3}" >/dev/null 2>&1 && [ -f "${PWD}/scripts/influx_export.py" ]; then
+    INFLUX_TOKEN="$INFLUX_TOKEN" "${PYTHON:-python3}" "${PWD}/scripts/influx_export.py" \
+      --url "$BASE_INFLUX_URL" --org "$INFLUX_ORG" --bucket "$BUCKET" --mode "$mode" \
+      --compress "$INFLUX_EXPORT_COMPRESS" \
+      --measurement "$measurement" --start "$WORKLOAD_START_ISO" --stop "$WORKLOAD_STOP_ISO" \
+      --out "$out" --curl "$CURL_CMD" \
+      --chunk-seconds "$INFLUX_EXPORT_CHUNK_SECONDS" --workers "$INFLUX_EXPORT_WORKERS" \
+      --timeout "$INFLUX_EXPORT_TIMEOUT" --retries "$INFLUX_EXPORT_RETRIES" \
+      2>"${out}.err"
+    local rc=$?
+    [ "$rc" -eq 0 ] && [ -s "${out}.err" ] && log "$(tail -1 "${out}.err")"
+    return $rc
+  fi
+  [ "$mode" = "raw" ] || { echo "$mode export needs python3" > "${out}.err"; return 1; }
+  local compressor="cat"
+  case "$INFLUX_EXPORT_COMPRESS" in
+    gz) compressor="gzip -c" ;;
+    zst) compressor="zstd -q -c" ;;
+  esac
+  timeout "$INFLUX_EXPORT_TIMEOUT" $CURL_CMD --request POST "${BASE_INFLUX_URL}/api/v2/query?org=${INFLUX_ORG}" \
+    --header "Authorization: Token ${INFLUX_TOKEN}" \
+    --header 'Accept: text/csv' \
+    --header 'Content-type: application/vnd.flux' \
+    --data "from(bucket: \"${BUCKET}\") |> range(start: time(v: \"${WORKLOAD_START_ISO}\"), stop: time(v: \"${WORKLOAD_STOP_ISO}\")) |> filter(fn: (r) => r._measurement == \"${measurement}\")" \
+    2>"${out}.err" | $compressor > "$out"
+}
+
 if [ -z "$INFLUX_TOKEN" ]; then
   log "INFLUX_TOKEN not set. Cannot export Influx CSV. Skipping export."
 else
@@ -937,14 +1108,9 @@ else
   log "🔍 DEBUG: CURL_CMD=$CURL_CMD"
   
   # Export device_data only
-  OUTFILE_DEVICE="${TEST_DIR}/${PROFILE}_${TEST_TIMESTAMP}_device_data.csv"
+  OUTFILE_DEVICE="${TEST_DIR}/${PROFILE}_${TEST_TIMESTAMP}_device_data.${EXPORT_EXT}"
   log "🔍 Executing device_data export to: $OUTFILE_DEVICE"
-  if timeout 30 $CURL_CMD --request POST "${BASE_INFLUX_URL}/api/v2/query?org=${INFLUX_ORG}" \
-      --header "Authorization: Token ${INFLUX_TOKEN}" \
-      --header 'Accept: text/csv' \
-      --header 'Content-type: application/vnd.flux' \
-      --data "from(bucket: \"${BUCKET}\") |> range(start: time(v: \"${WORKLOAD_START_ISO}\"), stop: time(v: \"${WORKLOAD_STOP_ISO}\")) |> filter(fn: (r) => r._measurement == \"device_data\")" \
-      > "$OUTFILE_DEVICE" 2>"${OUTFILE_DEVICE}.err"; then
+  if export_influx_measurement device_data "$OUTFILE_DEVICE"; then
     log "⚡ Device data export completed -> $OUTFILE_DEVICE"
     log "✅ Device data captured successfully before process shutdown"
   else
@@ -956,26 +1122,40 @@ else
   [ -n "$OUTFILE_DEVICE" ] && [ ! -s "$OUTFILE_DEVICE" ] && { log "❌ Device data export empty"; OUTFILE_DEVICE=""; }
 
   # Export latency_measurement only (with request_id)
-  OUTFILE_LATENCY="${TEST_DIR}/${PROFILE}_${TEST_TIMESTAMP}_latency_measurement.csv"
-  log "🔍 Executing latency_measurement export to: $OUTFILE_LATENCY"
-  if timeout 30 $CURL_CMD --request POST "${BASE_INFLUX_URL}/api/v2/query?org=${INFLUX_ORG}" \
-      --header "Authorization: Token ${INFLUX_TOKEN}" \
-      --header 'Accept: text/csv' \
-      --header 'Content-type: application/vnd.flux' \
-      --data "from(bucket: \"${BUCKET}\") |> range(start: time(v: \"${WORKLOAD_START_ISO}\"), stop: time(v: \"${WORKLOAD_STOP_ISO}\")) |> filter(fn: (r) => r._measurement == \"latency_measurement\")" \
-      > "$OUTFILE_LATENCY" 2>"${OUTFILE_LATENCY}.err"; then
-    log "⚡ Latency measurement export completed -> $OUTFILE_LATENCY"
-    log "✅ Latency measurement data captured successfully before process shutdown"
-  else
-    log "❌ Latency measurement export failed"
-    [ -s "${OUTFILE_LATENCY}.err" ] && log "❌ Latency stderr: $(tail -1 "${OUTFILE_LATENCY}.err")"
-    OUTFILE_LATENCY=""
+  OUTFILE_LATENCY=""
+  if [ "$INFLUX_M2S_EXPORT" != "pushdown" ]; then
+    OUTFILE_LATENCY="${TEST_DIR}/${PROFILE}_${TEST_TIMESTAMP}_latency_measurement.${EXPORT_EXT}"
+    log "🔍 Executing latency_measurement export to: $OUTFILE_LATENCY"
+    if export_influx_measurement latency_measurement "$OUTFILE_LATENCY"; then
+      log "⚡ Latency measurement export completed -> $OUTFILE_LATENCY"
+      log "✅ Latency measurement data captured successfully before process shutdown"
+    else
+      log "❌ Latency measurement export failed"
+      [ -s "${OUTFILE_LATENCY}.err" ] && log "❌ Latency stderr: $(tail -1 "${OUTFILE_LATENCY}.err")"
+      OUTFILE_LATENCY=""
+    fi
+    [ -f "${OUTFILE_LATENCY}.err" ] && rm -f "${OUTFILE_LATENCY}.err"
+    [ -n "$OUTFILE_LATENCY" ] && [ ! -s "$OUTFILE_LATENCY" ] && { log "❌ Latency export empty"; OUTFILE_LATENCY=""; }
+  fi
+
+  # Server-side M2S pairing: one row per command instead of every raw point
+  OUTFILE_M2S_PAIRS=""
+  if [ "$INFLUX_M2S_EXPORT" = "pushdown" ] || [ "$INFLUX_M2S_EXPORT" = "both" ]; then
+    OUTFILE_M2S_PAIRS="${TEST_DIR}/${PROFILE}_${TEST_TIMESTAMP}_m2s_pairs.${EXPORT_EXT}"
+    log "🔍 Executing M2S pushdown export to: $OUTFILE_M2S_PAIRS"
+    if export_influx_measurement latency_measurement "$OUTFILE_M2S_PAIRS" m2s-pairs; then
+      log "⚡ M2S pairs export completed -> $OUTFILE_M2S_PAIRS"
+    else
+      log "❌ M2S pairs export failed"
+      [ -s "${OUTFILE_M2S_PAIRS}.err" ] && log "❌ M2S pairs stderr: $(tail -1 "${OUTFILE_M2S_PAIRS}.err")"
+      OUTFILE_M2S_PAIRS=""
+    fi
+    [ -f "${OUTFILE_M2S_PAIRS}.err" ] && rm -f "${OUTFILE_M2S_PAIRS}.err"
+    [ -n "$OUTFILE_M2S_PAIRS" ] && [ ! -s "$OUTFILE_M2S_PAIRS" ] && { log "❌ M2S pairs export empty"; OUTFILE_M2S_PAIRS=""; }
   fi
-  [ -f "${OUTFILE_LATENCY}.err" ] && rm -f "${OUTFILE_LATENCY}.err"
-  [ -n "$OUTFILE_LATENCY" ] && [ ! -s "$OUTFILE_LATENCY" ] && { log "❌ Latency export empty"; OUTFILE_LATENCY=""; }
 
   # Set OUTFILE to device_data to prevent secondary export (we have both files now)
-  if [ -f "$OUTFILE_DEVICE" ] && [ -f "$OUTFILE_LATENCY" ]; then
+  if [ -f "$OUTFILE_DEVICE" ] && { [ -f "$OUTFILE_LATENCY" ] || [ -f "$OUTFILE_M2S_PAIRS" ]; }; then
     OUTFILE="$OUTFILE_DEVICE"
     SKIP_SECONDARY_EXPORT=1
     log "✅ Both priority exports completed successfully, skipping secondary export"
@@ -1285,9 +1465,8 @@ if [ -n "$OUTFILE_DEVICE" ] && [ -f "$OUTFILE_DEVICE" ] && [ -n "$OUTFILE_LATENC
   # Merge device_data and latency_measurement CSVs into a single analysis file
   MERGED_CSV="${TEST_DIR}/analysis_merged.csv"
   {
-    head -1 "$OUTFILE_DEVICE"
-    tail -n +2 "$OUTFILE_DEVICE"
-    tail -n +2 "$OUTFILE_LATENCY" 2>/dev/null || true
+    cat_export "$OUTFILE_DEVICE"
+    cat_export "$OUTFILE_LATENCY" 2>/dev/null | tail -n +2 || true
   } > "$MERGED_CSV"
   
   if command -v python3 >/dev/null 2>&1; then
@@ -1301,7 +1480,7 @@ if [ -n "$OUTFILE_DEVICE" ] && [ -f "$OUTFILE_DEVICE" ] && [ -n "$OUTFILE_LATENC
     # NEW: authoritative end-to-end analysis by correlation_id (what was previously run manually)
     CORRELATION_REPORT="${TEST_DIR}/latency_analysis_correlation.txt"
     log "Running end-to-end correlation analysis..."
-    "$PYTHON" "${PWD}/analyze_latencies.py" "$OUTFILE_LATENCY" --by-correlation-id > "$CORRELATION_REPORT" 2>&1 && {
+    "$PYTHON" "${PWD}/analyze_latencies.py" <(cat_export "$OUTFILE_LATENCY") --by-correlation-id > "$CORRELATION_REPORT" 2>&1 && {
       log "✅ Correlation analysis complete (see ${CORRELATION_REPORT})"
       {
         echo ""
@@ -1324,6 +1503,10 @@ if [ -d "${TEST_DIR}/generated_reports" ]; then
       --odte "${ODTE_CSV}" \
       --device-csv "${OUTFILE_DEVICE:-}" \
       --latency-csv "${OUTFILE_LATENCY:-}" \
+      --m2s-pairs-csv "${OUTFILE_M2S_PAIRS:-}" \
+      $( [ "$INFLUX_M2S_EXPORT" = "both" ] && echo --cross-check ) \
+      $( [ -s "${TEST_DIR}/link_events.jsonl" ] && echo --link-events "${TEST_DIR}/link_events.jsonl" ) \
+      $( [ -f "${SCHEDULE_FILE:-}" ] && echo --schedule "${SCHEDULE_FILE}" --start-epoch "${START_EPOCH}" ) \
       --summary "${SUMMARY}" > "$METRICS_LOG" 2>&1 || log "Run metrics computation failed (see $METRICS_LOG)"
   else
     log "python3 not available; skipping extended run metrics computation"
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+Chunked, parallel export of one InfluxDB measurement to annotated CSV.
+
+Used by apply_slice.sh for the priority export. The workload window [start, stop) is
+split into sub-ranges that are fetched concurrently by a bounded worker pool; each
+response is streamed to its own part file, failed chunks are retried individually and
+the parts are stitched in time order into the final CSV. The result is a regular
+multi-table Influx CSV, read by report_generators/_influx_csv.py.
+
+The HTTP request is made with curl so the same execution context as the rest of
+apply_slice.sh can be reused (e.g. --curl "docker exec mn.influxdb curl -s").
+
+--mode m2s-pairs is the server-side alternative for M2S: Flux pairs sent/received
+timestamps by correlation_id and returns one compact row per command instead of
+every raw point; _compute_run_metrics.py --m2s-pairs-csv reads it.
+
+--compress gz|zst asks Influx for a gzip-encoded body and stores .csv.gz/.csv.zst;
+the report readers decompress while streaming (_influx_csv.open_export).
+
+Usage:
+  INFLUX_TOKEN=... python3 scripts/influx_export.py --url http://localhost:8086 \\
+      --org minha_org --bucket iot_data --measurement device_data \\
+      --start 2026-01-01T00:00:00Z --stop 2026-01-01T00:10:00Z --out out.csv
+"""
+import argparse
+import gzip
+import math
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import zstandard
+except ImportError:  # optional: the zstd CLI is used for --compress zst
+    zstandard = None
+
+
+def parse_iso(value):
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).astimezone(timezone.utc)
+
+
+def format_iso(dt):
+    return dt.astimezone(timezone.utc).isoformat().replace('+00:00', 'Z')
+
+
+def split_window(start, stop, chunks):
+    """Split [start, stop) into ``chunks`` contiguous, non-overlapping sub-ranges."""
+    span = (stop - start) / chunks
+    bounds = [start + span * i for i in range(chunks)] + [stop]
+    # whole-second boundaries keep the Flux time literals short and exact
+    bounds = [bounds[0]] + [b.replace(microsecond=0) for b in bounds[1:-1]] + [bounds[-1]]
+    return [(a, b) for a, b in zip(bounds, bounds[1:]) if b > a]
+
+
+def flux_query(bucket, measurement, start, stop):
+    return (f'from(bucket: "{bucket}") '
+            f'|> range(start: time(v: "{format_iso(start)}"), stop: time(v: "{format_iso(stop)}")) '
+            f'|> filter(fn: (r) => r._measurement == "{measurement}")')
+
+
+# M2S pushdown: repair the shifted rows (see report_generators/_influx_csv.py
+# recover_shifted), keep the first sent/received timestamp per correlation id and
+# pivot them into one row per command. A second table counts all sent rows so
+# twin fidelity keeps the same denominator as the raw export.
+M2S_PAIRS_FLUX = '''import "regexp"
+import "strings"
+
+clean = (v) => strings.trim(v: strings.trimSpace(v: v), cutset: "\\"")
+
+base = from(bucket: "{bucket}")
+  |> range(start: time(v: "{start}"), stop: time(v: "{stop}"))
+  |> filter(fn: (r) => r._measurement == "latency_measurement")
+  |> filter(fn: (r) => r._field == "sent_timestamp" or r._field == "received_timestamp")
+  |> map(fn: (r) => {{
+      direction = if exists r.direction then r.direction else ""
+      sensor = if exists r.sensor then strings.trimSpace(v: r.sensor) else ""
+      source = if exists r.source then r.source else ""
+      dt_id = if exists r.dt_id then r.dt_id else ""
+      corr0 = if exists r.correlation_id and r.correlation_id != "" then r.correlation_id
+          else if exists r.request_id then r.request_id else ""
+      shifted = direction != "M2S" and source == "" and (sensor == "middts" or sensor == "simulator")
+          and clean(v: corr0) == "M2S" and regexp.matchRegexpString(r: /^[0-9a-fA-F-]{{32,36}}$/, v: clean(v: dt_id))
+      return {{_time: r._time, _field: r._field, _value: int(v: r._value),
+          dir: if shifted then "M2S" else direction,
+          corr: clean(v: if shifted then dt_id else corr0)}}
+  }})
+  |> filter(fn: (r) => r.dir == "M2S" and r.corr != "")
+
+base
+  |> group(columns: ["corr", "_field"])
+  |> sort(columns: ["_time"])
+  |> first()
+  |> group()
+  |> pivot(rowKey: ["corr"], columnKey: ["_field"], valueColumn: "_value")
+  |> filter(fn: (r) => exists r.sent_timestamp and exists r.received_timestamp)
+  |> map(fn: (r) => ({{r with latency_ms: r.received_timestamp - r.sent_timestamp}}))
+  |> filter(fn: (r) => r.latency_ms >= 0 and r.latency_ms < 60000)
+  |> keep(columns: ["corr", "sent_timestamp", "latency_ms"])
+  |> yield(name: "m2s_pairs")
+
+base
+  |> filter(fn: (r) => r._field == "received_timestamp")
+  |> group()
+  |> distinct(column: "corr")
+  |> count()
+  |> map(fn: (r) => ({{_field: "m2s_received", _value: r._value}}))
+  |> yield(name: "m2s_received")
+
+base
+  |> filter(fn: (r) => r._field == "sent_timestamp")
+  |> group()
+  |> count()
+  |> map(fn: (r) => ({{_field: "m2s_sent_rows", _value: r._value}}))
+  |> yield(name: "m2s_sent_rows")
+'''
+
+
+def m2s_pairs_query(bucket, start, stop):
+    return M2S_PAIRS_FLUX.format(bucket=bucket, start=format_iso(start), stop=format_iso(stop))
+
+
+def curl_query_cmd(curl, url, org, token, query, timeout, compressed=False):
+    """argv for one Flux query POST returning annotated CSV on stdout."""
+    return shlex.split(curl) + [
+        '--show-error', '--fail', '--max-time', str(timeout),
+        '--request', 'POST', f'{url}/api/v2/query?org={org}',
+        '--header', f'Authorization: Token {token}',
+        '--header', 'Accept: text/csv',
+        '--header', 'Content-type: application/vnd.flux',
+    ] + (['--header', 'Accept-Encoding: gzip'] if compressed else []) + ['--data', query]
+
+
+def fetch_chunk(args, index, start, stop):
+    """Fetch one sub-range into ``<out>.partNNNN``; returns (index, path, error)."""
+    part = f'{args.out}.part{index:04d}'
+    query = (m2s_pairs_query(args.bucket, start, stop) if args.mode == 'm2s-pairs'
+             else flux_query(args.bucket, args.measurement, start, stop))
+    cmd = curl_query_cmd(args.curl, args.url, args.org, args.token, query,
+                         args.timeout, compressed=args.compress != 'none')
+    error = ''
+    for attempt in range(1, args.retries + 2):
+        try:
+            with open(part, 'wb') as f:
+                proc = subprocess.run(cmd, stdout=f, stderr=subprocess.PIPE, timeout=args.timeout + 10)
+            if proc.returncode == 0:
+                return index, part, ''
+            lines = proc.stderr.decode(errors='replace').strip().splitlines()
+            error = lines[-1] if lines else f'exit {proc.returncode}'
+        except subprocess.TimeoutExpired:
+            error = f'timeout after {args.timeout}s'
+        except OSError as e:
+            error = str(e)
+        print(f'[influx-export] {args.measurement} chunk {index} '
+              f'{format_iso(start)}..{format_iso(stop)} attempt {attempt} failed: {error}', file=sys.stderr)
+        if attempt <= args.retries:
+            time.sleep(min(2 ** attempt, 10))
+    return index, part, error
+
+
+def _open_part(part):
+    """Part file as a plain byte stream (Influx gzips the body when asked to)."""
+    f = open(part, 'rb')
+    magic = f.read(2)
+    f.seek(0)
+    if magic == b'\x1f\x8b':
+        return gzip.GzipFile(fileobj=f, mode='rb')
+    return f
+
+
+@contextmanager
+def _zstd_writer(path):
+    if zstandard is not None:
+        with open(path, 'wb') as f, zstandard.ZstdCompressor(level=3).stream_writer(f) as w:
+            yield w
+        return
+    if shutil.which('zstd') is None:
+        raise RuntimeError('--compress zst needs the zstandard module or the zstd CLI')
+    proc = subprocess.Popen(['zstd', '-q', '-3', '-f', '-o', path], stdin=subprocess.PIPE)
+    try:
+        yield proc.stdin
+    finally:
+        proc.stdin.close()
+        if proc.wait() != 0:
+            raise RuntimeError(f'zstd exited with {proc.returncode}')
+
+
+def stitch(parts, out, compress='none'):
+    """Concatenate part files in order; a blank line separates the Influx tables.
+
+    gz: parts the server already gzipped are copied as-is (a .gz may hold several
+    members), others are compressed here. zst: parts are decompressed and streamed
+    through one zstd frame.
+    """
+    tmp = out + '.tmp'
+    if compress == 'gz':
+        with open(tmp, 'wb') as dst:
+            for part in parts:
+                with open(part, 'rb') as src:
+                    if src.read(2) == b'\x1f\x8b':
+                        src.seek(0)
+                        shutil.copyfileobj(src, dst, 1 << 20)
+                    else:
+                        src.seek(0)
+                        with gzip.GzipFile(fileobj=dst, mode='wb', compresslevel=6) as gz:
+                            shutil.copyfileobj(src, gz, 1 << 20)
+                dst.write(gzip.compress(b'\r\n'))
+        os.replace(tmp, out)
+        return
+    with (_zstd_writer(tmp) if compress == 'zst' else open(tmp, 'wb')) as dst:
+        for part in parts:
+            last = b''
+            with _open_part(part) as src:
+                for block in iter(lambda: src.read(1 << 20), b''):
+                    dst.write(block)
+                    last = block[-1:]
+            if last and last != b'\n':
+                dst.write(b'\r\n')
+            if last:
+                dst.write(b'\r\n')
+    os.replace(tmp, out)
+
+
+def main():
+    p = argparse.ArgumentParser(description='Chunked parallel Influx CSV export')
+    p.add_argument('--url', required=True, help='Base Influx URL, e.g. http://localhost:8086')
+    p.add_argument('--org', required=True)
+    p.add_argument('--bucket', required=True)
+    p.add_argument('--measurement', default='latency_measurement',
+                   help='Measurement to export (raw mode; m2s-pairs always reads latency_measurement)')
+    p.add_argument('--mode', choices=('raw', 'm2s-pairs'), default='raw',
+                   help='raw: every point; m2s-pairs: one row per M2S command computed inside Flux')
+    p.add_argument('--start', required=True, help='RFC3339 start (inclusive)')
+    p.add_argument('--stop', required=True, help='RFC3339 stop (exclusive)')
+    p.add_argument('--out', required=True)
+    p.add_argument('--token', default=os.environ.get('INFLUX_TOKEN', ''), help='Defaults to $INFLUX_TOKEN')
+    p.add_argument('--curl', default='curl -s', help='curl command prefix (default: "curl -s")')
+    p.add_argument('--chunks', type=int, default=0, help='Number of sub-ranges (default: from --chunk-seconds)')
+    p.add_argument('--chunk-seconds', type=float, default=60.0, help='Target sub-range length when --chunks is 0')
+    p.add_argument('--workers', type=int, default=4)
+    p.add_argument('--timeout', type=int, default=30, help='Per-chunk timeout in seconds')
+    p.add_argument('--retries', type=int, default=3, help='Retries per failed chunk')
+    p.add_argument('--compress', choices=('none', 'gz', 'zst'), default='none',
+                   help='Request gzip transfer and store the CSV compressed (name --out accordingly)')
+    args = p.parse_args()
+
+    if not args.token:
+        print('[influx-export] no token (set INFLUX_TOKEN or --token)', file=sys.stderr)
+        return 2
+    start, stop = parse_iso(args.start), parse_iso(args.stop)
+    if stop <= start:
+        print('[influx-export] empty window', file=sys.stderr)
+        return 2
+    chunks = args.chunks or max(1, math.ceil((stop - start).total_seconds() / args.chunk_seconds))
+    if args.mode == 'm2s-pairs':
+        # a command and its response may straddle a chunk boundary: pair over the whole window
+        chunks = 1
+        args.measurement = 'm2s_pairs'
+    windows = split_window(start, stop, chunks)
+
+    t0 = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        results = list(pool.map(lambda w: fetch_chunk(args, *w),
+                                [(i, a, b) for i, (a, b) in enumerate(windows)]))
+    parts = [part for _, part, _ in sorted(results)]
+    failed = [(i, err) for i, _, err in results if err]
+    try:
+        if failed:
+            for i, err in failed:
+                print(f'[influx-export] {args.measurement} chunk {i} gave up: {err}', file=sys.stderr)
+            return 1
+        stitch(parts, args.out, args.compress)
+    finally:
+        for part in parts:
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+    print(f'[influx-export] {args.measurement}: {len(windows)} chunks, {args.workers} workers, '
+          f'{os.path.getsize(args.out)} bytes in {time.monotonic() - t0:.1f}s', file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
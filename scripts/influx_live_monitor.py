@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Live latency monitor for a running scenario.
+
+Polls ``latency_measurement`` and ``device_data`` in short windows while the workload
+runs (instead of waiting for the post-run export) and keeps, in bounded memory:
+
+- rolling S2M and M2S latency percentiles (P50/P95/P99) overall and per sensor, over
+  the last --samples latencies of each series;
+- delivery: received/sent events, cumulative and over the last --window seconds;
+- AoT (age of twin state) = M2S latency mean/P95, as in _compute_run_metrics.py.
+
+Pairing follows the post-run scripts: M2S by correlation id over latency_measurement
+(first sent/received wins, kept if < 60 s), S2M FIFO per sensor over device_data
+(kept if < 10 s), with the column-shift repair of report_generators/_influx_csv.py.
+Pending M2S commands older than 60 s are dropped and the S2M FIFO queues are capped
+at --samples entries per sensor, so memory stays flat over long runs.
+
+A status block is printed every --interval seconds and, with --json-out, the same
+snapshot is written atomically to a file a dashboard can poll. --abort-p95-ms /
+--abort-min-delivery-pct make the monitor exit with status 3 once the run is clearly
+bad (after --grace seconds), so apply_slice.sh (LIVE_MONITOR=1) can stop early.
+
+Usage:
+  INFLUX_TOKEN=... python3 scripts/influx_live_monitor.py --url http://localhost:8086 \\
+      --org minha_org --bucket iot_data --duration 600 --json-out live.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports', 'report_generators'))
+
+from _influx_csv import iter_text_rows, normalize_id, records_from_rows  # noqa: E402
+from influx_export import curl_query_cmd, format_iso, parse_iso  # noqa: E402
+
+EXIT_ABORT = 3
+M2S_MAX_MS = 60000
+S2M_MAX_MS = 10000
+
+LIVE_FLUX = ('from(bucket: "{bucket}") '
+             '|> range(start: time(v: "{start}"), stop: time(v: "{stop}")) '
+             '|> filter(fn: (r) => r._measurement == "latency_measurement" or r._measurement == "device_data") '
+             '|> filter(fn: (r) => r._field == "sent_timestamp" or r._field == "received_timestamp")')
+
+
+def latency_summary(values):
+    """n/mean/P50/P95/P99 (ms) of a window of latencies, indexed like the report scripts."""
+    if not values:
+        return {'n': 0}
+    lat = sorted(values)
+    n = len(lat)
+    return {
+        'n': n,
+        'mean_ms': round(statistics.fmean(lat), 3),
+        'P50_ms': lat[n // 2],
+        'P95_ms': lat[int(n * 0.95)],
+        'P99_ms': lat[int(n * 0.99)],
+    }
+
+
+def _pct(num, den):
+    return round(num * 100.0 / den, 2) if den else None
+
+
+class LiveStats:
+    """Rolling pairing state and latency windows fed one poll window at a time."""
+
+    def __init__(self, samples=512, window_s=60):
+        self.samples = samples
+        self.window_ms = int(window_s * 1000)
+        self.lat = {'S2M': deque(maxlen=samples * 8), 'M2S': deque(maxlen=samples * 8)}
+        self.by_sensor = {'S2M': {}, 'M2S': {}}
+        self.totals = {'S2M': [0, 0], 'M2S': [0, 0]}   # [sent, received]
+        self.events = deque()                           # (ts_ms, direction, field)
+        self.m2s_sent = {}      # corr -> (sent_ts, sensor) waiting for a response
+        self.m2s_recv = {}      # corr -> recv_ts seen before its command
+        self.m2s_done = {}      # corr -> ts of recently paired commands (first wins)
+        self.s2m_sent = {}      # sensor -> deque of pending sent ts
+        self.s2m_recv = {}      # sensor -> deque of pending recv ts
+        self.latest_ms = 0
+
+    def _add_latency(self, direction, sensor, ms):
+        self.lat[direction].append(ms)
+        window = self.by_sensor[direction].get(sensor)
+        if window is None:
+            window = self.by_sensor[direction][sensor] = deque(maxlen=self.samples)
+        window.append(ms)
+
+    def _count(self, direction, field, ts):
+        self.totals[direction][0 if field == 'sent_timestamp' else 1] += 1
+        self.events.append((ts, direction, field))
+
+    def fold(self, records):
+        new_sent = {}
+        new_recv = {}
+        for rec in records:
+            if rec.value is None or rec.direction not in ('S2M', 'M2S'):
+                continue
+            ts = int(rec.value)
+            self.latest_ms = max(self.latest_ms, ts)
+            if rec.direction == 'S2M':
+                if rec.measurement != 'device_data':
+                    continue
+                self._count('S2M', rec.field, ts)
+                dst = new_sent if rec.field == 'sent_timestamp' else new_recv
+                dst.setdefault(rec.sensor, []).append(ts)
+                continue
+            if rec.measurement != 'latency_measurement' or not rec.correlation_id:
+                continue
+            corr = normalize_id(rec.correlation_id)
+            if rec.field == 'sent_timestamp':
+                self._count('M2S', rec.field, ts)
+                if corr in self.m2s_done or corr in self.m2s_sent:
+                    continue
+                if corr not in self.m2s_recv:
+                    self.m2s_sent[corr] = (ts, rec.sensor)
+                    continue
+                sent_ts, sensor, recv_ts = ts, rec.sensor, self.m2s_recv.pop(corr)
+            else:
+                if corr in self.m2s_done or corr in self.m2s_recv:
+                    continue
+                self._count('M2S', rec.field, ts)
+                if corr not in self.m2s_sent:
+                    self.m2s_recv[corr] = ts
+                    continue
+                (sent_ts, sensor), recv_ts = self.m2s_sent.pop(corr), ts
+            self.m2s_done[corr] = recv_ts
+            if 0 <= recv_ts - sent_ts < M2S_MAX_MS:
+                self._add_latency('M2S', sensor, recv_ts - sent_ts)
+
+        for sensor in set(new_sent) | set(new_recv):
+            sent_q = deque(sorted(list(self.s2m_sent.pop(sensor, ())) + new_sent.get(sensor, [])))
+            recv_q = deque(sorted(list(self.s2m_recv.pop(sensor, ())) + new_recv.get(sensor, [])))
+            while sent_q and recv_q:
+                if recv_q[0] >= sent_q[0]:
+                    delta = recv_q.popleft() - sent_q.popleft()
+                    if delta < S2M_MAX_MS:
+                        self._add_latency('S2M', sensor, delta)
+                else:
+                    recv_q.popleft()  # orphan recv before any sent
+            if sent_q:
+                self.s2m_sent[sensor] = deque(sent_q, maxlen=self.samples)
+            if recv_q:
+                self.s2m_recv[sensor] = deque(recv_q, maxlen=self.samples)
+        self._expire()
+
+    def _expire(self):
+        """Drop M2S events that can no longer produce a kept pair; trim the delivery window."""
+        now = self.latest_ms
+        for pending, limit in ((self.m2s_recv, M2S_MAX_MS), (self.m2s_done, M2S_MAX_MS)):
+            for corr in [c for c, ts in pending.items() if now - ts > limit]:
+                del pending[corr]
+        for corr in [c for c, (ts, _) in self.m2s_sent.items() if now - ts > M2S_MAX_MS]:
+            del self.m2s_sent[corr]
+        while self.events and now - self.events[0][0] > self.window_ms:
+            self.events.popleft()
+
+    def snapshot(self):
+        window = {'S2M': [0, 0], 'M2S': [0, 0]}
+        for _, direction, field in self.events:
+            window[direction][0 if field == 'sent_timestamp' else 1] += 1
+        out = {}
+        for direction in ('S2M', 'M2S'):
+            sent, recv = self.totals[direction]
+            out[direction] = dict(latency_summary(self.lat[direction]),
+                                  sent=sent, received=recv,
+                                  delivery_pct=_pct(recv, sent),
+                                  window_delivery_pct=_pct(window[direction][1], window[direction][0]))
+        out['aot_mean_ms'] = out['M2S'].get('mean_ms')
+        out['aot_p95_ms'] = out['M2S'].get('P95_ms')
+        out['sensors'] = {
+            direction: {sensor: latency_summary(values) for sensor, values in sorted(series.items())}
+            for direction, series in self.by_sensor.items()
+        }
+        out['pending'] = {'m2s_commands': len(self.m2s_sent),
+                          's2m_sent': sum(len(q) for q in self.s2m_sent.values())}
+        return out
+
+
+def fetch_window(args, start, stop):
+    query = LIVE_FLUX.format(bucket=args.bucket, start=format_iso(start), stop=format_iso(stop))
+    cmd = curl_query_cmd(args.curl, args.url, args.org, args.token, query, args.timeout)
+    proc = subprocess.run(cmd, capture_output=True, timeout=args.timeout + 10)
+    if proc.returncode != 0:
+        lines = proc.stderr.decode(errors='replace').strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f'exit {proc.returncode}')
+    return proc.stdout.decode('utf-8', errors='replace').splitlines()
+
+
+def check_abort(args, snap, elapsed):
+    """Reason string when an abort threshold is crossed, else ''."""
+    if elapsed < args.grace:
+        return ''
+    for direction in ('S2M', 'M2S'):
+        stats = snap[direction]
+        if args.abort_p95_ms and stats['n'] >= args.min_samples and stats['P95_ms'] > args.abort_p95_ms:
+            return f'{direction} P95 {stats["P95_ms"]} ms > {args.abort_p95_ms} ms'
+        delivery = stats['window_delivery_pct']
+        if (args.abort_min_delivery_pct and delivery is not None and stats['sent'] >= args.min_samples
+                and delivery < args.abort_min_delivery_pct):
+            return f'{direction} delivery {delivery}% < {args.abort_min_delivery_pct}% (last {args.window}s)'
+    return ''
+
+
+def format_status(snap, elapsed, top):
+    lines = [f'[live] t+{elapsed:.0f}s']
+    for direction in ('S2M', 'M2S'):
+        s = snap[direction]
+        lat = (f'P50={s["P50_ms"]} P95={s["P95_ms"]} P99={s["P99_ms"]} mean={s["mean_ms"]} ms (n={s["n"]})'
+               if s['n'] else 'no pairs yet')
+        pct = ['n/a' if v is None else f'{v}%' for v in (s['delivery_pct'], s['window_delivery_pct'])]
+        lines.append(f'  {direction}: {lat} | delivery {s["received"]}/{s["sent"]} '
+                     f'({pct[0]}, last window {pct[1]})')
+    if snap['aot_mean_ms'] is not None:
+        lines.append(f'  AoT: mean={snap["aot_mean_ms"]} ms P95={snap["aot_p95_ms"]} ms')
+    if top:
+        worst = sorted(((s['P95_ms'], d, sensor) for d, series in snap['sensors'].items()
+                        for sensor, s in series.items() if s['n']), reverse=True)[:top]
+        for p95, direction, sensor in worst:
+            lines.append(f'  worst {direction} {sensor}: P95={p95} ms')
+    return '\n'.join(lines)
+
+
+def write_json(path, snap):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(snap, f, indent=1)
+    os.replace(tmp, path)
+
+
+def main():
+    p = argparse.ArgumentParser(description='Live in-run latency monitor (polls Influx)')
+    p.add_argument('--url', required=True, help='Base Influx URL, e.g. http://localhost:8086')
+    p.add_argument('--org', required=True)
+    p.add_argument('--bucket', required=True)
+    p.add_argument('--token', default=os.environ.get('INFLUX_TOKEN', ''), help='Defaults to $INFLUX_TOKEN')
+    p.add_argument('--curl', default='curl -s', help='curl command prefix (default: "curl -s")')
+    p.add_argument('--start', default='', help='RFC3339 start of the first window (default: now)')
+    p.add_argument('--duration', type=float, default=0, help='Stop after this many seconds (0 = until killed)')
+    p.add_argument('--interval', type=float, default=5.0, help='Seconds between polls/status updates')
+    p.add_argument('--lag', type=float, default=2.0, help='Stay this many seconds behind now so late writes land')
+    p.add_argument('--timeout', type=int, default=10, help='Per-query timeout in seconds')
+    p.add_argument('--samples', type=int, default=512, help='Latencies kept per sensor series')
+    p.add_argument('--window', type=float, default=60.0, help='Seconds covered by the rolling delivery ratio')
+    p.add_argument('--top', type=int, default=3, help='Worst sensors (by P95) shown per status block')
+    p.add_argument('--json-out', default='', help='Rewrite this file with the latest snapshot every poll')
+    p.add_argument('--abort-p95-ms', type=float, default=0, help='Exit 3 when S2M or M2S P95 exceeds this')
+    p.add_argument('--abort-min-delivery-pct', type=float, default=0,
+                   help='Exit 3 when S2M or M2S delivery over --window drops below this')
+    p.add_argument('--grace', type=float, default=60.0, help='Seconds before abort thresholds apply')
+    p.add_argument('--min-samples', type=int, default=50, help='Minimum pairs/sent events before aborting')
+    args = p.parse_args()
+
+    if not args.token:
+        print('[live] no token (set INFLUX_TOKEN or --token)', file=sys.stderr)
+        return 2
+    stats = LiveStats(samples=args.samples, window_s=args.window)
+    cursor = parse_iso(args.start) if args.start else datetime.now(timezone.utc) - timedelta(seconds=args.lag)
+    t0 = time.monotonic()
+    while True:
+        tick = time.monotonic()
+        stop = datetime.now(timezone.utc) - timedelta(seconds=args.lag)
+        if stop > cursor:
+            try:
+                lines = fetch_window(args, cursor, stop)
+            except (RuntimeError, OSError, subprocess.TimeoutExpired) as e:
+                # keep the cursor: the same window is retried, widened, on the next poll
+                print(f'[live] query {format_iso(cursor)}..{format_iso(stop)} failed: {e}', file=sys.stderr)
+            else:
+                stats.fold(records_from_rows(iter_text_rows(lines),
+                                             measurements=('latency_measurement', 'device_data')))
+                cursor = stop
+        elapsed = time.monotonic() - t0
+        snap = stats.snapshot()
+        snap['elapsed_s'] = round(elapsed, 1)
+        snap['through'] = format_iso(cursor)
+        print(format_status(snap, elapsed, args.top), flush=True)
+        reason = check_abort(args, snap, elapsed)
+        if reason:
+            snap['abort_reason'] = reason
+        if args.json_out:
+            write_json(args.json_out, snap)
+        if reason:
+            print(f'[live] ABORT: {reason}', file=sys.stderr, flush=True)
+            return EXIT_ABORT
+        if args.duration and elapsed >= args.duration:
+            return 0
+        time.sleep(max(0.0, args.interval - (time.monotonic() - tick)))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
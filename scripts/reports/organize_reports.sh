@@ -13,18 +13,25 @@ mkdir -p "$RESULTS_DIR/raw_exports" "$RESULTS_DIR/generated_reports" \
 
 echo "Organizing reports under $RESULTS_DIR"
 
-# Move full exports (detect '_measurement' header) into raw_exports
-for f in "$RESULTS_DIR"/urllc_*.csv; do
+# Move full exports (detect '_measurement' header) into raw_exports.
+# Compressed exports (.csv.gz/.csv.zst) and their column caches (<csv>.cols/) move too.
+for f in "$RESULTS_DIR"/urllc_*.csv "$RESULTS_DIR"/urllc_*.csv.gz "$RESULTS_DIR"/urllc_*.csv.zst; do
 	[ -e "$f" ] || continue
-	if head -n 10 "$f" | grep -q '_measurement'; then
+	case "$f" in
+		*.gz) peek="gzip -dc" ;;
+		*.zst) peek="zstd -dcq" ;;
+		*) peek="cat" ;;
+	esac
+	if $peek "$f" 2>/dev/null | head -n 10 | grep -q '_measurement'; then
 		echo "Moving export: $(basename "$f") -> raw_exports/"
 		mv -v "$f" "$RESULTS_DIR/raw_exports/" || true
+		[ -d "$f.cols" ] && { mv "$f.cols" "$RESULTS_DIR/raw_exports/" || true; }
 	fi
 done
 
 # Move generated reports (offline generator outputs) into results/generated_reports
 if [ -d "$GENERATED_DIR" ]; then
-	for g in "$GENERATED_DIR"/*.csv; do
+	for g in "$GENERATED_DIR"/*.csv "$GENERATED_DIR"/*_latencia_sketch_*.json; do
 		[ -e "$g" ] || continue
 		echo "Moving generated report: $(basename "$g") -> results/generated_reports/"
 		mv -v "$g" "$RESULTS_DIR/generated_reports/" || true
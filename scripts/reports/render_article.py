@@ -16,6 +16,9 @@ from jinja2 import Environment, FileSystemLoader
 import re
 import html
 
+sys.path.insert(0, str(Path(__file__).resolve().parent / 'report_generators'))
+from _latency_sketch import merge_sketch_files  # noqa: E402
+
 # Repository layout helpers: repo_root is the repository root (two levels up from this file)
 # ARTICLE_DIR is the moved article directory under scripts/reports/article
 REPO_ROOT = Path(__file__).resolve().parents[2]
@@ -61,8 +64,10 @@ def compute_aggregates(generated: Path):
     s2m_files = sorted(glob.glob(s2m_pattern))
     m2s_files = sorted(glob.glob(m2s_pattern))
     odte_files = sorted(glob.glob(odte_pattern))
+    s2m_sketches = sorted(glob.glob(str(generated / '*latencia_sketch_simulator_to_middts_*.json')))
+    m2s_sketches = sorted(glob.glob(str(generated / '*latencia_sketch_middts_to_simulator_*.json')))
 
-    def aggregate_latency(files):
+    def aggregate_latency(files, sketch_files):
         if not files:
             return {'active_sensors': 0, 'total_msgs': 0, 'weighted_mean_ms': 0.0, 'weighted_p95_ms': 0.0}
         df = pd.concat((pd.read_csv(f) for f in files), ignore_index=True)
@@ -74,10 +79,16 @@ def compute_aggregates(generated: Path):
             weighted_p95 = (df['p95_ms'] * df['count']).sum() / total_msgs
         else:
             weighted_mean = weighted_p95 = 0.0
+        # count-weighting per-sensor P95 is only an approximation: use the pooled
+        # quantile from the per-sensor sketches when the generator wrote them
+        pooled = merge_sketch_files(sketch_files)
+        if pooled is not None and pooled.count:
+            weighted_mean = pooled.mean
+            weighted_p95 = pooled.quantile(0.95)
         return {'active_sensors': active, 'total_msgs': total_msgs, 'weighted_mean_ms': weighted_mean, 'weighted_p95_ms': weighted_p95}
 
-    s2m = aggregate_latency(s2m_files)
-    m2s = aggregate_latency(m2s_files)
+    s2m = aggregate_latency(s2m_files, s2m_sketches)
+    m2s = aggregate_latency(m2s_files, m2s_sketches)
 
     results.update({
         's2m_active_sensors': s2m['active_sensors'],
@@ -348,7 +359,9 @@ def compute_latency_stats_for_test(generated_dir: Path):
     g = Path(generated_dir)
     s2m_files = sorted(g.glob('*latencia_stats_simulator_to_middts_*.csv'))
     m2s_files = sorted(g.glob('*latencia_stats_middts_to_simulator_*.csv'))
-    def stats(files):
+    s2m_sketches = sorted(str(f) for f in g.glob('*latencia_sketch_simulator_to_middts_*.json'))
+    m2s_sketches = sorted(str(f) for f in g.glob('*latencia_sketch_middts_to_simulator_*.json'))
+    def stats(files, sketch_files):
         if not files:
             return {'mean_ms':0.0,'p95_ms':0.0,'compliance_pct':0.0}
         df = pd.concat((pd.read_csv(f) for f in files), ignore_index=True)
@@ -362,9 +375,13 @@ def compute_latency_stats_for_test(generated_dir: Path):
             mean = df['mean_ms'].mean() if 'mean_ms' in df.columns else 0.0
             p95 = df['p95_ms'].mean() if 'p95_ms' in df.columns else 0.0
             compliance_pct = 0.0
+        pooled = merge_sketch_files(sketch_files)
+        if pooled is not None and pooled.count:
+            mean = pooled.mean
+            p95 = pooled.quantile(0.95)
         return {'mean_ms':mean,'p95_ms':p95,'compliance_pct':compliance_pct}
-    s2m = stats(s2m_files)
-    m2s = stats(m2s_files)
+    s2m = stats(s2m_files, s2m_sketches)
+    m2s = stats(m2s_files, m2s_sketches)
     return {'s2m_mean_ms':s2m['mean_ms'],'s2m_p95':s2m['p95_ms'],'s2m_compliance_pct':s2m['compliance_pct'],
             'm2s_mean_ms':m2s['mean_ms'],'m2s_p95':m2s['p95_ms'],'m2s_compliance_pct':m2s['compliance_pct']}
 
@@ -5,142 +5,257 @@ Canonical location for report computation helpers used by generators.
 import argparse
 import csv
 import glob
+import json
+import math
 import os
-import re
 import statistics
 import sys
+from collections import deque
 
+from _export_cache import decode, iter_export_records, load_columns
+from _influx_csv import (iter_rows, looks_like_uuid, normalize_id, parse_value,
+                         read_appended_rows, records_from_rows)
+from _link_phases import (build_windows, load_link_events, load_schedule, segment_latencies,
+                          summary_fields, write_phase_reports)
 
-def _normalize_request_id(raw):
-    if raw is None:
-        return ''
-    req = str(raw).strip()
-    req = req.strip('"')
-    while len(req) >= 2 and req.startswith('"') and req.endswith('"'):
-        req = req[1:-1].strip()
-    return req
+try:
+    import numpy as np
+except ImportError:  # optional: only needed for --backend numpy
+    np = None
 
 
-def _looks_like_uuid(raw):
-    if not raw:
-        return False
-    value = str(raw).strip().strip('"')
-    return bool(re.match(r'^[0-9a-fA-F-]{32,36}$', value))
+_normalize_request_id = normalize_id
+_looks_like_uuid = looks_like_uuid
+
+
+def read_m2s_pairs_export(pairs_csv):
+    """Read the M2S pushdown export written by influx_export.py --mode m2s-pairs.
+
+    Flux already pairs the first sent/received timestamp per correlation id (column-shift
+    repaired), computes ``latency_ms`` and applies the 0..60 s sanity limit, so the file
+    holds one ``(corr, sent_timestamp, latency_ms)`` row per answered command plus the
+    'm2s_sent_rows' and 'm2s_received' count tables. Returns
+    (sent_rows, received, [(sent_ms, latency_ms)]).
+    """
+    sent_rows = 0
+    received = 0
+    pairs = {}
+    for columns, row in iter_rows(pairs_csv):
+        if 'latency_ms' in columns:
+            corr = _normalize_request_id(row[columns['corr']]) if 'corr' in columns else ''
+            latency = parse_value(row[columns['latency_ms']])
+            sent = parse_value(row[columns['sent_timestamp']]) if 'sent_timestamp' in columns else None
+            if corr and latency is not None and corr not in pairs:
+                pairs[corr] = (int(sent or 0), int(latency))
+        elif '_value' in columns:
+            # count tables: _field names the count (result is blank when annotated)
+            name = row[columns['_field']] if '_field' in columns else row[columns.get('result', 0)]
+            if name == 'm2s_sent_rows':
+                sent_rows += int(parse_value(row[columns['_value']]) or 0)
+            elif name == 'm2s_received':
+                received += int(parse_value(row[columns['_value']]) or 0)
+    return sent_rows, received, list(pairs.values())
+
+
+def _fifo_pair(sent_q, recv_q):
+    """FIFO-match two sorted deques of ms timestamps; returns the recv - sent deltas.
+
+    Each sent is matched with the earliest recv >= sent; recvs before any sent are
+    dropped. Unmatched items are left in the deques.
+    """
+    deltas = []
+    while sent_q and recv_q:
+        sv = sent_q[0]
+        rv = recv_q[0]
+        if rv >= sv:
+            deltas.append(rv - sv)
+            sent_q.popleft()
+            recv_q.popleft()
+        else:
+            recv_q.popleft()  # orphan recv before any sent
+    return deltas
+
+
+def _fifo_pair_ts(sent_q, recv_q):
+    """Like _fifo_pair, but returns (sent, recv - sent) so deltas can be placed in time."""
+    pairs = []
+    while sent_q and recv_q:
+        sv = sent_q[0]
+        rv = recv_q[0]
+        if rv >= sv:
+            pairs.append((sv, rv - sv))
+            sent_q.popleft()
+            recv_q.popleft()
+        else:
+            recv_q.popleft()
+    return pairs
 
 
-def read_raw_export_metrics(device_csv='', latency_csv=''):
+def _latency_stats(lat):
+    """n, mean, median, P50/P95/P99 and CV of a list of latencies (seconds, sorted in place)."""
+    if not lat:
+        return {'n': 0}
+    lat.sort()
+    n = len(lat)
+    mean_s = sum(lat) / n
+    return {'n': n, 'mean': mean_s, 'median': statistics.median(lat),
+            'p50': lat[n // 2], 'p95': lat[int(n * 0.95)], 'p99': lat[int(n * 0.99)],
+            'cv': statistics.stdev(lat) / mean_s if n > 1 else 0}
+
+
+def _histogram_stats(hist_ms):
+    """Same as _latency_stats, from a {latency_ms: count} histogram of integer latencies.
+
+    Sums are kept in integers, so mean and stdev match the list version exactly.
+    """
+    n = sum(hist_ms.values())
+    if not n:
+        return {'n': 0}
+    total = sum(ms * c for ms, c in hist_ms.items())
+    total_sq = sum(ms * ms * c for ms, c in hist_ms.items())
+    ranks = {n // 2, int(n * 0.95), int(n * 0.99)}
+    if n % 2 == 0:
+        ranks.add(n // 2 - 1)
+    at = {}
+    seen = 0
+    for ms in sorted(hist_ms):
+        c = hist_ms[ms]
+        for r in [r for r in ranks if r < seen + c]:
+            at[r] = ms / 1000.0
+            ranks.discard(r)
+        seen += c
+    mean_s = total / n / 1000.0
+    median = at[n // 2] if n % 2 else (at[n // 2 - 1] + at[n // 2]) / 2
+    stdev_s = math.sqrt((n * total_sq - total * total) / (n * (n - 1))) / 1000.0 if n > 1 else 0
+    return {'n': n, 'mean': mean_s, 'median': median,
+            'p50': at[n // 2], 'p95': at[int(n * 0.95)], 'p99': at[int(n * 0.99)],
+            'cv': stdev_s / mean_s if n > 1 else 0}
+
+
+def _raw_metrics_dict(s2m_lat, s2m_received, s2m_sent_count, m2s_lat, m2s_sent, m2s_received):
+    """Summary fields from the paired latencies (seconds) and event counts."""
+    return _summary_from_stats(_latency_stats(s2m_lat), s2m_received, s2m_sent_count,
+                               _latency_stats(m2s_lat), m2s_sent, m2s_received)
+
+
+def _summary_from_stats(s2m, s2m_received, s2m_sent_count, m2s, m2s_sent, m2s_received):
+    """Summary fields from _latency_stats/_histogram_stats results and event counts."""
     out = {}
+    pairs_used = m2s['n']
+
+    # Keep legacy keys expected by summaries (but now calculated!)
+    if s2m['n']:
+        out['mean_S2M_ms'] = round(s2m['mean'] * 1000.0, 3)  # Convert to ms
+        out['median_S2M_ms'] = round(s2m['median'] * 1000.0, 3)  # Convert to ms
+    else:
+        out['mean_S2M_ms'] = 0.0
+        out['median_S2M_ms'] = 0.0
+    out['S2M_total_count'] = s2m_received
+    out['S2M_sent_count'] = s2m_sent_count
+    out['S2M_matched_pairs'] = s2m['n']
+
+    if pairs_used:
+        out['mean_M2S_ms'] = round(m2s['mean'] * 1000.0, 3)
+        out['median_M2S_ms'] = round(m2s['median'] * 1000.0, 3)
+        out['P50_M2S_ms'] = round(m2s['p50'] * 1000.0, 3)
+        out['P95_M2S_ms'] = round(m2s['p95'] * 1000.0, 3)
+        out['P99_M2S_ms'] = round(m2s['p99'] * 1000.0, 3)
+        out['CV_M2S_pct'] = round(m2s['cv'] * 100, 2)
+        # AoT Mean = M2S mean latency (freshness of digital twin state)
+        # Twin Fidelity = fraction of M2S commands that got a response
+        out['aot_mean_ms'] = out['mean_M2S_ms']
+        out['aot_p95_ms'] = out['P95_M2S_ms']
+        out['twin_fidelity_pct'] = round(pairs_used * 100.0 / m2s_sent, 2) if m2s_sent > 0 else 0.0
+    else:
+        out['mean_M2S_ms'] = 0.0
+        out['median_M2S_ms'] = 0.0
+        out['P95_M2S_ms'] = 0.0
+        out['aot_mean_ms'] = 0.0
+        out['aot_p95_ms'] = 0.0
+        out['twin_fidelity_pct'] = 0.0
+
+    # S2M percentiles (lat array already in seconds)
+    if s2m['n']:
+        out['P50_S2M_ms'] = round(s2m['p50'] * 1000.0, 3)
+        out['P95_S2M_ms'] = round(s2m['p95'] * 1000.0, 3)
+        out['P99_S2M_ms'] = round(s2m['p99'] * 1000.0, 3)
+        out['CV_S2M_pct'] = round(s2m['cv'] * 100, 2)
+
+    out['M2S_total_count'] = m2s_received
+    out['M2S_sent_count'] = m2s_sent
+    out['M2S_received_count'] = m2s_received
+    out['M2S_matched_pairs'] = pairs_used
+    out['R_m2s_event_percent'] = round(m2s_received * 100.0 / m2s_sent, 3) if m2s_sent > 0 else 0.0
+    out['R_m2s_pair_percent'] = round(pairs_used * 100.0 / m2s_sent, 3) if m2s_sent > 0 else 0.0
+
+    return out
+
+
+def read_raw_export_metrics(device_csv='', latency_csv='', m2s_pairs_csv=''):
     s2m_received = 0
     m2s_sent = 0
     m2s_received = 0
 
-    # S2M count from device_data export
-    if device_csv and os.path.exists(device_csv):
-        try:
-            with open(device_csv, newline='') as f:
-                r = csv.DictReader(f)
-                for row in r:
-                    if row.get('direction') == 'S2M' and row.get('_field') == 'received_timestamp':
-                        s2m_received += 1
-        except Exception:
-            pass
-
     # M2S latency pairing by correlation_id (unique per command-response pair).
     # sent rows: sensor=<uuid>, correlation_id=<uuid>, dt_id=<int>, source=middts
     # received rows: sensor='middts' (column-shift), correlation_id=<uuid>, dt_id=<sensor_uuid>
+    # Shifted rows are repaired by _influx_csv.recover_shifted while streaming.
     m2s_sent_map = {}   # {corr_id: sent_ts_ms}
     m2s_recv_map = {}   # {corr_id: recv_ts_ms}  (first occurrence wins)
-    if latency_csv and os.path.exists(latency_csv):
+    m2s_lat = []
+    if m2s_pairs_csv and os.path.exists(m2s_pairs_csv):
+        # pairs already reduced server-side (influx_export.py --mode m2s-pairs)
         try:
-            with open(latency_csv, newline='') as f:
-                for row in csv.DictReader(f):
-                    direction = row.get('direction', '')
-                    corr_id = row.get('correlation_id') or row.get('request_id') or ''
-                    source = row.get('source', '')
-                    sensor = row.get('sensor', '')
-                    dt_id = row.get('dt_id', '')
-
-                    # Recover malformed/shifted M2S rows from latency_measurement export.
-                    # Some rows arrive with: correlation_id='M2S', direction='"<request_id>"',
-                    # dt_id='<real correlation UUID>', sensor='simulator', source=''.
-                    if direction != 'M2S':
-                        shifted_m2s = (
-                            (not source)
-                            and str(sensor).strip() in ('middts', 'simulator')
-                            and str(corr_id).strip().strip('"') == 'M2S'
-                            and _looks_like_uuid(dt_id)
-                        )
-                        if shifted_m2s:
-                            direction = 'M2S'
-                            corr_id = dt_id
-
-                    if direction != 'M2S':
-                        continue
-
-                    field = row.get('_field')
-                    if field not in ('sent_timestamp', 'received_timestamp'):
-                        continue
-                    if not corr_id:
-                        continue
-                    corr_id = _normalize_request_id(corr_id)
-                    try:
-                        ts = int(float(row.get('_value', '0')))
-                    except (ValueError, TypeError):
-                        continue
-                    if field == 'sent_timestamp':
-                        m2s_sent += 1
-                        if corr_id not in m2s_sent_map:
-                            m2s_sent_map[corr_id] = ts
-                    elif field == 'received_timestamp':
-                        if corr_id not in m2s_recv_map:
-                            m2s_recv_map[corr_id] = ts
-                            m2s_received += 1
+            m2s_sent, m2s_received, pushdown = read_m2s_pairs_export(m2s_pairs_csv)
+            m2s_lat = [lat_ms / 1000.0 for _, lat_ms in pushdown]
+        except Exception:
+            pass
+    elif latency_csv and os.path.exists(latency_csv):
+        try:
+            for rec in iter_export_records(latency_csv, fields=('sent_timestamp', 'received_timestamp')):
+                if rec.direction != 'M2S' or not rec.correlation_id or rec.value is None:
+                    continue
+                corr_id = _normalize_request_id(rec.correlation_id)
+                ts = int(rec.value)
+                if rec.field == 'sent_timestamp':
+                    m2s_sent += 1
+                    if corr_id not in m2s_sent_map:
+                        m2s_sent_map[corr_id] = ts
+                elif corr_id not in m2s_recv_map:
+                    m2s_recv_map[corr_id] = ts
+                    m2s_received += 1
         except Exception:
             pass
 
-    m2s_lat = []
     for corr_id, sent_ts in m2s_sent_map.items():
         if corr_id in m2s_recv_map:
             dt_s = (m2s_recv_map[corr_id] - sent_ts) / 1000.0  # seconds
             if 0 <= dt_s < 60:  # sanity: < 60s
                 m2s_lat.append(dt_s)
 
-    lat_used = m2s_lat
-    pairs_used = len(m2s_lat)
-
-    # Calculate S2M latency from device_data (sent_timestamp + received_timestamp)
+    # S2M received count and latency from device_data (sent_timestamp + received_timestamp),
+    # in a single pass over the export.
     # Use FIFO matching per sensor to handle multiple events per sensor correctly.
     # S2M CSV rows have a column-shift: sensor UUID lands in request_id, sensor=middts.
     s2m_lat = []
     s2m_sent_count = 0
     if device_csv and os.path.exists(device_csv):
         try:
-            from collections import deque
             sent_by_sensor = {}
             recv_by_sensor = {}
-            with open(device_csv, newline='') as f:
-                for row in csv.DictReader(f):
-                    if row.get('direction') != 'S2M':
-                        continue
-                    sensor = row.get('sensor', '')
-                    req = row.get('request_id', '')
-                    source = row.get('source', '')
-
-                    # Recover real sensor UUID when columns are shifted
-                    if (not source) and str(sensor).strip() in ('middts', 'simulator') and _looks_like_uuid(req):
-                        sensor = str(req).strip().strip('"')
-
-                    field = row.get('_field', '')
-                    try:
-                        ts = int(float(row.get('_value', '0')))
-                    except (ValueError, TypeError):
-                        continue
-
-                    if field == 'sent_timestamp':
-                        sent_by_sensor.setdefault(sensor, []).append(ts)
-                        s2m_sent_count += 1
-                    elif field == 'received_timestamp':
-                        recv_by_sensor.setdefault(sensor, []).append(ts)
+            for rec in iter_export_records(device_csv, fields=('sent_timestamp', 'received_timestamp')):
+                if rec.direction != 'S2M':
+                    continue
+                if rec.field == 'received_timestamp':
+                    s2m_received += 1
+                if rec.value is None:
+                    continue
+                ts = int(rec.value)
+                if rec.field == 'sent_timestamp':
+                    sent_by_sensor.setdefault(rec.sensor, []).append(ts)
+                    s2m_sent_count += 1
+                else:
+                    recv_by_sensor.setdefault(rec.sensor, []).append(ts)
 
             # FIFO pairing per sensor: match each sent with earliest recv >= sent
             for sensor in sent_by_sensor:
@@ -148,76 +263,478 @@ def read_raw_export_metrics(device_csv='', latency_csv=''):
                     continue
                 sent_q = deque(sorted(sent_by_sensor[sensor]))
                 recv_q = deque(sorted(recv_by_sensor[sensor]))
-                while sent_q and recv_q:
-                    sv = sent_q[0]
-                    rv = recv_q[0]
-                    if rv >= sv:
-                        dt = (rv - sv) / 1000.0  # ms -> seconds
-                        if 0 <= dt < 10:  # sanity: < 10s
-                            s2m_lat.append(dt)
-                        sent_q.popleft()
-                        recv_q.popleft()
-                    else:
-                        recv_q.popleft()  # orphan recv before any sent
+                for delta_ms in _fifo_pair(sent_q, recv_q):
+                    dt = delta_ms / 1000.0  # ms -> seconds
+                    if 0 <= dt < 10:  # sanity: < 10s
+                        s2m_lat.append(dt)
         except Exception:
             pass
 
-    # Keep legacy keys expected by summaries (but now calculated!)
-    if s2m_lat:
-        s2m_lat.sort()
-        out['mean_S2M_ms'] = round(sum(s2m_lat) / len(s2m_lat) * 1000.0, 3)  # Convert to ms
-        out['median_S2M_ms'] = round(statistics.median(s2m_lat) * 1000.0, 3)  # Convert to ms
-    else:
-        out['mean_S2M_ms'] = 0.0
-        out['median_S2M_ms'] = 0.0
-    out['S2M_total_count'] = s2m_received
-    out['S2M_sent_count'] = s2m_sent_count
-    out['S2M_matched_pairs'] = len(s2m_lat)
-
-    if lat_used:
-        lat_used.sort()
-        n = len(lat_used)
-        mean_s = sum(lat_used) / n
-        out['mean_M2S_ms'] = round(mean_s * 1000.0, 3)
-        out['median_M2S_ms'] = round(statistics.median(lat_used) * 1000.0, 3)
-        out['P50_M2S_ms'] = round(lat_used[n // 2] * 1000.0, 3)
-        out['P95_M2S_ms'] = round(lat_used[int(n * 0.95)] * 1000.0, 3)
-        out['P99_M2S_ms'] = round(lat_used[int(n * 0.99)] * 1000.0, 3)
-        cv_m2s = statistics.stdev(lat_used) / mean_s if n > 1 else 0
-        out['CV_M2S_pct'] = round(cv_m2s * 100, 2)
-        # AoT Mean = M2S mean latency (freshness of digital twin state)
-        # Twin Fidelity = fraction of M2S commands that got a response
-        out['aot_mean_ms'] = out['mean_M2S_ms']
-        out['aot_p95_ms'] = out['P95_M2S_ms']
-        out['twin_fidelity_pct'] = round(pairs_used * 100.0 / m2s_sent, 2) if m2s_sent > 0 else 0.0
-    else:
-        out['mean_M2S_ms'] = 0.0
-        out['median_M2S_ms'] = 0.0
-        out['P95_M2S_ms'] = 0.0
-        out['aot_mean_ms'] = 0.0
-        out['aot_p95_ms'] = 0.0
-        out['twin_fidelity_pct'] = 0.0
+    return _raw_metrics_dict(s2m_lat, s2m_received, s2m_sent_count, m2s_lat, m2s_sent, m2s_received)
 
-    # S2M percentiles (lat array already in seconds)
-    if s2m_lat:
-        n = len(s2m_lat)
-        out['P50_S2M_ms'] = round(s2m_lat[n // 2] * 1000.0, 3)
-        out['P95_S2M_ms'] = round(s2m_lat[int(n * 0.95)] * 1000.0, 3)
-        out['P99_S2M_ms'] = round(s2m_lat[int(n * 0.99)] * 1000.0, 3)
-        mean_s2m = sum(s2m_lat) / n
-        cv_s2m = statistics.stdev(s2m_lat) / mean_s2m if n > 1 else 0
-        out['CV_S2M_pct'] = round(cv_s2m * 100, 2)
 
-    out['M2S_total_count'] = m2s_received
-    out['M2S_sent_count'] = m2s_sent
-    out['M2S_received_count'] = m2s_received
-    out['M2S_matched_pairs'] = pairs_used
-    out['R_m2s_event_percent'] = round(m2s_received * 100.0 / m2s_sent, 3) if m2s_sent > 0 else 0.0
-    out['R_m2s_pair_percent'] = round(pairs_used * 100.0 / m2s_sent, 3) if m2s_sent > 0 else 0.0
+def read_latency_samples(device_csv='', latency_csv='', m2s_pairs_csv=''):
+    """Timestamped latency samples {'S2M': [(sent_ms, latency_ms)], 'M2S': [...]}.
+
+    Same pairing and sanity limits as read_raw_export_metrics; used to split latency
+    by link-event phase (--link-events / --schedule).
+    """
+    samples = {'S2M': [], 'M2S': []}
+    sent_map, recv_map = {}, {}
+    if m2s_pairs_csv and os.path.exists(m2s_pairs_csv):
+        samples['M2S'] = read_m2s_pairs_export(m2s_pairs_csv)[2]
+    elif latency_csv and os.path.exists(latency_csv):
+        for rec in iter_export_records(latency_csv, fields=('sent_timestamp', 'received_timestamp')):
+            if rec.direction != 'M2S' or not rec.correlation_id or rec.value is None:
+                continue
+            dst = sent_map if rec.field == 'sent_timestamp' else recv_map
+            dst.setdefault(_normalize_request_id(rec.correlation_id), int(rec.value))
+    for corr_id, sent_ts in sent_map.items():
+        if corr_id in recv_map and 0 <= recv_map[corr_id] - sent_ts < 60000:
+            samples['M2S'].append((sent_ts, recv_map[corr_id] - sent_ts))
+
+    if device_csv and os.path.exists(device_csv):
+        sent_by_sensor = {}
+        recv_by_sensor = {}
+        for rec in iter_export_records(device_csv, fields=('sent_timestamp', 'received_timestamp')):
+            if rec.direction != 'S2M' or rec.value is None:
+                continue
+            dst = sent_by_sensor if rec.field == 'sent_timestamp' else recv_by_sensor
+            dst.setdefault(rec.sensor, []).append(int(rec.value))
+        for sensor, sent in sent_by_sensor.items():
+            if sensor in recv_by_sensor:
+                pairs = _fifo_pair_ts(deque(sorted(sent)), deque(sorted(recv_by_sensor[sensor])))
+                samples['S2M'].extend(p for p in pairs if 0 <= p[1] < 10000)
+    return samples
 
+
+def link_phase_metrics(args):
+    """Per-phase latency fields for the summary; also writes the phase/recovery CSVs."""
+    events = load_link_events(args.link_events) if args.link_events else []
+    rows = load_schedule(args.schedule) if args.schedule else []
+    samples = read_latency_samples(args.device_csv, args.latency_csv, args.m2s_pairs_csv)
+    sent = [ts for direction in ('S2M', 'M2S') for ts, _ in samples[direction]]
+    span = (min(sent) / 1000.0, max(sent) / 1000.0) if sent else None
+    windows = build_windows(events, rows, args.start_epoch, span)
+    if not windows:
+        print('[link-phases] no link events or schedule windows; skipped', file=sys.stderr)
+        return {}
+    out = {'link_event_windows': len(windows)}
+    results = {}
+    for direction in ('S2M', 'M2S'):
+        if samples[direction]:
+            results[direction] = segment_latencies(
+                samples[direction], windows, horizon_s=args.recovery_horizon, bucket_s=args.recovery_bucket)
+            out.update(summary_fields(direction, *results[direction]))
+    if results:
+        try:
+            os.makedirs(args.reports_dir, exist_ok=True)
+            for path in write_phase_reports(args.reports_dir, args.profile, results):
+                print(f'[link-phases] wrote {path}', file=sys.stderr)
+        except OSError as e:
+            print(f'[link-phases] failed to write phase reports: {e}', file=sys.stderr)
     return out
 
 
+# Incremental mode (--incremental-state): the pairing state is kept in a small JSON
+# file so new export chunks are folded in without re-reading earlier data. Plain CSVs
+# are resumed from the byte offset reached last time (an export still being appended
+# to works); compressed exports are read once. Results equal a full re-read as long as
+# chunks arrive in time order (every new timestamp >= the pending ones).
+#
+# The state does not grow with the run: latencies are folded into {ms: count}
+# histograms (integer ms, bounded by the sanity limits, so the summary is exact), and
+# M2S correlation ids - paired or still pending - are forgotten once they are
+# M2S_DEDUP_HORIZON_MS older than the newest M2S timestamp seen. A duplicate row
+# arriving later than that, or a response later than that after its command, is
+# counted as a new unpaired row instead of being ignored; both are far beyond the
+# 60 s pairing limit.
+STATE_VERSION = 2
+M2S_DEDUP_HORIZON_MS = 300000
+
+
+def new_metrics_state():
+    return {
+        'version': STATE_VERSION,
+        'files': {},            # {path: {'offset', 'header', 'size'}}
+        'm2s': {
+            'sent_rows': 0,
+            'received': 0,
+            'newest_ms': 0,      # newest M2S timestamp folded so far
+            'pending_sent': {},  # {corr_id: sent_ts_ms} still waiting for a response
+            'pending_recv': {},  # {corr_id: recv_ts_ms} seen before their command
+            'matched': {},       # {corr_id: ts_ms} recently paired (first occurrence wins)
+            'lat_hist': {},      # {latency_ms: count}
+        },
+        's2m': {
+            'received': 0,
+            'sent': 0,
+            'pending_sent': {},  # {sensor: [sent_ts_ms]} FIFO leftovers
+            'pending_recv': {},  # {sensor: [recv_ts_ms]}
+            'lat_hist': {},      # {latency_ms: count}
+        },
+    }
+
+
+def load_metrics_state(state_path):
+    try:
+        with open(state_path) as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return new_metrics_state()
+    if state.get('version') != STATE_VERSION:
+        raise ValueError(f'{state_path}: unsupported state version {state.get("version")}; '
+                         f'remove it to start over')
+    for direction in ('m2s', 's2m'):
+        hist = state[direction]['lat_hist']
+        state[direction]['lat_hist'] = {int(ms): c for ms, c in hist.items()}  # JSON keys are strings
+    return state
+
+
+def save_metrics_state(state_path, state):
+    tmp = f'{state_path}.tmp{os.getpid()}'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, separators=(',', ':'))
+    os.replace(tmp, state_path)
+
+
+def _new_export_rows(state, csv_path):
+    """Rows of ``csv_path`` not folded into ``state`` yet (and mark them as read)."""
+    seen = state['files'].get(csv_path)
+    size = os.path.getsize(csv_path)
+    if csv_path.endswith(('.gz', '.zst')):
+        if seen is not None:
+            if seen['size'] != size:
+                print(f'[incremental] {csv_path} changed but compressed exports cannot be '
+                      f'resumed; pass new data as a new chunk file', file=sys.stderr)
+            return []
+        state['files'][csv_path] = {'offset': size, 'header': None, 'size': size}
+        return list(iter_rows(csv_path))
+    seen = seen or {'offset': 0, 'header': None, 'size': 0}
+    if size < seen['offset']:
+        raise ValueError(f'{csv_path} shrank since the last run; remove the state file to start over')
+    rows, offset, header = read_appended_rows(csv_path, seen['offset'], seen['header'])
+    state['files'][csv_path] = {'offset': offset, 'header': header, 'size': size}
+    return rows
+
+
+def _fold_m2s(m2s, records):
+    matched = m2s['matched']
+    pending_sent = m2s['pending_sent']
+    pending_recv = m2s['pending_recv']
+    hist = m2s['lat_hist']
+    newest = m2s['newest_ms']
+    for rec in records:
+        if rec.direction != 'M2S' or not rec.correlation_id or rec.value is None:
+            continue
+        corr_id = _normalize_request_id(rec.correlation_id)
+        ts = int(rec.value)
+        newest = max(newest, ts)
+        if rec.field == 'sent_timestamp':
+            m2s['sent_rows'] += 1
+            if corr_id in matched or corr_id in pending_sent:
+                continue
+            if corr_id in pending_recv:
+                sent_ts, recv_ts = ts, pending_recv.pop(corr_id)
+            else:
+                pending_sent[corr_id] = ts
+                continue
+        else:
+            if corr_id in matched or corr_id in pending_recv:
+                continue
+            m2s['received'] += 1
+            if corr_id in pending_sent:
+                sent_ts, recv_ts = pending_sent.pop(corr_id), ts
+            else:
+                pending_recv[corr_id] = ts
+                continue
+        matched[corr_id] = max(sent_ts, recv_ts)
+        delta_ms = recv_ts - sent_ts
+        if 0 <= delta_ms < 60000:  # sanity: < 60s
+            hist[delta_ms] = hist.get(delta_ms, 0) + 1
+
+    m2s['newest_ms'] = newest
+    cutoff = newest - M2S_DEDUP_HORIZON_MS
+    for ids in (matched, pending_sent, pending_recv):
+        for corr_id in [c for c, ts in ids.items() if ts < cutoff]:
+            del ids[corr_id]
+
+
+def _fold_s2m(s2m, records):
+    new_sent = {}
+    new_recv = {}
+    for rec in records:
+        if rec.direction != 'S2M':
+            continue
+        if rec.field == 'received_timestamp':
+            s2m['received'] += 1
+        if rec.value is None:
+            continue
+        ts = int(rec.value)
+        if rec.field == 'sent_timestamp':
+            new_sent.setdefault(rec.sensor, []).append(ts)
+            s2m['sent'] += 1
+        else:
+            new_recv.setdefault(rec.sensor, []).append(ts)
+
+    pending_sent = s2m['pending_sent']
+    pending_recv = s2m['pending_recv']
+    hist = s2m['lat_hist']
+    for sensor in set(new_sent) | set(new_recv):
+        sent_q = deque(sorted(pending_sent.pop(sensor, []) + new_sent.get(sensor, [])))
+        recv_q = deque(sorted(pending_recv.pop(sensor, []) + new_recv.get(sensor, [])))
+        for delta_ms in _fifo_pair(sent_q, recv_q):
+            if 0 <= delta_ms < 10000:  # sanity: < 10s
+                hist[delta_ms] = hist.get(delta_ms, 0) + 1
+        if sent_q:
+            pending_sent[sensor] = list(sent_q)
+        if recv_q:
+            pending_recv[sensor] = list(recv_q)
+
+
+def fold_export_chunks(state, device_csv='', latency_csv='', m2s_pairs_csv=''):
+    """Fold the unread part of the exports into ``state`` (in place)."""
+    fields = ('sent_timestamp', 'received_timestamp')
+    if latency_csv and os.path.exists(latency_csv) and not (m2s_pairs_csv and os.path.exists(m2s_pairs_csv)):
+        _fold_m2s(state['m2s'], records_from_rows(_new_export_rows(state, latency_csv), fields=fields))
+    if device_csv and os.path.exists(device_csv):
+        _fold_s2m(state['s2m'], records_from_rows(_new_export_rows(state, device_csv), fields=fields))
+    return state
+
+
+def metrics_from_state(state, m2s_pairs_csv=''):
+    """Same fields as read_raw_export_metrics, from an incremental state."""
+    s2m = state['s2m']
+    m2s = state['m2s']
+    m2s_sent, m2s_received = m2s['sent_rows'], m2s['received']
+    m2s_stats = _histogram_stats(m2s['lat_hist'])
+    if m2s_pairs_csv and os.path.exists(m2s_pairs_csv):
+        # the pushdown file always covers the whole window: it is re-read, not folded
+        m2s_sent, m2s_received, pushdown = read_m2s_pairs_export(m2s_pairs_csv)
+        m2s_stats = _latency_stats([lat_ms / 1000.0 for _, lat_ms in pushdown])
+    return _summary_from_stats(_histogram_stats(s2m['lat_hist']), s2m['received'], s2m['sent'],
+                               m2s_stats, m2s_sent, m2s_received)
+
+
+def read_raw_export_metrics_incremental(state_path, device_csv='', latency_csv='', m2s_pairs_csv=''):
+    """Fold new export data into the state at ``state_path`` and return updated metrics."""
+    state = load_metrics_state(state_path)
+    fold_export_chunks(state, device_csv, latency_csv, m2s_pairs_csv)
+    save_metrics_state(state_path, state)
+    return metrics_from_state(state, m2s_pairs_csv)
+
+
+def _read_export_columns(csv_path, columns):
+    """Read selected columns of an export as parallel lists of strings.
+
+    Rows come from the column cache when available (``_value`` then arrives as a float
+    array, NaN where missing), else from _influx_csv.iter_rows, so multi-table exports
+    are re-keyed per table like the Python backend. Columns missing from every table
+    are reported as None so callers can apply their own defaults.
+    """
+    cached = load_columns(csv_path)
+    if cached is not None:
+        out = {}
+        for c in columns:
+            if c == '_value':
+                value = np.asarray(cached['value'], dtype=np.float64)
+                out[c] = np.where(cached['has_value'], value, np.nan)
+            else:
+                out[c] = decode(cached, c.lstrip('_'))
+        return out
+    cols = {c: [] for c in columns}
+    seen = set()
+    last_columns = None
+    picks = ()
+    for header, row in iter_rows(csv_path):
+        if header is not last_columns:
+            last_columns = header
+            picks = [(cols[c], header.get(c)) for c in columns]
+            seen.update(c for c in columns if c in header)
+        for dst, i in picks:
+            dst.append(row[i] if i is not None else '')
+    for c in columns:
+        if c not in seen:
+            cols[c] = None
+    return cols
+
+
+def _export_column(cols, name, default=''):
+    """Column from _read_export_columns as an array (object for strings, float for a cached _value)."""
+    values = cols[name]
+    if values is None:
+        n = len(next((c for c in cols.values() if c is not None), []))
+        return np.asarray([default] * n, dtype=object)
+    if isinstance(values, np.ndarray) and values.dtype.kind == 'f':
+        return values
+    return np.asarray(values, dtype=object)
+
+
+def _parse_ts_array(values):
+    """Vectorized int(float(v)); returns (int64 array, valid mask)."""
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iuf':
+        f = values.astype(np.float64)
+    else:
+        arr = np.asarray(values, dtype=object)
+        try:
+            f = arr.astype(np.float64)
+        except (ValueError, TypeError):
+            f = np.empty(len(arr), dtype=np.float64)
+            for i, v in enumerate(arr):
+                try:
+                    f[i] = float(v)
+                except (ValueError, TypeError):
+                    f[i] = np.nan
+    valid = np.isfinite(f)
+    ts = np.zeros(len(f), dtype=np.int64)
+    ts[valid] = f[valid].astype(np.int64)
+    return ts, valid
+
+
+def _strip_quotes(arr):
+    return np.char.strip(np.char.strip(arr.astype(str)), '"')
+
+
+def _fifo_pair_sorted(sent, recv):
+    """FIFO-pair sorted sent/recv arrays: each sent takes the earliest unused recv >= sent.
+
+    Equivalent to the deque loop of the Python backend: the matched recv index is
+    j_i = max(j_{i-1} + 1, searchsorted(recv, sent_i)), i.e. i + cummax(lb - i).
+    """
+    if sent.size == 0 or recv.size == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    lb = np.searchsorted(recv, sent, side='left')
+    steps = np.arange(sent.size)
+    j = steps + np.maximum.accumulate(lb - steps)
+    ok = j < recv.size
+    return sent[ok], recv[j[ok]]
+
+
+def read_raw_export_metrics_numpy(device_csv='', latency_csv='', m2s_pairs_csv=''):
+    """NumPy implementation of read_raw_export_metrics.
+
+    Only the pairing is vectorized: M2S pairs are joined by correlation_id with
+    np.unique/intersect1d and S2M pairs are FIFO-matched per sensor on sorted arrays.
+    The latencies and counts then go through _raw_metrics_dict like the pure-Python
+    backend, which stays the reference.
+    """
+    if np is None:
+        raise RuntimeError('numpy backend requested but numpy is not installed')
+    m2s_sent = 0
+    m2s_received = 0
+    m2s_lat = np.empty(0, dtype=np.float64)
+
+    if m2s_pairs_csv and os.path.exists(m2s_pairs_csv):
+        m2s_sent, m2s_received, pushdown = read_m2s_pairs_export(m2s_pairs_csv)
+        m2s_lat = np.array([lat_ms for _, lat_ms in pushdown], dtype=np.int64) / 1000.0
+    elif latency_csv and os.path.exists(latency_csv):
+        cols = _read_export_columns(
+            latency_csv, ('direction', 'correlation_id', 'request_id', 'source', 'sensor', 'dt_id', '_field', '_value'))
+
+        direction = _export_column(cols, 'direction')
+        corr = _export_column(cols, 'correlation_id')
+        req = _export_column(cols, 'request_id')
+        corr = np.where(corr.astype(bool), corr, np.where(req.astype(bool), req, ''))
+        source = _export_column(cols, 'source')
+        sensor = np.char.strip(_export_column(cols, 'sensor').astype(str))
+        dt_id = _export_column(cols, 'dt_id')
+
+        # Recover shifted M2S rows (see read_raw_export_metrics for the layout).
+        maybe_shifted = (
+            (direction != 'M2S')
+            & ~source.astype(bool)
+            & np.isin(sensor, ('middts', 'simulator'))
+            & (_strip_quotes(corr) == 'M2S')
+        )
+        for i in np.flatnonzero(maybe_shifted):
+            if _looks_like_uuid(dt_id[i]):
+                direction[i] = 'M2S'
+                corr[i] = dt_id[i]
+
+        field = _export_column(cols, '_field')
+        is_sent = field == 'sent_timestamp'
+        is_recv = field == 'received_timestamp'
+        keep = (direction == 'M2S') & (is_sent | is_recv) & corr.astype(bool)
+        ts, ts_ok = _parse_ts_array(_export_column(cols, '_value', '0')[keep])
+        corr_k = _strip_quotes(corr[keep])[ts_ok]
+        ts = ts[ts_ok]
+        is_sent = is_sent[keep][ts_ok]
+        is_recv = is_recv[keep][ts_ok]
+
+        m2s_sent = int(is_sent.sum())
+        # np.unique returns the index of the first occurrence -> first one wins
+        sent_ids, sent_first = np.unique(corr_k[is_sent], return_index=True)
+        recv_ids, recv_first = np.unique(corr_k[is_recv], return_index=True)
+        m2s_received = int(recv_ids.size)
+        _, si, ri = np.intersect1d(sent_ids, recv_ids, assume_unique=True, return_indices=True)
+        dt_s = (ts[is_recv][recv_first[ri]] - ts[is_sent][sent_first[si]]) / 1000.0
+        m2s_lat = dt_s[(dt_s >= 0) & (dt_s < 60)]
+
+    s2m_received = 0
+    s2m_sent_count = 0
+    s2m_lat = np.empty(0, dtype=np.float64)
+    if device_csv and os.path.exists(device_csv):
+        cols = _read_export_columns(device_csv, ('direction', 'sensor', 'request_id', 'source', '_field', '_value'))
+
+        field = _export_column(cols, '_field')
+        s2m = _export_column(cols, 'direction') == 'S2M'
+        s2m_received = int((s2m & (field == 'received_timestamp')).sum())
+
+        sensor = _export_column(cols, 'sensor')[s2m]
+        req = _export_column(cols, 'request_id')[s2m]
+        source = _export_column(cols, 'source')[s2m]
+        field = field[s2m]
+        maybe_shifted = ~source.astype(bool) & np.isin(np.char.strip(sensor.astype(str)), ('middts', 'simulator'))
+        for i in np.flatnonzero(maybe_shifted):
+            if _looks_like_uuid(req[i]):
+                sensor[i] = str(req[i]).strip().strip('"')
+
+        ts, ts_ok = _parse_ts_array(_export_column(cols, '_value', '0')[s2m])
+        is_sent = (field == 'sent_timestamp') & ts_ok
+        is_recv = (field == 'received_timestamp') & ts_ok
+        s2m_sent_count = int(is_sent.sum())
+
+        # Group by sensor with one lexsort per side, then FIFO-pair each group.
+        codes, inv = np.unique(sensor, return_inverse=True)
+        sent_code, sent_ts = inv[is_sent], ts[is_sent]
+        recv_code, recv_ts = inv[is_recv], ts[is_recv]
+        so = np.lexsort((sent_ts, sent_code))
+        ro = np.lexsort((recv_ts, recv_code))
+        sent_code, sent_ts = sent_code[so], sent_ts[so]
+        recv_code, recv_ts = recv_code[ro], recv_ts[ro]
+        group_ids = np.arange(codes.size)
+        s_bounds = np.searchsorted(sent_code, np.r_[group_ids, codes.size])
+        r_bounds = np.searchsorted(recv_code, np.r_[group_ids, codes.size])
+        chunks = []
+        for g in group_ids:
+            s_pair, r_pair = _fifo_pair_sorted(sent_ts[s_bounds[g]:s_bounds[g + 1]],
+                                               recv_ts[r_bounds[g]:r_bounds[g + 1]])
+            if s_pair.size:
+                chunks.append((r_pair - s_pair) / 1000.0)
+        if chunks:
+            dt = np.concatenate(chunks)
+            s2m_lat = dt[(dt >= 0) & (dt < 10)]
+
+    # same summary code as the Python backend, so the two cannot drift apart
+    return _raw_metrics_dict(s2m_lat.tolist(), s2m_received, s2m_sent_count,
+                             m2s_lat.tolist(), m2s_sent, m2s_received)
+
+
+def compare_raw_metrics(reference, candidate, abs_tol=0.01):
+    """Return [(key, reference_value, candidate_value)] for keys that disagree."""
+    diffs = []
+    for key in sorted(set(reference) | set(candidate)):
+        a = reference.get(key)
+        b = candidate.get(key)
+        if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+            if abs(a - b) <= abs_tol:
+                continue
+        elif a == b:
+            continue
+        diffs.append((key, a, b))
+    return diffs
+
+
 def read_per_sensor_stats(path_pattern):
     pairs = []
     medians_with_counts = []
@@ -422,6 +939,36 @@ def append_summary(summary_path, fields):
         return False
 
 
+def update_summary(summary_path, fields):
+    """Like append_summary, but replaces ``key: value`` lines written by a previous run.
+
+    Used by --incremental-state, which re-emits the same keys after every chunk.
+    """
+    print("# Computed run metrics (from _compute_run_metrics.py)")
+    for k, v in fields.items():
+        print(f"{k}: {v}")
+    try:
+        with open(summary_path) as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        lines = []
+    pending = dict(fields)
+    for i, line in enumerate(lines):
+        key = line.split(':', 1)[0].strip()
+        if ':' in line and key in pending:
+            lines[i] = f"{key}: {pending.pop(key)}"
+    lines.extend(f"{k}: {v}" for k, v in pending.items())
+    try:
+        tmp = f"{summary_path}.tmp{os.getpid()}"
+        with open(tmp, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp, summary_path)
+        return True
+    except Exception as e:
+        print(f"Failed to update summary: {e}", file=sys.stderr)
+        return False
+
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--reports-dir', required=True)
@@ -430,8 +977,30 @@ def main():
     p.add_argument('--odte', required=False, default='')
     p.add_argument('--device-csv', required=False, default='')
     p.add_argument('--latency-csv', required=False, default='')
+    p.add_argument('--m2s-pairs-csv', required=False, default='',
+                   help='M2S pairs from influx_export.py --mode m2s-pairs (used instead of --latency-csv for M2S)')
     p.add_argument('--min-count', required=False, default=5, type=int, help='Minimum samples per sensor to include in median-of-medians')
+    p.add_argument('--backend', choices=('python', 'numpy', 'auto'), default='python',
+                   help='Raw CSV pairing backend (auto = numpy when installed)')
+    p.add_argument('--cross-check', action='store_true',
+                   help='Run both raw CSV backends and report any metric that differs (stderr)')
+    p.add_argument('--incremental-state', required=False, default='',
+                   help='JSON state file: fold only the export data added since the last run '
+                        '(pass growing CSVs or new time-ordered chunk files) and update --summary in place; '
+                        'always uses the Python pairing')
+    p.add_argument('--link-events', required=False, default='',
+                   help='link_events.jsonl of the run: split latency into baseline/down/degrade/recovery phases')
+    p.add_argument('--schedule', required=False, default='',
+                   help='link_schedule.csv: planned windows for event kinds missing from --link-events')
+    p.add_argument('--start-epoch', required=False, default=None, type=float,
+                   help='Run start epoch for --schedule offsets (default: inferred from --link-events)')
+    p.add_argument('--recovery-bucket', required=False, default=5.0, type=float,
+                   help='Bucket (s) of the rolling P95 used for time-to-recover')
+    p.add_argument('--recovery-horizon', required=False, default=300.0, type=float,
+                   help='Longest recovery phase (s) after a down/degrade window')
     args = p.parse_args()
+    if args.incremental_state and args.backend == 'numpy':
+        p.error('--incremental-state folds chunks with the Python pairing; it cannot be combined with --backend numpy')
     out = {}
     s2m_pairs, s2m_medians_with_counts = read_per_sensor_stats(os.path.join(args.reports_dir, '*simulator_to_middts*.csv'))
     mean_s2m, s2m_count = weighted_mean(s2m_pairs)
@@ -477,8 +1046,36 @@ def main():
     # Always run raw CSV analysis when CSVs are available.
     # Per-sensor stats (from generated_reports) provide better mean/count if available.
     # Raw CSV pairing provides matched_pairs, percentiles, AoT/TF which per-sensor stats lack.
-    if args.device_csv and args.latency_csv:
-        raw = read_raw_export_metrics(args.device_csv, args.latency_csv)
+    if args.device_csv and (args.latency_csv or args.m2s_pairs_csv):
+        backend = args.backend
+        if backend == 'auto':
+            backend = 'numpy' if np is not None else 'python'
+        csvs = (args.device_csv, args.latency_csv, args.m2s_pairs_csv)
+        if args.incremental_state:
+            raw = read_raw_export_metrics_incremental(args.incremental_state, *csvs)
+        elif backend == 'numpy':
+            raw = read_raw_export_metrics_numpy(*csvs)
+        else:
+            raw = read_raw_export_metrics(*csvs)
+        if args.cross_check and np is not None:
+            reference = raw if backend == 'python' else read_raw_export_metrics(*csvs)
+            candidate = raw if backend == 'numpy' else read_raw_export_metrics_numpy(*csvs)
+            diffs = compare_raw_metrics(reference, candidate)
+            for key, a, b in diffs:
+                print(f'[cross-check] {key}: python={a} numpy={b}', file=sys.stderr)
+            if not diffs:
+                print('[cross-check] python and numpy backends agree', file=sys.stderr)
+        elif args.cross_check:
+            print('[cross-check] numpy not installed; skipped', file=sys.stderr)
+        if args.cross_check and args.m2s_pairs_csv and args.latency_csv:
+            # pushdown pairs vs pairing the raw latency export in Python
+            from_raw = read_raw_export_metrics(args.device_csv, args.latency_csv)
+            diffs = [d for d in compare_raw_metrics(from_raw, raw) if 'M2S' in d[0] or d[0] in (
+                'aot_mean_ms', 'aot_p95_ms', 'twin_fidelity_pct', 'R_m2s_event_percent', 'R_m2s_pair_percent')]
+            for key, a, b in diffs:
+                print(f'[cross-check] {key}: raw={a} pushdown={b}', file=sys.stderr)
+            if not diffs:
+                print('[cross-check] raw and pushdown M2S metrics agree', file=sys.stderr)
         if out.get('S2M_total_count', 0) == 0 and out.get('M2S_total_count', 0) == 0:
             # No generated reports at all — full fallback
             out.update(raw)
@@ -496,7 +1093,13 @@ def main():
                 if key in raw:
                     out[key] = raw[key]
 
-    append_summary(args.summary, out)
+    if (args.link_events or args.schedule) and (args.device_csv or args.latency_csv or args.m2s_pairs_csv):
+        out.update(link_phase_metrics(args))
+
+    if args.incremental_state:
+        update_summary(args.summary, out)
+    else:
+        append_summary(args.summary, out)
 
 
 if __name__ == '__main__':
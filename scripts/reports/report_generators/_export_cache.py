@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""Columnar on-disk cache for Influx CSV exports.
+
+Every report script used to re-parse ``<profile>_<ts>_device_data.csv`` /
+``_latency_measurement.csv`` from text. The first reader now converts the export
+into a directory of NumPy ``.npy`` columns next to the CSV (``<csv>.cols/``) and
+later readers memory-map it:
+
+- ``time_ms``: ``_time`` as int64 epoch milliseconds (``TIME_MISSING`` if unparseable);
+- ``value`` + ``has_value``: ``_value`` as int64 when every value is integral (the
+  usual case: ms timestamps), float64 otherwise;
+- string columns (measurement, field, direction, sensor, source, correlation_id,
+  request_id, dt_id) dictionary-encoded as int32 codes + a categories array.
+
+The cache is keyed by CSV size, mtime and a hash of its head/tail, so a re-exported
+file is rebuilt automatically. Columns hold the raw values (``correlation_id``
+already falls back to ``request_id``); the column-shift repair of
+``_influx_csv.recover_shifted`` is applied when reading records.
+
+numpy is optional: without it (or with EXPORT_CACHE=0) readers stream the CSV.
+"""
+import hashlib
+import json
+import os
+import shutil
+from datetime import datetime, timezone
+
+from _influx_csv import ExportRecord, iter_records, recover_shifted, rfc3339_to_ns
+
+try:
+    import numpy as np
+except ImportError:  # optional: the CSV streaming path is used instead
+    np = None
+
+CACHE_SUFFIX = '.cols'
+FORMAT_VERSION = 1
+STRING_COLUMNS = ('measurement', 'field', 'direction', 'sensor', 'source',
+                  'correlation_id', 'request_id', 'dt_id')
+TIME_MISSING = -(2 ** 63)
+_HASH_SPAN = 1 << 20
+_CHUNK = 1 << 16
+
+
+def cache_enabled():
+    return np is not None and os.environ.get('EXPORT_CACHE', '1') != '0'
+
+
+def cache_dir(csv_path):
+    return csv_path + CACHE_SUFFIX
+
+
+def _file_key(csv_path):
+    """(size, mtime_ns, blake2b of the first/last MiB) identifying one export file."""
+    st = os.stat(csv_path)
+    h = hashlib.blake2b(digest_size=16)
+    with open(csv_path, 'rb') as f:
+        h.update(f.read(_HASH_SPAN))
+        if st.st_size > 2 * _HASH_SPAN:
+            f.seek(-_HASH_SPAN, os.SEEK_END)
+            h.update(f.read(_HASH_SPAN))
+    return {'version': FORMAT_VERSION, 'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns, 'hash': h.hexdigest()}
+
+
+def rfc3339_to_ns_array(times):
+    """Influx ``_time`` strings -> int64 epoch ns array (``TIME_MISSING`` if unparseable).
+
+    The whole column goes through one ``datetime64[ns]`` conversion; only if some cell
+    is not plain RFC3339 are the cells parsed one by one (``rfc3339_to_ns``, then
+    ``datetime.fromisoformat`` for other ISO-8601 forms).
+    """
+    try:
+        arr = np.array([t[:-1] if t.endswith('Z') else t for t in times], dtype='datetime64[ns]')
+    except ValueError:
+        pass
+    else:
+        # empty cells parse as NaT: mark them explicitly rather than rely on NaT's int64 value
+        return np.where(np.isnat(arr), TIME_MISSING, arr.astype(np.int64))
+    out = np.full(len(times), TIME_MISSING, dtype=np.int64)
+    for i, t in enumerate(times):
+        ns = rfc3339_to_ns(t)
+        if ns is None:
+            try:
+                dt = datetime.fromisoformat(t.replace('Z', '+00:00'))
+            except ValueError:
+                continue
+            if dt.tzinfo is None:
+                dt = dt.replace(tzinfo=timezone.utc)
+            ns = int(dt.timestamp() * 1000) * 1_000_000
+        out[i] = ns
+    return out
+
+
+def _parse_times_ms(times):
+    ns = rfc3339_to_ns_array(times)
+    return np.where(ns == TIME_MISSING, TIME_MISSING, ns // 1_000_000)
+
+
+def build_cache(csv_path):
+    """Parse ``csv_path`` once and write its column cache; returns the columns dict."""
+    strings = {name: ([], {}) for name in STRING_COLUMNS}
+    times = []
+    values = []
+    for rec in iter_records(csv_path, recover=False):
+        for name in STRING_COLUMNS:
+            codes, lookup = strings[name]
+            v = getattr(rec, name)
+            code = lookup.get(v)
+            if code is None:
+                code = lookup[v] = len(lookup)
+            codes.append(code)
+        times.append(rec.time)
+        values.append(rec.value)
+
+    cols = {'time_ms': _parse_times_ms(times)}
+    has_value = np.array([v is not None for v in values], dtype=bool)
+    integral = all(isinstance(v, int) for v in values if v is not None)
+    cols['value'] = np.array([v if v is not None else 0 for v in values],
+                             dtype=np.int64 if integral else np.float64)
+    cols['has_value'] = has_value
+    for name, (codes, lookup) in strings.items():
+        cols[name + '.codes'] = np.array(codes, dtype=np.int32)
+        cols[name + '.categories'] = np.array(list(lookup), dtype=str)
+
+    target = cache_dir(csv_path)
+    tmp = f'{target}.tmp{os.getpid()}'
+    try:
+        os.makedirs(tmp, exist_ok=True)
+        for name, arr in cols.items():
+            np.save(os.path.join(tmp, name + '.npy'), arr)
+        with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+            json.dump(_file_key(csv_path), f)
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(tmp, target)
+    except OSError:
+        # read-only results dir etc.: the columns are still returned in memory
+        shutil.rmtree(tmp, ignore_errors=True)
+    return cols
+
+
+def _load_cache(csv_path):
+    target = cache_dir(csv_path)
+    try:
+        with open(os.path.join(target, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta != _file_key(csv_path):
+            return None
+        cols = {}
+        for name in ('time_ms', 'value', 'has_value'):
+            cols[name] = np.load(os.path.join(target, name + '.npy'), mmap_mode='r')
+        for name in STRING_COLUMNS:
+            cols[name + '.codes'] = np.load(os.path.join(target, name + '.codes.npy'), mmap_mode='r')
+            cols[name + '.categories'] = np.load(os.path.join(target, name + '.categories.npy'))
+        return cols
+    except (OSError, ValueError):
+        return None
+
+
+def load_columns(csv_path):
+    """Columns of ``csv_path`` from the cache (building it if missing or stale).
+
+    Returns None when the cache is disabled or numpy is not installed.
+    """
+    if not cache_enabled():
+        return None
+    cols = _load_cache(csv_path)
+    if cols is None:
+        cols = build_cache(csv_path)
+    return cols
+
+
+def decode(cols, name):
+    """Object array of the original strings of a dictionary-encoded column."""
+    categories = cols[name + '.categories'].astype(object)
+    return categories[cols[name + '.codes']]
+
+
+def _isin_column(cols, name, wanted):
+    categories = cols[name + '.categories']
+    hit = np.array([c in wanted for c in categories.tolist()], dtype=bool)
+    if not hit.size:
+        return np.zeros(len(cols[name + '.codes']), dtype=bool)
+    return hit[cols[name + '.codes']]
+
+
+def iter_export_records(csv_path, measurements=None, fields=None, recover=True):
+    """Drop-in for ``_influx_csv.iter_records`` that prefers the column cache.
+
+    Records read from the cache carry ``time_ms`` (epoch ms, None if unparseable) and
+    an empty ``time`` string.
+    """
+    cols = load_columns(csv_path)
+    if cols is None:
+        yield from iter_records(csv_path, measurements=measurements, fields=fields, recover=recover)
+        return
+
+    keep = np.ones(len(cols['time_ms']), dtype=bool)
+    if measurements is not None:
+        keep &= _isin_column(cols, 'measurement', set(measurements))
+    if fields is not None:
+        keep &= _isin_column(cols, 'field', set(fields))
+    rows = np.flatnonzero(keep)
+
+    categories = {name: cols[name + '.categories'].tolist() for name in STRING_COLUMNS}
+    for start in range(0, rows.size, _CHUNK):
+        idx = rows[start:start + _CHUNK]
+        decoded = [[categories[name][c] for c in cols[name + '.codes'][idx].tolist()]
+                   for name in STRING_COLUMNS]
+        meas, field, direction, sensor, source, corr, req, dt_id = decoded
+        values = cols['value'][idx].tolist()
+        has_value = cols['has_value'][idx].tolist()
+        times = cols['time_ms'][idx].tolist()
+        for i in range(len(idx)):
+            d, s, c = direction[i], sensor[i], corr[i]
+            if recover:
+                d, s, c = recover_shifted(d, s, source[i], c, req[i], dt_id[i])
+            t = times[i]
+            yield ExportRecord(meas[i], field[i], values[i] if has_value[i] else None, '',
+                               d, s, source[i], c, req[i], dt_id[i],
+                               t if t != TIME_MISSING else None)
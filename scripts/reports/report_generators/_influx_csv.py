@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""Streaming reader for Influx annotated-CSV exports.
+
+The exports written by apply_slice.sh (``<profile>_<ts>_device_data.csv`` and
+``<profile>_<ts>_latency_measurement.csv``) are Influx annotated CSV: one or more
+tables, each starting with a header row (``,result,table,_start,...``), optionally
+preceded by ``#datatype``/``#group``/``#default`` annotation rows and separated by
+blank lines. Tables do not always share the same column layout.
+
+This module reads them in a single pass and constant memory:
+
+- ``iter_rows(path)`` yields ``(columns, row)`` where ``columns`` maps column name ->
+  position for the table the row belongs to;
+- ``iter_records(path)`` yields compact ``ExportRecord`` tuples with ``value`` parsed
+  as a number and the column-shift recovery applied (see ``recover_shifted``);
+- ``read_appended_rows(path, offset, header)`` returns only the rows appended since a
+  previous read, for incremental consumers (``records_from_rows`` turns them into
+  records).
+
+Exports may be stored compressed (``.csv.gz`` / ``.csv.zst``, see influx_export.py
+--compress); ``open_export`` decompresses them while streaming.
+"""
+import calendar
+import csv
+import gzip
+import io
+import re
+import shutil
+import subprocess
+from collections import namedtuple
+from functools import lru_cache
+
+try:
+    import zstandard
+except ImportError:  # optional: falls back to the zstd CLI for .zst exports
+    zstandard = None
+
+# time_ms is only filled by readers that already hold parsed times (the column cache)
+ExportRecord = namedtuple('ExportRecord', (
+    'measurement', 'field', 'value', 'time',
+    'direction', 'sensor', 'source', 'correlation_id', 'request_id', 'dt_id', 'time_ms',
+), defaults=(None,))
+
+_UUID_RE = re.compile(r'^[0-9a-fA-F-]{32,36}$')
+_SHIFT_SENSORS = ('middts', 'simulator')
+
+
+def normalize_id(raw):
+    """Strip whitespace and (possibly nested) double quotes from an id cell."""
+    if raw is None:
+        return ''
+    req = str(raw).strip()
+    req = req.strip('"')
+    while len(req) >= 2 and req.startswith('"') and req.endswith('"'):
+        req = req[1:-1].strip()
+    return req
+
+
+def looks_like_uuid(raw):
+    if not raw:
+        return False
+    value = str(raw).strip().strip('"')
+    return bool(_UUID_RE.match(value))
+
+
+def parse_value(raw):
+    """Influx ``_value`` cell -> int (timestamps/counters) or float; None if not numeric."""
+    if raw is None or raw == '':
+        return None
+    try:
+        return int(raw)
+    except ValueError:
+        pass
+    try:
+        num = float(raw)
+    except ValueError:
+        return None
+    if num != num or num in (float('inf'), float('-inf')):
+        return None
+    return num
+
+
+_MINUTE_RE = re.compile(r'(\d{4})-(\d{2})-(\d{2})T(\d{2}):(\d{2})\Z', re.ASCII)
+_FRAC_SCALE = tuple(10 ** (9 - n) for n in range(10))
+
+
+@lru_cache(maxsize=4096)
+def _minute_epoch_ns(prefix):
+    """``YYYY-MM-DDTHH:MM`` -> epoch ns of that UTC minute, or None if not a valid date."""
+    m = _MINUTE_RE.match(prefix)
+    if m is None:
+        return None
+    year, month, day, hour, minute = map(int, m.groups())
+    if not (1 <= month <= 12 and 1 <= day <= calendar.monthrange(year, month)[1]
+            and hour < 24 and minute < 60):
+        return None
+    return calendar.timegm((year, month, day, hour, minute, 0)) * 1_000_000_000
+
+
+def rfc3339_to_ns(s):
+    """Influx ``_time`` (``2024-05-01T12:34:56[.fraction]Z``) -> int epoch ns, else None.
+
+    Only the UTC forms Influx emits are accepted; anything else returns None so callers
+    can fall back to a general ISO-8601 parser. The date/hour/minute prefix is shared by
+    every row of the same minute and cached, so a row costs a few slices and int()s and
+    never raises.
+    """
+    n = len(s)
+    if n < 20 or s[-1] != 'Z' or s[16] != ':':
+        return None
+    base = _minute_epoch_ns(s[:16])
+    sec = s[17:19]
+    if base is None or not (sec.isdigit() and sec.isascii()) or sec > '60':
+        return None
+    if n == 20:
+        return base + int(sec) * 1_000_000_000
+    frac = s[20:-1]
+    if s[19] != '.' or not 0 < len(frac) <= 9 or not (frac.isdigit() and frac.isascii()):
+        return None
+    return base + int(sec) * 1_000_000_000 + int(frac) * _FRAC_SCALE[len(frac)]
+
+
+def open_export(csv_path):
+    """Open an export for text reading, decompressing .gz/.zst on the fly."""
+    if csv_path.endswith('.gz'):
+        return gzip.open(csv_path, 'rt', newline='')
+    if csv_path.endswith('.zst'):
+        if zstandard is not None:
+            raw = zstandard.ZstdDecompressor().stream_reader(open(csv_path, 'rb'), closefd=True)
+            return io.TextIOWrapper(raw, newline='')
+        if shutil.which('zstd') is None:
+            raise RuntimeError(f'cannot read {csv_path}: install the zstandard module or the zstd CLI')
+        proc = subprocess.Popen(['zstd', '-dcq', csv_path], stdout=subprocess.PIPE)
+        return _PipeText(proc)
+    return open(csv_path, newline='')
+
+
+class _PipeText(io.TextIOWrapper):
+    """Text stream over a decompressor's stdout that reaps the process on close."""
+
+    def __init__(self, proc):
+        super().__init__(proc.stdout, newline='')
+        self._proc = proc
+
+    def close(self):
+        try:
+            super().close()
+        finally:
+            self._proc.kill()
+            self._proc.wait()
+
+
+def _is_header(row):
+    cells = {cell.strip() for cell in row}
+    # raw exports always carry _measurement/_value; reduced query results (pivots,
+    # counts) at least keep Influx's leading result/table columns
+    return '_measurement' in cells or '_value' in cells or {'result', 'table'} <= cells
+
+
+def _iter_table_rows(lines, cursor):
+    """Core row loop over text lines; ``cursor['header']`` carries the current table header."""
+    header = cursor.get('header')
+    columns = {name: i for i, name in enumerate(header) if name} if header else None
+    width = len(header) if header else 0
+    for row in csv.reader(lines):
+        if not row or row[0].startswith('#'):
+            continue
+        if _is_header(row):
+            header = cursor['header'] = [h.strip() for h in row]
+            columns = {name: i for i, name in enumerate(header) if name}
+            width = len(header)
+            continue
+        if columns is None:
+            continue
+        if len(row) < width:
+            row = row + [''] * (width - len(row))
+        yield columns, row
+
+
+def iter_rows(csv_path):
+    """Yield ``(columns, row)`` for every data row of an annotated-CSV export.
+
+    A new header row re-keys ``columns`` so multi-table exports with different layouts
+    are read correctly. Short rows are padded with '' up to the header width.
+    """
+    with open_export(csv_path) as f:
+        yield from _iter_table_rows(f, {})
+
+
+def iter_text_rows(lines):
+    """``iter_rows`` over text already in memory (e.g. an HTTP response body's lines)."""
+    return _iter_table_rows(lines, {})
+
+
+def read_appended_rows(csv_path, offset=0, header=None):
+    """Rows added to a plain-text export since byte ``offset``.
+
+    ``header`` is the table header in effect at ``offset`` (as returned by a previous
+    call). Only complete lines are consumed, so a row still being written is picked up
+    next time. Returns ``([(columns, row)], new_offset, header)``.
+    """
+    with open(csv_path, 'rb') as f:
+        f.seek(offset)
+        data = f.read()
+    end = data.rfind(b'\n') + 1
+    cursor = {'header': header}
+    rows = list(_iter_table_rows(io.StringIO(data[:end].decode('utf-8', errors='replace'), newline=''), cursor))
+    return rows, offset + end, cursor['header']
+
+
+def recover_shifted(direction, sensor, source, correlation_id, request_id, dt_id):
+    """Undo the column shift seen in some exported rows.
+
+    - M2S rows from latency_measurement sometimes arrive with correlation_id='M2S',
+      sensor='middts'/'simulator', source='' and the real correlation UUID in dt_id;
+    - S2M rows from device_data carry sensor='middts'/'simulator', source='' and the
+      sensor UUID in request_id.
+
+    Returns the (direction, sensor, correlation_id) triple to use.
+    """
+    if source or sensor.strip() not in _SHIFT_SENSORS:
+        return direction, sensor, correlation_id
+    if direction != 'M2S' and normalize_id(correlation_id) == 'M2S' and looks_like_uuid(dt_id):
+        return 'M2S', sensor, dt_id
+    if direction == 'S2M' and looks_like_uuid(request_id):
+        return direction, normalize_id(request_id), correlation_id
+    return direction, sensor, correlation_id
+
+
+def records_from_rows(rows, measurements=None, fields=None, recover=True):
+    """Turn ``(columns, row)`` pairs into ``ExportRecord`` tuples (see iter_records)."""
+    names = ('_measurement', '_field', '_value', '_time',
+             'direction', 'sensor', 'source', 'correlation_id', 'request_id', 'dt_id')
+    last_columns = None
+    idx = None
+    for columns, row in rows:
+        if columns is not last_columns:
+            last_columns = columns
+            idx = [columns.get(name) for name in names]
+        meas, field, value, t, direction, sensor, source, corr, req, dt_id = (
+            row[i] if i is not None else '' for i in idx)
+        if measurements is not None and meas not in measurements:
+            continue
+        if fields is not None and field not in fields:
+            continue
+        corr = corr or req
+        if recover:
+            direction, sensor, corr = recover_shifted(direction, sensor, source, corr, req, dt_id)
+        yield ExportRecord(meas, field, parse_value(value), t,
+                           direction, sensor, source, corr, req, dt_id)
+
+
+def iter_records(csv_path, measurements=None, fields=None, recover=True):
+    """Yield one ``ExportRecord`` per data row, in file order.
+
+    ``measurements``/``fields`` optionally restrict the rows yielded (checked before any
+    parsing). ``correlation_id`` falls back to ``request_id`` when empty, matching how
+    the metric scripts pair M2S events; with ``recover=True`` shifted rows are repaired
+    via ``recover_shifted``. ``value`` is parsed with ``parse_value``.
+    """
+    return records_from_rows(iter_rows(csv_path), measurements, fields, recover)
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""Mergeable latency quantile sketches.
+
+The ``latencia_stats_*`` CSVs only hold per-sensor summaries, and a count-weighted
+average of per-sensor P95 is not the P95 of the pooled latencies. Alongside those CSVs
+generate_reports_from_export.py now writes ``<profile>_latencia_sketch_<direction>_<ts>.json``
+with one sketch per sensor; merging sketches gives global percentiles across sensors,
+scenarios and suites in O(sensors), without the raw exports.
+
+``LatencySketch`` is a log-bucketed histogram with relative accuracy ``alpha`` (the
+DDSketch layout): a value x > 0 falls in bucket ceil(log_gamma(x)) with
+gamma = (1 + alpha) / (1 - alpha), so any quantile is returned within ``alpha``
+relative error. Values <= 0 are counted separately. Count, sum, min and max are exact.
+Sketches with the same ``alpha`` merge by adding bucket counts, so the result does
+not depend on how the data was split.
+
+Merge sidecar files from the command line:
+  python3 _latency_sketch.py results/*/generated_reports/*latencia_sketch_simulator_to_middts_*.json
+"""
+import argparse
+import glob
+import json
+import math
+import os
+import sys
+
+DEFAULT_ALPHA = 0.01
+FORMAT_VERSION = 1
+
+
+class LatencySketch:
+    def __init__(self, alpha=DEFAULT_ALPHA):
+        self.alpha = alpha
+        self._gamma = (1 + alpha) / (1 - alpha)
+        self._log_gamma = math.log(self._gamma)
+        self.bins = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value, n=1):
+        if value > 0:
+            idx = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[idx] = self.bins.get(idx, 0) + n
+        else:
+            self.zero += n
+        self.count += n
+        self.sum += value * n
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def extend(self, values):
+        for v in values:
+            self.add(v)
+        return self
+
+    def merge(self, other):
+        if other.alpha != self.alpha:
+            raise ValueError(f'cannot merge sketches with alpha {self.alpha} and {other.alpha}')
+        for idx, n in other.bins.items():
+            self.bins[idx] = self.bins.get(idx, 0) + n
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        """Value at rank int(q * count) (the index convention of the report scripts)."""
+        if not self.count:
+            return 0.0
+        rank = min(int(q * self.count), self.count - 1)
+        if rank < self.zero:
+            return 0.0 if self.min >= 0 else self.min
+        seen = self.zero
+        for idx in sorted(self.bins):
+            seen += self.bins[idx]
+            if seen > rank:
+                value = 2 * self._gamma ** idx / (self._gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self):
+        return {'alpha': self.alpha, 'count': self.count, 'zero': self.zero, 'sum': self.sum,
+                'min': self.min if self.count else None, 'max': self.max if self.count else None,
+                'bins': {str(idx): n for idx, n in sorted(self.bins.items())}}
+
+    @classmethod
+    def from_dict(cls, d):
+        sk = cls(d.get('alpha', DEFAULT_ALPHA))
+        sk.bins = {int(idx): int(n) for idx, n in d.get('bins', {}).items()}
+        sk.zero = int(d.get('zero', 0))
+        sk.count = int(d.get('count', 0))
+        sk.sum = float(d.get('sum', 0.0))
+        if sk.count:
+            sk.min = float(d['min'])
+            sk.max = float(d['max'])
+        return sk
+
+
+def write_sketch_file(path, sketches, direction=''):
+    """Write ``{sensor: LatencySketch}`` as a sidecar JSON (latencies in ms)."""
+    doc = {'version': FORMAT_VERSION, 'unit': 'ms', 'direction': direction,
+           'sensors': {sensor: sk.to_dict() for sensor, sk in sorted(sketches.items()) if sk.count}}
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(doc, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def read_sketch_file(path):
+    """``{sensor: LatencySketch}`` from a sidecar written by write_sketch_file."""
+    with open(path) as f:
+        doc = json.load(f)
+    return {sensor: LatencySketch.from_dict(d) for sensor, d in doc.get('sensors', {}).items()}
+
+
+def merge_sketch_files(paths):
+    """Pool every sensor of every file into one sketch (None if nothing was read)."""
+    total = None
+    for path in paths:
+        try:
+            sketches = read_sketch_file(path)
+        except (OSError, ValueError):
+            continue
+        for sk in sketches.values():
+            if total is None:
+                total = LatencySketch(sk.alpha)
+            total.merge(sk)
+    return total
+
+
+def main():
+    p = argparse.ArgumentParser(description='Merge latencia_sketch JSON files and print global percentiles')
+    p.add_argument('files', nargs='+', help='Sketch files or glob patterns')
+    p.add_argument('--quantiles', nargs='+', type=float, default=[0.5, 0.95, 0.99])
+    args = p.parse_args()
+    paths = sorted({f for pattern in args.files for f in (glob.glob(pattern) or [pattern])})
+    total = merge_sketch_files(paths)
+    if total is None or not total.count:
+        print('no latencies found')
+        return 1
+    print(f'files: {len(paths)}  count: {total.count}  mean_ms: {total.mean:.3f}  '
+          f'min_ms: {total.min:.3f}  max_ms: {total.max:.3f}')
+    for q in args.quantiles:
+        print(f'P{q * 100:g}_ms: {total.quantile(q):.3f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+"""Latency per link-event phase (baseline / down / degrade / recovery).
+
+apply_slice.sh applies the rows of ``scripts/link_schedule.csv`` (down, flap, degrade)
+during a run and the scheduler logs what actually fired in ``link_events.jsonl`` in the
+run folder. This module turns both into event windows and splits the paired latency
+samples of the exports by phase:
+
+- ``down`` / ``degrade``: sample sent while a link was down / degraded (down wins when
+  both overlap);
+- ``recovery``: sent after the end of a disturbance, until the rolling P95 is back at
+  the baseline P95 (at most ``horizon_s``, and never past the next disturbance);
+- ``baseline``: everything else.
+
+Windows come from the event log (down->up, degrade->restore per target, then merged
+across targets, so a ``global`` degrade is one window). The Python scheduler logs every
+action it fires (its records carry ``planned_epoch``), so its log is taken as complete.
+Only without such records (no log, or the bash fallback scheduler, which does not log
+degrade) do kinds missing from the log fall back to the planned windows of the
+schedule, anchored at ``start_epoch`` (``--start-epoch``, else inferred from the log)
+and clipped to the span of the samples. Episodes without any sample are dropped.
+Phases are run-wide: the exports cannot tell which sensor sits behind which
+``mn.sim_*`` container.
+
+Samples are ``(sent_ms, latency_ms)``. They are sorted once and assigned to phases in a
+single sweep over the elementary intervals between window boundaries. Time-to-recover
+of an episode is the start (relative to its end) of the first ``bucket_s`` bucket with
+at least ``min_bucket`` samples and P95 <= baseline P95 * (1 + ``tolerance``); its
+resolution is therefore ``bucket_s``.
+"""
+import csv
+import json
+import math
+from collections import namedtuple
+
+PHASES = ('baseline', 'down', 'degrade', 'recovery')
+
+# kind: down | degrade; start/end: epoch seconds (end is inf when never restored)
+Window = namedtuple('Window', ('kind', 'start', 'end', 'targets'))
+# one disturbance (overlapping windows merged) and what followed it
+Episode = namedtuple('Episode', ('index', 'kinds', 'start', 'end', 'targets', 'horizon',
+                                 'ttr_s', 'recovered', 'count', 'p95_ms'))
+
+_OPENS = {'down': 'down', 'degrade': 'degrade'}
+_CLOSES = {'up': 'down', 'restore': 'degrade'}
+
+
+def _parse_params(text):
+    params = {}
+    for part in (text or '').split(';'):
+        key, sep, value = part.strip().partition('=')
+        if sep and key:
+            params[key.strip()] = value.strip()
+    return params
+
+
+def load_link_events(path):
+    """Records of ``link_events.jsonl`` sorted by epoch (unreadable lines skipped)."""
+    events = []
+    try:
+        with open(path) as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                    rec['epoch'] = float(rec['epoch'])
+                except (ValueError, KeyError, TypeError):
+                    continue
+                events.append(rec)
+    except OSError:
+        return []
+    events.sort(key=lambda r: r['epoch'])
+    return events
+
+
+def load_schedule(path):
+    """Rows of link_schedule.csv as dicts (start_offset, duration, target, mode, params)."""
+    rows = []
+    try:
+        with open(path, newline='') as f:
+            for fields in csv.reader(f):
+                if not fields or not fields[0].strip() or fields[0].strip().startswith('#'):
+                    continue
+                fields += [''] * (5 - len(fields))
+                try:
+                    start = float(fields[0])
+                    duration = float(fields[1] or 0)
+                except ValueError:
+                    continue
+                rows.append({'start_offset': start, 'duration': duration, 'target': fields[2].strip(),
+                             'mode': fields[3].strip().lower(), 'params': _parse_params(','.join(fields[4:]))})
+    except OSError:
+        return []
+    return rows
+
+
+def schedule_windows(rows, start_epoch):
+    """Planned windows of the schedule (flap rows expand to one down window per cycle)."""
+    windows = []
+    for r in rows:
+        t0 = start_epoch + r['start_offset']
+        target = (r['target'],)
+        if r['mode'] in ('down', 'degrade'):
+            windows.append(Window(r['mode'], t0, t0 + r['duration'], target))
+        elif r['mode'] == 'flap':
+            cycles = int(r['params'].get('cycles', 5))
+            down_t = float(r['params'].get('down', 10))
+            up_t = float(r['params'].get('up', 50))
+            for c in range(cycles):
+                t = t0 + c * (down_t + up_t)
+                windows.append(Window('down', t, t + down_t, target))
+    return windows
+
+
+def event_windows(events):
+    """Windows from the event log: each open event is closed by the next close on its target."""
+    windows = []
+    open_at = {}
+    for rec in events:
+        event = rec.get('event')
+        key = (rec.get('target'), _OPENS.get(event) or _CLOSES.get(event))
+        if event in _OPENS:
+            open_at.setdefault(key, rec['epoch'])
+        elif event in _CLOSES and key in open_at:
+            windows.append(Window(key[1], open_at.pop(key), rec['epoch'], (key[0],)))
+    for (target, kind), start in open_at.items():
+        windows.append(Window(kind, start, math.inf, (target,)))
+    return windows
+
+
+def infer_start_epoch(events, rows=()):
+    """Run start epoch from the scheduler records (planned_epoch - offset_s).
+
+    Logs of the bash fallback carry neither: the first logged down is matched with the
+    first down/flap row of the schedule instead.
+    """
+    for rec in events:
+        if 'planned_epoch' in rec and 'offset_s' in rec:
+            return float(rec['planned_epoch']) - float(rec['offset_s'])
+    first_down = next((r for r in events if r.get('event') == 'down'), None)
+    first_row = min((r['start_offset'] for r in rows if r['mode'] in ('down', 'flap')), default=None)
+    if first_down is not None and first_row is not None:
+        return first_down['epoch'] - first_row
+    return None
+
+
+def build_windows(events=(), rows=(), start_epoch=None, span=None):
+    """Merged windows per kind: logged windows, plus planned ones for kinds never logged.
+
+    Planned windows are only used when no record comes from the Python scheduler (which
+    logs everything it fires), and are clipped to ``span`` = (first, last) epoch when given.
+    """
+    logged = event_windows(events)
+    windows = list(logged)
+    complete_log = any('planned_epoch' in rec for rec in events)
+    if rows and not complete_log:
+        if start_epoch is None:
+            start_epoch = infer_start_epoch(events, rows)
+        if start_epoch is not None:
+            have = {w.kind for w in logged}
+            planned = [w for w in schedule_windows(rows, start_epoch) if w.kind not in have]
+            if span is not None:
+                first, last = span
+                planned = [w._replace(start=max(w.start, first), end=min(w.end, last))
+                           for w in planned if w.start < last and w.end > first]
+            windows += planned
+    return _merge(windows)
+
+
+def _merge(windows):
+    merged = []
+    for w in sorted(windows, key=lambda w: (w.kind, w.start)):
+        last = merged[-1] if merged else None
+        if last is not None and last.kind == w.kind and w.start <= last.end:
+            merged[-1] = Window(w.kind, last.start, max(last.end, w.end),
+                                tuple(sorted(set(last.targets) | set(w.targets))))
+        else:
+            merged.append(w)
+    return sorted(merged, key=lambda w: w.start)
+
+
+def _episodes(windows):
+    """Disturbances: windows of any kind merged where they overlap -> [start, end, kinds, targets]."""
+    eps = []
+    for w in windows:
+        if eps and w.start <= eps[-1][1]:
+            ep = eps[-1]
+            ep[1] = max(ep[1], w.end)
+            ep[2].add(w.kind)
+            ep[3].update(w.targets)
+        else:
+            eps.append([w.start, w.end, {w.kind}, set(w.targets)])
+    return eps
+
+
+def _pxx(sorted_values, p):
+    return sorted_values[min(int(len(sorted_values) * p), len(sorted_values) - 1)]
+
+
+def phase_stats(latencies_ms):
+    """count / mean / P50 / P95 / P99 of a list of latencies (ms)."""
+    if not latencies_ms:
+        return {'count': 0}
+    values = sorted(latencies_ms)
+    n = len(values)
+    return {
+        'count': n,
+        'mean_ms': round(sum(values) / n, 3),
+        'P50_ms': round(values[n // 2], 3),
+        'P95_ms': round(_pxx(values, 0.95), 3),
+        'P99_ms': round(_pxx(values, 0.99), 3),
+    }
+
+
+def _time_to_recover(post, end, baseline_p95, bucket_s, min_bucket, tolerance):
+    """Offset (s) after ``end`` of the first bucket whose P95 is back at baseline, or None."""
+    if baseline_p95 is None:
+        return None
+    limit = baseline_p95 * (1 + tolerance)
+    i = 0
+    while i < len(post):
+        b = int((post[i][0] / 1000.0 - end) // bucket_s)
+        j = i
+        bucket = []
+        while j < len(post) and int((post[j][0] / 1000.0 - end) // bucket_s) == b:
+            bucket.append(post[j][1])
+            j += 1
+        if len(bucket) >= min_bucket and _pxx(sorted(bucket), 0.95) <= limit:
+            return b * bucket_s
+        i = j
+    return None
+
+
+def segment_latencies(samples, windows, horizon_s=300.0, bucket_s=5.0, min_bucket=3, tolerance=0.1):
+    """Split ``samples`` [(sent_ms, latency_ms)] by phase.
+
+    Returns ({phase: stats}, [Episode]). The baseline P95 used for time-to-recover only
+    comes from samples outside every disturbance and its horizon; samples of a horizon
+    that come after the recovery point count as baseline in the phase stats.
+    """
+    samples = sorted(samples)
+    eps = _episodes(windows)
+    last_ms = samples[-1][0] / 1000.0 if samples else 0.0
+    # elementary intervals: (start, end, label) with label 'down'/'degrade', an episode
+    # index (its recovery horizon) or None (baseline)
+    bounds = []
+    for k, (start, end, _kinds, _targets) in enumerate(eps):
+        end = min(end, max(last_ms, start) + 1)
+        nxt = eps[k + 1][0] if k + 1 < len(eps) else math.inf
+        bounds.append((start, end, 'disturbance', k))
+        bounds.append((end, min(end + horizon_s, nxt), 'horizon', k))
+
+    kind_windows = [(w.start, w.end, w.kind) for w in windows]
+    by_phase = {'baseline': [], 'down': [], 'degrade': []}
+    post = [[] for _ in eps]
+    during = [0] * len(eps)
+    b = 0
+    for sample in samples:
+        t = sample[0] / 1000.0
+        while b < len(bounds) and t >= bounds[b][1]:
+            b += 1
+        if b < len(bounds) and t >= bounds[b][0]:
+            start, end, label, k = bounds[b]
+            if label == 'horizon':
+                post[k].append(sample)
+            else:
+                kinds = {kind for ws, we, kind in kind_windows if ws <= t < we}
+                by_phase['down' if 'down' in kinds else 'degrade'].append(sample[1])
+                during[k] += 1
+        else:
+            by_phase['baseline'].append(sample[1])
+
+    reference = sorted(by_phase['baseline'])
+    baseline_p95 = _pxx(reference, 0.95) if reference else None
+    recovery = []
+    episodes = []
+    for k, (start, end, kinds, targets) in enumerate(eps):
+        if not during[k] and not post[k]:
+            continue  # no traffic around it (e.g. past the end of the run): not an episode
+        h_start, h_end = bounds[2 * k + 1][:2]
+        ttr = _time_to_recover(post[k], h_start, baseline_p95, bucket_s, min_bucket, tolerance)
+        cut = h_start + ttr if ttr is not None else h_end
+        rec = [lat for ts, lat in post[k] if ts / 1000.0 < cut]
+        by_phase['baseline'].extend(lat for ts, lat in post[k] if ts / 1000.0 >= cut)
+        recovery.extend(rec)
+        episodes.append(Episode(len(episodes), '+'.join(sorted(kinds)), start, end, ' '.join(sorted(targets)), h_end,
+                                ttr, ttr is not None, len(rec), phase_stats(rec).get('P95_ms')))
+    by_phase['recovery'] = recovery
+    stats = {phase: phase_stats(by_phase[phase]) for phase in PHASES}
+    if baseline_p95 is not None:
+        stats['baseline']['reference_P95_ms'] = round(baseline_p95, 3)
+    return stats, episodes
+
+
+def summary_fields(direction, stats, episodes):
+    """Flat ``key: value`` fields for the run summary."""
+    out = {}
+    for phase in PHASES:
+        s = stats.get(phase, {})
+        out[f'{direction}_{phase}_count'] = s.get('count', 0)
+        if s.get('count'):
+            out[f'{direction}_{phase}_mean_ms'] = s['mean_ms']
+            out[f'{direction}_{phase}_P95_ms'] = s['P95_ms']
+    ttrs = [e.ttr_s for e in episodes if e.recovered]
+    out[f'{direction}_link_episodes'] = len(episodes)
+    out[f'{direction}_link_recovered'] = len(ttrs)
+    if ttrs:
+        out[f'{direction}_time_to_recover_mean_s'] = round(sum(ttrs) / len(ttrs), 3)
+        out[f'{direction}_time_to_recover_max_s'] = round(max(ttrs), 3)
+    return out
+
+
+def write_phase_reports(reports_dir, profile, results):
+    """Write ``<profile>_link_phases.csv`` and ``<profile>_link_recovery.csv``.
+
+    ``results`` maps direction -> (stats, episodes); returns the two paths.
+    """
+    phases_path = f'{reports_dir}/{profile}_link_phases.csv'
+    recovery_path = f'{reports_dir}/{profile}_link_recovery.csv'
+    with open(phases_path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['direction', 'phase', 'count', 'mean_ms', 'P50_ms', 'P95_ms', 'P99_ms'])
+        for direction, (stats, _) in results.items():
+            for phase in PHASES:
+                s = stats[phase]
+                w.writerow([direction, phase, s['count']] + [s.get(k, '') for k in ('mean_ms', 'P50_ms', 'P95_ms', 'P99_ms')])
+    with open(recovery_path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['direction', 'episode', 'kinds', 'targets', 'start_epoch', 'end_epoch', 'duration_s',
+                    'recovered', 'time_to_recover_s', 'recovery_count', 'recovery_P95_ms', 'baseline_P95_ms'])
+        for direction, (stats, episodes) in results.items():
+            ref = stats['baseline'].get('reference_P95_ms', '')
+            for e in episodes:
+                finite = e.end != math.inf
+                w.writerow([direction, e.index, e.kinds, e.targets, round(e.start, 3),
+                            round(e.end, 3) if finite else '', round(e.end - e.start, 3) if finite else '',
+                            int(e.recovered), '' if e.ttr_s is None else e.ttr_s, e.count,
+                            '' if e.p95_ms is None else e.p95_ms, ref])
+    return phases_path, recovery_path
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of the Influx ``_time`` parsers.
+
+Compares, on synthetic RFC3339 timestamps shaped like Influx's (nanosecond fractions
+with trailing zeros trimmed, some whole seconds):
+
+- ``reference``: the original strptime/fromisoformat parser (``_iso_to_epoch_reference``);
+- ``iso_to_epoch``: the per-row fast path used by generate_reports_from_export.py;
+- ``rfc3339_to_ns``: the bare int64-ns parser from _influx_csv;
+- ``column``: the whole-column ``datetime64[ns]`` conversion of the export cache (numpy).
+
+Every variant is checked against the reference before timing, on the rows the reference
+can parse: strptime's ``%f`` takes at most 6 digits, so the reference returns None for
+7-9 digit fractions, which the fast paths parse.
+
+  python3 bench_time_parsing.py [--rows 200000] [--repeat 3]
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timezone
+
+from _export_cache import np, rfc3339_to_ns_array
+from _influx_csv import rfc3339_to_ns
+from generate_reports_from_export import _iso_to_epoch_reference, iso_to_epoch
+
+
+def synthetic_times(n, seed=1):
+    rnd = random.Random(seed)
+    t0 = int(datetime(2025, 10, 1, tzinfo=timezone.utc).timestamp())
+    out = []
+    for i in range(n):
+        sec = t0 + i // 50
+        base = datetime.fromtimestamp(sec, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+        if rnd.random() < 0.05:
+            out.append(base + 'Z')
+        else:
+            frac = f'{rnd.randrange(1, 10 ** 9):09d}'.rstrip('0')
+            out.append(f'{base}.{frac}Z')
+    return out
+
+
+def best_of(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    p = argparse.ArgumentParser(description='Benchmark Influx _time parsing')
+    p.add_argument('--rows', type=int, default=200000)
+    p.add_argument('--repeat', type=int, default=3)
+    args = p.parse_args()
+
+    times = synthetic_times(args.rows)
+    reference = [_iso_to_epoch_reference(t) for t in times]
+    variants = [
+        ('reference', lambda: [_iso_to_epoch_reference(t) for t in times],
+         lambda: reference),
+        ('iso_to_epoch', lambda: [iso_to_epoch(t) for t in times],
+         lambda: [iso_to_epoch(t) for t in times]),
+        ('rfc3339_to_ns', lambda: [rfc3339_to_ns(t) for t in times],
+         lambda: [rfc3339_to_ns(t) / 1e9 for t in times]),
+    ]
+    if np is not None:
+        variants.append(('column', lambda: rfc3339_to_ns_array(times),
+                         lambda: (rfc3339_to_ns_array(times) / 1e9).tolist()))
+    else:
+        print('numpy not installed: column variant skipped', file=sys.stderr)
+
+    missed = sum(v is None for v in reference)
+    print(f'{args.rows} timestamps, best of {args.repeat} '
+          f'(reference cannot parse {missed} of them)')
+    base = None
+    for name, run, values in variants:
+        got = values()
+        if name != 'reference' and None in got:
+            print(f'{name}: failed to parse some timestamps', file=sys.stderr)
+            return 1
+        # microsecond agreement: the reference goes through datetime (us resolution)
+        err = max((abs(a - b) for a, b in zip(reference, got) if a is not None), default=0.0)
+        if err > 1e-6:
+            print(f'{name}: differs from reference by up to {err:.9f}s', file=sys.stderr)
+            return 1
+        secs = best_of(run, args.repeat)
+        base = base or secs
+        print(f'{name:14s} {secs * 1e9 / args.rows:8.1f} ns/row  {args.rows / secs / 1e6:7.2f} Mrows/s  '
+              f'x{base / secs:.1f}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
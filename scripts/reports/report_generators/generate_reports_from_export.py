@@ -8,23 +8,76 @@ Produces files in the provided out_dir (default: results/) with names similar to
 - <profile>_odte_<ts>.csv
 - <profile>_latencia_stats_middts_to_simulator_<ts>.csv
 - <profile>_latencia_stats_simulator_to_middts_<ts>.csv
+- <profile>_latencia_sketch_{middts_to_simulator,simulator_to_middts}_<ts>.json
+  (mergeable per-sensor latency sketches, see _latency_sketch.py)
+- <profile>_availability_<ts>.csv (per-sensor availability at each AVAIL_INTERVALS
+  granularity, default 1 s / 5 s / 10 s; override with AVAIL_INTERVALS=1,5,10)
 
 This is the offline equivalent of the Flux reports: it parses the raw Influx CSV export
 and computes per-sensor latencies, T/R/A and ODTE.
+
+Set VERIFY_PAIRING=1 to cross-check every sent/recv pairing against the original
+quadratic reference implementation (slow; meant for validating new exports).
+
+Sensors are independent: REPORT_JOBS=N (or 'auto' for one per core) pairs and
+summarises them in N worker processes. The per-sensor time lists are handed over in
+one shared-memory int64 block, and results are merged in sorted sensor order, so the
+output does not depend on REPORT_JOBS.
 """
 import csv
 import sys
 import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
 from datetime import datetime, timezone
 from collections import defaultdict
 import statistics
 import math
+from bisect import bisect_left
+
+from _export_cache import iter_export_records
+from _influx_csv import iter_rows, rfc3339_to_ns
+from _latency_sketch import LatencySketch, write_sketch_file
+
+try:
+    import numpy as np
+except ImportError:  # optional: availability falls back to a pure-Python sweep
+    np = None
 
 AVAIL_INTERVAL = 10.0  # seconds
+# availability curve granularities (seconds), override with AVAIL_INTERVALS=1,5,10
+AVAIL_INTERVALS = (1.0, 5.0, 10.0)
 DEADLINE_S = 0.2  # Target deadline for latency goal (200ms)
 
 
 def iso_to_epoch(s):
+    """Influx ``_time`` -> epoch seconds (float), None if unparseable.
+
+    The RFC3339 UTC forms Influx emits take the exception-free fast path
+    (_influx_csv.rfc3339_to_ns); other ISO-8601 forms go through the reference parser.
+    """
+    if not s:
+        return None
+    ns = rfc3339_to_ns(s)
+    if ns is not None:
+        return ns / 1e9
+    return _iso_to_epoch_reference(s)
+
+
+def iso_to_epoch_ms(s):
+    """Influx ``_time`` -> int epoch milliseconds, None if unparseable."""
+    if not s:
+        return None
+    ns = rfc3339_to_ns(s)
+    if ns is not None:
+        return ns // 1_000_000
+    t = _iso_to_epoch_reference(s)
+    return math.floor(t * 1000) if t is not None else None
+
+
+def _iso_to_epoch_reference(s):
+    """Original strptime/fromisoformat parser, kept for non-Influx forms and benchmarks."""
     if not s:
         return None
     try:
@@ -46,55 +99,42 @@ def iso_to_epoch(s):
 
 
 def read_export(csv_path):
+    """Materialise an export as (header, [dict rows]); prefer iter_export_records for large files."""
     rows = []
     header = None
-    with open(csv_path, newline='') as f:
-        reader = csv.reader(f)
-        for r in reader:
-            # detect header rows containing the Influx '_measurement' column
-            if any(cell.strip() == '_measurement' for cell in r):
-                header = [h.strip() for h in r]
-                continue
-            if header is None:
-                continue
-            if len(r) < len(header):
-                r += [''] * (len(header) - len(r))
-            rec = dict(zip(header, r))
-            rows.append(rec)
+    for columns, r in iter_rows(csv_path):
+        header = sorted(columns, key=columns.get)
+        rows.append({name: r[i] for name, i in columns.items()})
     return header, rows
 
 
-def build_time_lists(rows):
+def build_time_lists(records):
+    """Bucket sent/received timestamps per sensor from an iterable of ExportRecord.
+
+    Consumes ``records`` in one pass, so it can be fed straight from iter_export_records;
+    ``time_ms`` (column cache) is used instead of re-parsing ``time`` when present.
+    """
     middts_sent = defaultdict(list)
     sim_recv = defaultdict(list)
     sim_sent = defaultdict(list)
     middts_recv = defaultdict(list)
-    events_time_by_sensor = defaultdict(list)
-    start_ts = None
-    stop_ts = None
-    for r in rows:
-        meas = r.get('_measurement', '')
-        if meas not in ['device_data', 'latency_measurement']:
-            continue
-        sensor = r.get('sensor', '')
-        source = r.get('source', '')
-        field = r.get('_field', '')
-        val = r.get('_value', '')
-        t_iso = r.get('_time', '')
-        t_epoch = iso_to_epoch(t_iso)
-        if t_epoch is not None:
-            events_time_by_sensor[sensor].append(t_epoch)
-            if start_ts is None or t_epoch < start_ts:
-                start_ts = t_epoch
-            if stop_ts is None or t_epoch > stop_ts:
-                stop_ts = t_epoch
-        try:
-            num = int(val) if val != '' else None
-        except Exception:
-            try:
-                num = int(float(val))
-            except Exception:
-                num = None
+    # int64 epoch ms per sensor in a compact array (zero-copy into numpy)
+    events_time_by_sensor = defaultdict(lambda: array('q'))
+    start_ms = None
+    stop_ms = None
+    for r in records:
+        meas = r.measurement
+        sensor = r.sensor
+        source = r.source
+        field = r.field
+        t_ms = r.time_ms if r.time_ms is not None else iso_to_epoch_ms(r.time)
+        if t_ms is not None:
+            events_time_by_sensor[sensor].append(t_ms)
+            if start_ms is None or t_ms < start_ms:
+                start_ms = t_ms
+            if stop_ms is None or t_ms > stop_ms:
+                stop_ms = t_ms
+        num = int(r.value) if r.value is not None else None
         if field == 'sent_timestamp' and source == 'middts' and num is not None:
             middts_sent[sensor].append(num)
         if field == 'received_timestamp' and source == 'simulator' and meas == 'latency_measurement' and num is not None:
@@ -118,69 +158,159 @@ def build_time_lists(rows):
         'sim_sent': sim_sent,
         'middts_recv': middts_recv,
         'events_time_by_sensor': events_time_by_sensor,
-        'start_ts': start_ts,
-        'stop_ts': stop_ts,
+        'start_ms': start_ms,
+        'stop_ms': stop_ms,
+        'start_ts': start_ms / 1000.0 if start_ms is not None else None,
+        'stop_ts': stop_ms / 1000.0 if stop_ms is not None else None,
     }
 
 
-def match_sent_to_recv(sent_list_ms, recv_list_ms, max_latency_ms=10000):
+def _match_sent_to_recv_reference(sent_list_ms, recv_list_ms, max_latency_ms=10000):
     """
-    Smart pairing with temporal windowing for URLLC optimization.
-    Pairs sent timestamps with the closest receive timestamp within reasonable latency.
-    This handles out-of-order timestamps and multiple response scenarios.
+    Original O(n*m) pairing, kept as the reference for match_sent_to_recv.
+    Used by scripts/reports/test_pairing.py and, with VERIFY_PAIRING=1, to cross-check
+    the sweep implementation at runtime.
     """
     if not sent_list_ms or not recv_list_ms:
         return []
-    
+
     sent_sorted = sorted(sent_list_ms)
     recv_sorted = sorted(recv_list_ms)
     pairs = []
     used_recv = set()
-    
+
     for sent in sent_sorted:
         best_recv = None
         best_latency = float('inf')
         best_idx = -1
-        
-        # Find the closest receive >= sent within reasonable latency window
+
         for i, recv in enumerate(recv_sorted):
             if i in used_recv:
                 continue
             if recv < sent:
-                continue  # received before sent - invalid
-            
+                continue
+
             latency = recv - sent
             if latency > max_latency_ms:
-                break  # too far in the future, stop looking
-            
+                break
+
             if latency < best_latency:
                 best_latency = latency
                 best_recv = recv
                 best_idx = i
-        
-        # If we found a good match, pair them
+
         if best_recv is not None and best_latency <= max_latency_ms:
             pairs.append((best_recv, best_latency))
             used_recv.add(best_idx)
-    
+
     return pairs
 
 
-def compute_availability(events_time_by_sensor, start_ts, stop_ts, interval=AVAIL_INTERVAL):
-    avail = {}
-    if start_ts is None or stop_ts is None:
-        return avail
-    total_windows = int(((stop_ts - start_ts) // interval) + 1)
+def match_sent_to_recv(sent_list_ms, recv_list_ms, max_latency_ms=10000):
+    """
+    Smart pairing with temporal windowing for URLLC optimization.
+    Pairs each sent timestamp with the closest unused receive timestamp >= sent
+    whose latency is within max_latency_ms.
+
+    Both lists are sorted, so the closest unused receive is always the first
+    unused index at or after bisect_left(recv, sent). Consumed receives form a
+    contiguous block behind a monotone cursor, which turns the pairing into a
+    single O((n + m) log m) sweep instead of scanning every receive per sent.
+    """
+    if not sent_list_ms or not recv_list_ms:
+        return []
+
+    sent_sorted = sorted(sent_list_ms)
+    recv_sorted = sorted(recv_list_ms)
+    n_recv = len(recv_sorted)
+    pairs = []
+    cursor = 0  # every index in [bisect_left(recv, sent), cursor) is already used
+
+    for sent in sent_sorted:
+        idx = bisect_left(recv_sorted, sent, cursor)
+        if idx >= n_recv:
+            break  # later sents are >= this one, nothing left to pair
+        latency = recv_sorted[idx] - sent
+        if latency > max_latency_ms:
+            continue  # lost command; the receive may still match a later sent
+        pairs.append((recv_sorted[idx], latency))
+        cursor = idx + 1
+
+    if os.environ.get('VERIFY_PAIRING') == '1':
+        expected = _match_sent_to_recv_reference(sent_list_ms, recv_list_ms, max_latency_ms)
+        if pairs != expected:
+            raise AssertionError(
+                f'match_sent_to_recv mismatch: {len(pairs)} pairs vs {len(expected)} from reference'
+            )
+
+    return pairs
+
+
+def _distinct_windows_sorted(times_ms, start_ms, interval_ms):
+    """Sorted distinct window indices of sorted epoch-ms times (pure-Python path)."""
+    out = []
+    last = None
+    for t in times_ms:
+        idx = (t - start_ms) // interval_ms
+        if idx != last:
+            out.append(idx)
+            last = idx
+    return out
+
+
+def compute_availability_multi(events_time_by_sensor, start_ms, stop_ms, intervals=AVAIL_INTERVALS):
+    """Availability per sensor at several window sizes: {interval_s: {sensor: A}}.
+
+    A = windows with at least one event / windows in [start, stop]. Each sensor's
+    epoch-ms times are sorted once; the window index of a sorted array is
+    non-decreasing, so the distinct windows of the finest interval are a floor_divide
+    plus a diff (numpy), and every coarser interval that is a multiple of a finer one
+    is derived from that finer interval's distinct windows instead of the raw events.
+    """
+    out = {float(i): {} for i in intervals}
+    if start_ms is None or stop_ms is None:
+        return out
+    steps = sorted((int(round(i * 1000)), float(i)) for i in intervals)
+    totals = {i: (stop_ms - start_ms) // ms + 1 for ms, i in steps}
     for sensor, times in events_time_by_sensor.items():
-        windows_with_event = set()
-        for t in times:
-            idx = int((t - start_ts) // interval)
-            windows_with_event.add(idx)
-        if total_windows > 0:
-            avail[sensor] = len(windows_with_event) / float(total_windows)
+        if np is not None:
+            ts = np.sort(np.frombuffer(times, dtype=np.int64) if isinstance(times, array)
+                         else np.asarray(times, dtype=np.int64)) - start_ms
         else:
-            avail[sensor] = 0.0
-    return avail
+            ts = sorted(t - start_ms for t in times)
+        # (interval_ms, sorted distinct window indices) already computed for this sensor
+        done = []
+        for ms, interval in steps:
+            finer = next(((f, w) for f, w in reversed(done) if ms % f == 0), None)
+            if np is not None:
+                idx = ts // ms if finer is None else finer[1] // (ms // finer[0])
+                windows = idx[np.r_[True, idx[1:] != idx[:-1]]] if idx.size else idx
+                count = int(windows.size)
+            else:
+                windows = (_distinct_windows_sorted(ts, 0, ms) if finer is None
+                           else _distinct_windows_sorted(finer[1], 0, ms // finer[0]))
+                count = len(windows)
+            done.append((ms, windows))
+            out[interval][sensor] = count / float(totals[interval]) if totals[interval] > 0 else 0.0
+    return out
+
+
+def compute_availability(events_time_by_sensor, start_ms, stop_ms, interval=AVAIL_INTERVAL):
+    return compute_availability_multi(events_time_by_sensor, start_ms, stop_ms, (interval,))[float(interval)]
+
+
+def avail_intervals():
+    """AVAIL_INTERVALS from the environment (comma-separated seconds), always with AVAIL_INTERVAL."""
+    raw = os.environ.get('AVAIL_INTERVALS', '')
+    values = set()
+    for part in raw.split(','):
+        try:
+            value = float(part)
+        except ValueError:
+            continue
+        if value > 0:
+            values.add(value)
+    return tuple(sorted((values or set(AVAIL_INTERVALS)) | {AVAIL_INTERVAL}))
 
 
 def percentile(sorted_list, p):
@@ -217,6 +347,103 @@ def stats_from_latencies(lat_ms_list):
     }
 
 
+def sensor_report(m2s_sent, m2s_recv, s2m_sent, s2m_recv):
+    """Everything computed per sensor: pairs, latency stats, sketch and on-time count per direction."""
+    out = {}
+    for name, sent, recv in (('m2s', m2s_sent, m2s_recv), ('s2m', s2m_sent, s2m_recv)):
+        pairs = match_sent_to_recv(sent, recv)
+        lat = [lat for (_, lat) in pairs]
+        out[name] = {
+            'pairs': pairs,
+            'stats': stats_from_latencies(lat),
+            'sketch': LatencySketch().extend(lat),
+            'on_time': sum(1 for l in lat if (l / 1000.0) <= DEADLINE_S),
+        }
+    return out
+
+
+_TIME_LISTS = ('middts_sent', 'sim_recv', 'sim_sent', 'middts_recv')  # sensor_report argument order
+_shared_times = None
+
+
+def _share_time_lists(data, sensors):
+    """Copy the per-sensor time lists into one shared int64 block.
+
+    Returns (shm, {sensor: [(start, end)] per _TIME_LISTS entry}).
+    """
+    total = sum(len(data[k].get(s, ())) for k in _TIME_LISTS for s in sensors)
+    shm = shared_memory.SharedMemory(create=True, size=max(total, 1) * 8)
+    buf = shm.buf.cast('q')
+    layout = {}
+    pos = 0
+    for s in sensors:
+        spans = []
+        for k in _TIME_LISTS:
+            values = data[k].get(s, ())
+            buf[pos:pos + len(values)] = array('q', values)
+            spans.append((pos, pos + len(values)))
+            pos += len(values)
+        layout[s] = spans
+    buf.release()
+    return shm, layout
+
+
+def _attach_time_lists(name):
+    global _shared_times
+    shm = shared_memory.SharedMemory(name=name)
+    _shared_times = (shm, shm.buf.cast('q'))
+
+
+def _sensor_reports_shared(chunk):
+    buf = _shared_times[1]
+    return [(s, sensor_report(*(buf[a:b].tolist() for a, b in spans))) for s, spans in chunk]
+
+
+def report_jobs():
+    raw = os.environ.get('REPORT_JOBS', '1').strip().lower()
+    if raw in ('auto', '0'):
+        return os.cpu_count() or 1
+    try:
+        return max(1, int(raw))
+    except ValueError:
+        return 1
+
+
+def sensor_reports(data, sensors, jobs=1):
+    """{sensor: sensor_report(...)} for every sensor, in a process pool when jobs > 1."""
+    sensors = sorted(sensors)
+    if jobs <= 1 or len(sensors) < 2:
+        return {s: sensor_report(*(data[k].get(s, []) for k in _TIME_LISTS)) for s in sensors}
+    shm, layout = _share_time_lists(data, sensors)
+    try:
+        # ~4 chunks per worker, balanced by event count (largest sensors first)
+        n_chunks = min(len(sensors), jobs * 4)
+        chunks = [[] for _ in range(n_chunks)]
+        loads = [0] * n_chunks
+        for s in sorted(sensors, key=lambda s: -sum(b - a for a, b in layout[s])):
+            i = loads.index(min(loads))
+            chunks[i].append((s, layout[s]))
+            loads[i] += sum(b - a for a, b in layout[s])
+        results = {}
+        with ProcessPoolExecutor(max_workers=min(jobs, n_chunks), initializer=_attach_time_lists,
+                                 initargs=(shm.name,)) as pool:
+            for part in pool.map(_sensor_reports_shared, [c for c in chunks if c]):
+                results.update(part)
+    finally:
+        shm.close()
+        shm.unlink()
+    return {s: results[s] for s in sensors}
+
+
+def write_latency_stats(path, reports, direction):
+    with open(path, 'w', newline='') as f:
+        w = csv.writer(f)
+        w.writerow(['sensor', 'count', 'mean_ms', 'median_ms', 'min_ms', 'max_ms', 'p95_ms', 'p99_ms', 'p999_ms', 'jitter_ms'])
+        for s, rep in reports.items():
+            st = rep[direction]['stats']
+            w.writerow([s, st['count']] + [f"{st[k]:.3f}" for k in ('mean', 'median', 'min', 'max', 'p95', 'p99', 'p999', 'jitter')])
+
+
 def main():
     if len(sys.argv) < 3:
         print(__doc__)
@@ -228,32 +455,21 @@ def main():
         print('Input CSV not found:', inp)
         sys.exit(2)
 
-    header, rows = read_export(inp)
-    data = build_time_lists(rows)
+    # stream the export: constant memory, one pass (no column-shift repair, keeps
+    # the original per-sensor keys)
+    data = build_time_lists(iter_export_records(inp, measurements=('device_data', 'latency_measurement'), recover=False))
 
     middts_sent = data['middts_sent']
     sim_recv = data['sim_recv']
     # sensors union across all lists
     sensors = set(list(middts_sent.keys()) + list(sim_recv.keys()) + list(data['events_time_by_sensor'].keys()) + list(data['sim_sent'].keys()) + list(data['middts_recv'].keys()))
 
-    # produce paired lists for both directions using appropriate sent->recv matching
-    middts_to_sim_pairs = {}
-    middts_to_sim_lat = {}
-    for s in sensors:
-        sent = middts_sent.get(s, [])
-        recv = sim_recv.get(s, [])
-        pairs = match_sent_to_recv(sent, recv)
-        middts_to_sim_pairs[s] = pairs
-        middts_to_sim_lat[s] = [lat for (recv, lat) in pairs]
-
-    sim_to_middts_pairs = {}
-    sim_to_middts_lat = {}
-    for s in sensors:
-        sent = data['sim_sent'].get(s, [])
-        recv = data['middts_recv'].get(s, [])
-        pairs = match_sent_to_recv(sent, recv)
-        sim_to_middts_pairs[s] = pairs
-        sim_to_middts_lat[s] = [lat for (recv, lat) in pairs]
+    # pair and summarise every sensor (both directions); REPORT_JOBS spreads sensors over processes
+    reports = sensor_reports(data, sensors, report_jobs())
+    middts_to_sim_pairs = {s: rep['m2s']['pairs'] for s, rep in reports.items()}
+    middts_to_sim_lat = {s: [lat for (recv, lat) in pairs] for s, pairs in middts_to_sim_pairs.items()}
+    sim_to_middts_pairs = {s: rep['s2m']['pairs'] for s, rep in reports.items()}
+    sim_to_middts_lat = {s: [lat for (recv, lat) in pairs] for s, pairs in sim_to_middts_pairs.items()}
 
     # Sent/received counts per direction
     sent_counts_m2s = {s: len(middts_sent.get(s, [])) for s in sensors}
@@ -264,20 +480,9 @@ def main():
     # Timeliness (T) per direction
     T_table_m2s = {}
     T_table_s2m = {}
-    for s in sensors:
-        recs_m = middts_to_sim_lat.get(s, [])
-        if recs_m:
-            on_time = sum(1 for l in recs_m if (l / 1000.0) <= DEADLINE_S)
-            T_table_m2s[s] = on_time / float(len(recs_m))
-        else:
-            T_table_m2s[s] = 0.0
-
-        recs_s = sim_to_middts_lat.get(s, [])
-        if recs_s:
-            on_time_s = sum(1 for l in recs_s if (l / 1000.0) <= DEADLINE_S)
-            T_table_s2m[s] = on_time_s / float(len(recs_s))
-        else:
-            T_table_s2m[s] = 0.0
+    for s, rep in reports.items():
+        T_table_m2s[s] = rep['m2s']['on_time'] / float(recv_counts_m2s[s]) if recv_counts_m2s[s] else 0.0
+        T_table_s2m[s] = rep['s2m']['on_time'] / float(recv_counts_s2m[s]) if recv_counts_s2m[s] else 0.0
 
     # Reliability (R) per direction
     R_table_m2s = {}
@@ -291,11 +496,33 @@ def main():
         recvc2 = recv_counts_s2m.get(s, 0)
         R_table_s2m[s] = (recvc2 / float(sentc2)) if sentc2 > 0 else 0.0
 
-    A_table = compute_availability(data['events_time_by_sensor'], data['start_ts'], data['stop_ts'])
+    A_curves = compute_availability_multi(data['events_time_by_sensor'], data['start_ms'], data['stop_ms'],
+                                          avail_intervals())
+    A_table = A_curves[AVAIL_INTERVAL]
 
     ts = datetime.utcnow().strftime('%Y%m%dT%H%M%SZ')
     results_dir = out_dir
     os.makedirs(results_dir, exist_ok=True)
+
+    # per-sensor latency sketches next to the latencia_stats CSVs, so global
+    # percentiles can be merged later without the raw export
+    for name, direction in (('middts_to_simulator', 'm2s'), ('simulator_to_middts', 's2m')):
+        write_latency_stats(os.path.join(results_dir, f'{profile}_latencia_stats_{name}_{ts}.csv'),
+                            reports, direction)
+        sketches = {s: rep[direction]['sketch'] for s, rep in reports.items() if rep[direction]['sketch'].count}
+        write_sketch_file(os.path.join(results_dir, f'{profile}_latencia_sketch_{name}_{ts}.json'),
+                          sketches, direction=name)
+    # availability at every AVAIL_INTERVALS granularity (A column of the ODTE uses AVAIL_INTERVAL)
+    avail_out = os.path.join(results_dir, f'{profile}_availability_{ts}.csv')
+    with open(avail_out, 'w', newline='') as f:
+        w = csv.writer(f)
+        intervals = sorted(A_curves)
+        w.writerow(['sensor'] + [f'A_{i:g}s' for i in intervals])
+        for s in sorted(sensors):
+            w.writerow([s] + [f'{A_curves[i].get(s, 0.0):.6f}' for i in intervals])
+        if sensors:
+            w.writerow(['mean'] + [f'{sum(A_curves[i].get(s, 0.0) for s in sensors) / len(sensors):.6f}'
+                                   for i in intervals])
     odte_out = os.path.join(results_dir, f'{profile}_odte_{ts}.csv')
     with open(odte_out, 'w', newline='') as f:
         w = csv.writer(f)
@@ -377,7 +604,7 @@ def main():
                     recv_ts_m = [t for t in sim_recv.get(s, []) if (t/1000.0) >= wstart and (t/1000.0) < wend]
                     sc_m = len(sent_ts_m)
                     # latencies for middts->sim whose recv is in window
-                    lat_pairs_m = match_sent_to_recv(middts_sent.get(s, []), sim_recv.get(s, []))
+                    lat_pairs_m = middts_to_sim_pairs.get(s, [])
                     lat_in_window_m = [lat for (recv, lat) in lat_pairs_m if (recv/1000.0) >= wstart and (recv/1000.0) < wend]
                     rc_m = len(lat_in_window_m)
 
@@ -385,7 +612,7 @@ def main():
                     sent_ts_s = [t for t in data['sim_sent'].get(s, []) if (t/1000.0) >= wstart and (t/1000.0) < wend]
                     recv_ts_s = [t for t in data['middts_recv'].get(s, []) if (t/1000.0) >= wstart and (t/1000.0) < wend]
                     sc_s = len(sent_ts_s)
-                    lat_pairs_s = match_sent_to_recv(data['sim_sent'].get(s, []), data['middts_recv'].get(s, []))
+                    lat_pairs_s = sim_to_middts_pairs.get(s, [])
                     lat_in_window_s = [lat for (recv, lat) in lat_pairs_s if (recv/1000.0) >= wstart and (recv/1000.0) < wend]
                     rc_s = len(lat_in_window_s)
 
@@ -397,4 +624,8 @@ def main():
 
                     T_s_dir = (sum(1 for l in lat_in_window_m if (l/1000.0) <= DEADLINE_S) / float(rc_m)) if rc_m > 0 else 0.0
                     R_s_dir = (rc_m / float(sc_m)) if sc_m > 0 else 0.0
-                    T_m_dir = (sum(1 for l in lat_in_window_s if (l/1000.0) <= DEADLINE_S) / float(rc_s)) if rc_s > 0 else 0.0
\ No newline at end of file
+                    T_m_dir = (sum(1 for l in lat_in_window_s if (l/1000.0) <= DEADLINE_S) / float(rc_s)) if rc_s > 0 else 0.0
+
+
+if __name__ == '__main__':
+    main()
@@ -14,6 +14,8 @@ import matplotlib.pyplot as plt
 from shutil import copyfile
 from matplotlib import image as mpimg
 
+from _export_cache import iter_export_records
+
 try:
     from services.topology.topology_visualizer import TopologyVisualizer
 except Exception:
@@ -35,7 +37,8 @@ def find_latest_test(profile):
     return dirs[-1]
 
 def read_raw_csv(test_dir):
-    candidates = glob.glob(os.path.join(test_dir, '*.csv'))
+    candidates = [c for pattern in ('*.csv', '*.csv.gz', '*.csv.zst')
+                  for c in glob.glob(os.path.join(test_dir, pattern))]
     for c in candidates:
         if os.path.basename(c).startswith('generated_reports'):
             continue
@@ -45,68 +48,18 @@ def read_raw_csv(test_dir):
 def extract_samples_from_raw(csv_path):
     samples = {'S2M': [], 'M2S': []}
     try:
-        with open(csv_path, 'r') as f:
-            lines = f.readlines()
-        header_idx = None
-        header_cols = None
-        for i, line in enumerate(lines):
-            if 'direction' in line and ('sensor' in line or 'device' in line):
-                header_idx = i
-                header_cols = [c.strip() for c in line.strip().lstrip(',').split(',')]
-                break
-        if header_idx is None:
-            return samples
-        data_lines = []
-        for ln in lines[header_idx+1:]:
-            if 'direction' in ln and ('sensor' in ln or 'device' in ln):
-                break
-            if ln.strip() == '':
+        # single pass over every table of the export (column cache when available)
+        # recover=False: the figures keep the raw direction tag, as before the shared reader
+        for rec in iter_export_records(csv_path, recover=False):
+            if 'latency' not in rec.measurement or rec.value is None:
+                continue
+            v = float(rec.value)
+            if v > 1e6:
                 continue
-            data_lines.append(ln)
-        if not data_lines:
-            return samples
-        from io import StringIO
-        data_csv = ''.join(data_lines)
-        df = pd.read_csv(StringIO(data_csv), names=header_cols, header=None, dtype=str, engine='python')
-        col_map = {c.lower(): c for c in df.columns}
-        measurement_col = None
-        field_col = None
-        value_col = None
-        direction_col = None
-        sensor_col = None
-        for k, v in col_map.items():
-            if 'measurement' in k:
-                measurement_col = v
-            if 'field' == k or '_field' in k:
-                field_col = v
-            if 'value' in k or '_value' in k:
-                value_col = v
-            if 'direction' in k:
-                direction_col = v
-            if 'sensor' in k or 'device' in k:
-                sensor_col = v
-        if measurement_col is None or field_col is None or value_col is None or direction_col is None:
-            return samples
-        lat_df = df[df[measurement_col].fillna('').str.contains('latency', na=False)]
-        if lat_df.empty:
-            return samples
-        numeric = pd.to_numeric(lat_df[value_col], errors='coerce')
-        if numeric.notna().sum() > 0:
-            lat_df['_numval'] = numeric
-            for _, row in lat_df.iterrows():
-                d = str(row.get(direction_col, '') or '')
-                val = row.get('_numval')
-                if pd.isna(val):
-                    continue
-                v = float(val)
-                if v > 1e10:
-                    continue
-                if v > 1e6:
-                    continue
-                if 'S2M' in d:
-                    samples['S2M'].append(v)
-                elif 'M2S' in d:
-                    samples['M2S'].append(v)
+            if 'S2M' in rec.direction:
+                samples['S2M'].append(v)
+            elif 'M2S' in rec.direction:
+                samples['M2S'].append(v)
     except Exception:
         return {'S2M': [], 'M2S': []}
     return samples
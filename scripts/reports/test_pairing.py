@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Differential test: match_sent_to_recv (bisect sweep) vs the original quadratic pairing.
+
+Both must return exactly the same [(recv, latency)] list. Inputs cover random lists
+with duplicate timestamps, latencies exactly at ``max_latency_ms``, receives before
+any send, lost commands/responses, and traffic shaped like the
+results/marco-2026-03-13 runs (25 sensors, 600 s, ~60 ms S2M / ~300 ms M2S with
+occasional slow responses and duplicated replies).
+
+Runs under pytest or directly:
+  python3 scripts/reports/test_pairing.py
+"""
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'report_generators'))
+
+from generate_reports_from_export import _match_sent_to_recv_reference, match_sent_to_recv  # noqa: E402
+
+
+def _check(sent, recv, max_latency_ms=10000):
+    expected = _match_sent_to_recv_reference(sent, recv, max_latency_ms)
+    got = match_sent_to_recv(sent, recv, max_latency_ms)
+    assert got == expected, (sent, recv, max_latency_ms, got, expected)
+
+
+def test_edge_cases():
+    _check([], [])
+    _check([1, 2], [])
+    _check([], [1, 2])
+    _check([5], [1, 2, 3])                      # every recv before the send
+    _check([0, 0, 0], [10, 10])                 # duplicate sends, fewer recvs
+    _check([0, 10], [10, 10, 10])               # duplicate recvs, tie with a send
+    _check([0], [100], max_latency_ms=100)      # exactly at the limit
+    _check([0], [101], max_latency_ms=100)      # just past the limit
+    _check([0, 1], [101, 101], max_latency_ms=100)
+    _check([50, 0], [150, 40])                  # unsorted input
+
+
+def test_random_lists():
+    rnd = random.Random(20260313)
+    for _ in range(3000):
+        span = rnd.choice((5, 50, 1000))
+        limit = rnd.choice((0, 3, 10, 100))
+        sent = [rnd.randrange(span) for _ in range(rnd.randrange(0, 25))]
+        recv = [rnd.randrange(span) for _ in range(rnd.randrange(0, 25))]
+        # force ties at the limit and receives before the first send
+        recv += [s + limit for s in rnd.sample(sent, min(len(sent), 3))]
+        recv += [min(sent, default=0) - rnd.randrange(1, 5) for _ in range(rnd.randrange(3))]
+        if rnd.random() < 0.5:
+            sent.sort()
+            recv.sort()
+        _check(sent, recv, limit)
+
+
+def _marco_like(rnd, n_events, period_ms, base_ms, jitter_ms, slow_ms, loss, dup):
+    t0 = 1773401938000  # 2026-03-13T11:38:58Z
+    sent, recv = [], []
+    for i in range(n_events):
+        t = t0 + i * period_ms + rnd.randrange(period_ms // 4)
+        sent.append(t)
+        if rnd.random() < loss:
+            continue
+        lat = base_ms + rnd.randrange(jitter_ms) + (slow_ms if rnd.random() < 0.01 else 0)
+        recv.append(t + lat)
+        if rnd.random() < dup:
+            recv.append(t + lat + rnd.randrange(1, 5))
+    return sent, recv
+
+
+def test_marco_style_runs():
+    rnd = random.Random(1)
+    for _ in range(25):
+        # S2M: ~1300 telemetry messages per sensor over 600 s, ~60 ms
+        _check(*_marco_like(rnd, 1300, 460, 40, 50, 300, 0.01, 0.0))
+        # M2S: ~60 commands per sensor, ~300 ms with rare ~650 ms replies and retries
+        _check(*_marco_like(rnd, 60, 10000, 280, 70, 350, 0.0, 0.001))
+    # overload: responses slower than the send period, some beyond the limit
+    _check(*_marco_like(rnd, 400, 100, 900, 400, 12000, 0.05, 0.02))
+
+
+if __name__ == '__main__':
+    for name, fn in sorted(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f'{name}: ok')
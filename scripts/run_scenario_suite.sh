@@ -13,6 +13,14 @@ NC='\033[0m'
 log() { echo -e "${BLUE}[$(date '+%H:%M:%S')]${NC} $*"; }
 success() { echo -e "${GREEN}[OK] $*${NC}"; }
 error() { echo -e "${RED}[ERR] $*${NC}"; }
+# cat an Influx export, decompressing .gz/.zst
+cat_export() {
+    case "$1" in
+        *.gz) gzip -dc "$1" ;;
+        *.zst) zstd -dcq "$1" ;;
+        *) cat "$1" ;;
+    esac
+}
 
 CURRENT_SCREEN=""
 CURRENT_TEST_PID=""
@@ -37,6 +45,7 @@ USE_RAW_CONFIG=0  # Use raw configs (high timeout) to measure real latencies
 TESTS_FILTER=""  # Empty = run all tests; "1,3,5" = run only tests 1,3,5; "2,4" with skip = run 1,3,5
 ENABLE_M2S_PERF_7=0  # Optional scenario 7 with M2S-focused middleware tuning
 BUILD_IMAGES=0  # Rebuild Docker images before running the suite
+WARM_TOPOLOGY=0  # Keep topology + databases up between scenarios (services/topology/warm_reset.py)
 
 # Args:
 #   ./scripts/run_scenario_suite.sh 300
@@ -46,6 +55,7 @@ BUILD_IMAGES=0  # Rebuild Docker images before running the suite
 #   ./scripts/run_scenario_suite.sh --skip 2,4 --duration 300
 #   ./scripts/run_scenario_suite.sh --raw --duration 300  # Raw configs without timeout artificial
 #   ./scripts/run_scenario_suite.sh --duration 300 --m2s-perf --build-images
+#   ./scripts/run_scenario_suite.sh --duration 300 --full --warm  # One bring-up for the whole suite
 while [ $# -gt 0 ]; do
     case "$1" in
         --duration)
@@ -80,6 +90,12 @@ while [ $# -gt 0 ]; do
             BUILD_IMAGES=1
             shift
             ;;
+        --warm)
+            # Bring the topology up once; between scenarios only reshape links,
+            # swap the TB config and reset Influx/digital twins
+            WARM_TOPOLOGY=1
+            shift
+            ;;
         --test)
             # Single test: --test 1
             TESTS_FILTER="$2"
@@ -134,7 +150,7 @@ while [ $# -gt 0 ]; do
             shift
             ;;
         --help|-h)
-            echo "Uso: $0 [--duration SEGUNDOS] [--raw] [--test N] [--tests N,M,P] [--skip N,M] [--full] [--m2s-perf] [--with-link-events] [--build-images]"
+            echo "Uso: $0 [--duration SEGUNDOS] [--raw] [--test N] [--tests N,M,P] [--skip N,M] [--full] [--m2s-perf] [--with-link-events] [--build-images] [--warm]"
             echo ""
             echo "Opções:"
             echo "  --duration N        : Duração de cada teste em segundos [padrão: 180]"
@@ -146,6 +162,8 @@ while [ $# -gt 0 ]; do
             echo "  --m2s-perf          : Rodar suite + Teste 7 URLLC M2S Performance (1-7)"
             echo "  --with-link-events  : Habilita link scheduler (desabilitado por padrão)"
             echo "  --build-images      : Executa 'make build-images' uma vez antes da suite"
+            echo "  --warm              : Sobe a topologia uma vez e a reaproveita entre cenários"
+            echo "                        (reaplica links/netem, troca o YAML do TB, limpa Influx e DTs)"
             echo ""
             echo "Cenários:"
             echo "  Test 1: URLLC Otimizado       [150ms timeout]"
@@ -162,12 +180,13 @@ while [ $# -gt 0 ]; do
             echo "  $0 --duration 150 --m2s-perf          # Suite + cenário 7 M2S"
             echo "  $0 --duration 150 --test 7            # Apenas cenário 7"
             echo "  $0 --duration 600 --m2s-perf --build-images"
+            echo "  $0 --duration 150 --full --warm       # Suite padrão com uma única subida da topologia"
 
             exit 0
             ;;
         --*)
             error "Flag invalida: '$1'"
-            echo "Uso: $0 [--duration SEGUNDOS] [--raw] [--test N] [--tests N,M,P] [--skip N,M] [--with-link-events] [--build-images]"
+            echo "Uso: $0 [--duration SEGUNDOS] [--raw] [--test N] [--tests N,M,P] [--skip N,M] [--with-link-events] [--build-images] [--warm]"
             exit 2
             ;;
         *)
@@ -187,6 +206,12 @@ should_run_test() {
     echo ",$TESTS_FILTER," | grep -q ",$test_num," && return 0 || return 1
 }
 
+# Last scenario of this run: in warm mode the topology is only torn down after it
+LAST_TEST=0
+for i in $(seq 1 7); do
+    should_run_test "$i" && LAST_TEST="$i"
+done
+
 case "$TEST_DURATION" in
     ''|*[!0-9]*)
         error "Duracao invalida: '$TEST_DURATION' (use inteiro em segundos)"
@@ -220,6 +245,11 @@ if [ "$WITH_LINK_EVENTS" -eq 1 ]; then
 else
     log "Link Scheduler: DESABILITADO"
 fi
+if [ "$WARM_TOPOLOGY" -eq 1 ]; then
+    log "Topologia: WARM (uma subida, reset entre cenários)"
+else
+    log "Topologia: COLD (recriada a cada cenário)"
+fi
 if [ "$BUILD_IMAGES" -eq 1 ]; then
     log "Imagens: REBUILD antes da suite"
 else
@@ -236,26 +266,34 @@ if [ "$BUILD_IMAGES" -eq 1 ]; then
     }
 fi
 
-run_scenario() {
-    local num="$1" profile="$2" tb_flag="$3" desc="$4"
-    local scenario_failed=0
-    
-    # Adjust description based on mode
-    if [ "$USE_RAW_CONFIG" -eq 1 ]; then
-        case "$num" in
-            1) desc="URLLC + TB 30000ms RAW (measure real latencies)" ;;
-            2) desc="eMBB + TB 5000ms RAW (measure real latencies)" ;;
-            3) desc="eMBB + TB 5000ms RAW (measure real latencies)" ;;
-            4) desc="Best-Effort + TB 10000ms RAW (measure real latencies)" ;;
-            5) desc="Best-Effort + TB 10000ms RAW (measure real latencies)" ;;
-            6) desc="Best-Effort + TB 10000ms RAW (measure real latencies)" ;;
-        esac
+# warm_reset_topology <profile> <tb_flag>: reuse the topology left up by the previous
+# scenario (--warm). Returns 1 when there is nothing to reuse or the reset failed, in
+# which case the caller does a cold bring-up.
+warm_reset_topology() {
+    local profile="$1" tb_flag="$2"
+    [ "$WARM_TOPOLOGY" -eq 1 ] && [ -n "$CURRENT_SCREEN" ] || return 1
+    if ! screen -list 2>/dev/null | grep -q "\\.${CURRENT_SCREEN}[[:space:]]" \
+        || ! docker ps --format '{{.Names}}' | grep -q '^mn\.tb$'; then
+        error "Topologia warm ($CURRENT_SCREEN) não está mais ativa; recriando"
+        return 1
     fi
-    
-    log ""
-    log "==========================================="
-    log "[$num/7] $desc"
-    log "==========================================="
+    local warm_args=(--profile "$profile")
+    [ "$USE_RAW_CONFIG" -eq 1 ] && warm_args+=(--raw)
+    echo " $tb_flag " | grep -q -- "--m2s-perf" && warm_args+=(--m2s-perf)
+    log "1. [warm] Reaproveitando topologia ($CURRENT_SCREEN): links, config TB, Influx, DTs..."
+    local started=$SECONDS
+    if ! sudo python3 services/topology/warm_reset.py "${warm_args[@]}"; then
+        error "Reset warm falhou; recriando topologia"
+        screen -ls | grep -E "[0-9]+\.${CURRENT_SCREEN}[[:space:]]" | awk '{print $1}' | xargs -r -I{} screen -S {} -X quit 2>/dev/null || true
+        CURRENT_SCREEN=""
+        return 1
+    fi
+    log "   Topologia pronta para $profile em $((SECONDS - started))s (sem nova subida)"
+}
+
+# bring_up_topology <num> <profile> <tb_flag>: clean state and start a fresh topology
+bring_up_topology() {
+    local num="$1" profile="$2" tb_flag="$3"
     log "1. Limpando..."
     timeout 60 make clean >/dev/null 2>&1 || true
     
@@ -340,6 +378,31 @@ run_scenario() {
     done
     log "5. Iniciando teste em 10s..."
     sleep 10
+}
+
+run_scenario() {
+    local num="$1" profile="$2" tb_flag="$3" desc="$4"
+    local scenario_failed=0
+    
+    # Adjust description based on mode
+    if [ "$USE_RAW_CONFIG" -eq 1 ]; then
+        case "$num" in
+            1) desc="URLLC + TB 30000ms RAW (measure real latencies)" ;;
+            2) desc="eMBB + TB 5000ms RAW (measure real latencies)" ;;
+            3) desc="eMBB + TB 5000ms RAW (measure real latencies)" ;;
+            4) desc="Best-Effort + TB 10000ms RAW (measure real latencies)" ;;
+            5) desc="Best-Effort + TB 10000ms RAW (measure real latencies)" ;;
+            6) desc="Best-Effort + TB 10000ms RAW (measure real latencies)" ;;
+        esac
+    fi
+    
+    log ""
+    log "==========================================="
+    log "[$num/7] $desc"
+    log "==========================================="
+    if ! warm_reset_topology "$profile" "$tb_flag"; then
+        bring_up_topology "$num" "$profile" "$tb_flag" || return 1
+    fi
     log "6. Executando (${TEST_DURATION}s)..."
     rm -f .current_slice_profile
     
@@ -369,16 +432,31 @@ run_scenario() {
     sleep 60
     log "8. Coletando..."
     latest_test_dir=$(find outputs/results -maxdepth 1 -type d -name "test_*_${profile}" -printf '%T@ %p\n' 2>/dev/null | sort -rn | head -1 | cut -d' ' -f2-)
-    latest_device_csv=$(find "$latest_test_dir" -maxdepth 1 -type f -name "*_device_data.csv" | head -1)
-    latest_latency_csv=$(find "$latest_test_dir" -maxdepth 1 -type f -name "*_latency_measurement.csv" | head -1)
+    # exports may be stored compressed (INFLUX_EXPORT_COMPRESS=gz|zst in apply_slice.sh)
+    latest_device_csv=$(find "$latest_test_dir" -maxdepth 1 -type f \( -name "*_device_data.csv" -o -name "*_device_data.csv.gz" -o -name "*_device_data.csv.zst" \) | head -1)
+    latest_latency_csv=$(find "$latest_test_dir" -maxdepth 1 -type f \( -name "*_latency_measurement.csv" -o -name "*_latency_measurement.csv.gz" -o -name "*_latency_measurement.csv.zst" \) | head -1)
+    latest_m2s_pairs_csv=$(find "$latest_test_dir" -maxdepth 1 -type f \( -name "*_m2s_pairs.csv" -o -name "*_m2s_pairs.csv.gz" -o -name "*_m2s_pairs.csv.zst" \) | head -1)
     latest_summary=$(find "$latest_test_dir" -maxdepth 1 -type f -name "summary_*.txt" | head -1)
     latest_latency_analysis=$(find "$latest_test_dir" -maxdepth 1 -type f -name "latency_analysis.txt" | head -1)
     latest_correlation=$(find "$latest_test_dir" -maxdepth 1 -type f -name "latency_analysis_correlation.txt" | head -1)
     
-    if [ -n "$latest_device_csv" ] && [ -s "$latest_device_csv" ] && [ -n "$latest_latency_csv" ] && [ -s "$latest_latency_csv" ]; then
-        # Copy CSVs for archival
-        cp "$latest_device_csv" "$RESULTS_DIR/test_${num}_device_data.csv"
-        cp "$latest_latency_csv" "$RESULTS_DIR/test_${num}_latency_measurement.csv"
+    # INFLUX_M2S_EXPORT=pushdown replaces the raw latency export with the M2S pairs file
+    local has_latency=0 has_pairs=0
+    [ -n "$latest_latency_csv" ] && [ -s "$latest_latency_csv" ] && has_latency=1
+    [ -n "$latest_m2s_pairs_csv" ] && [ -s "$latest_m2s_pairs_csv" ] && has_pairs=1
+    if [ -n "$latest_device_csv" ] && [ -s "$latest_device_csv" ] && { [ "$has_latency" = 1 ] || [ "$has_pairs" = 1 ]; }; then
+        # Copy CSVs for archival (keeping the .csv/.csv.gz/.csv.zst extension)
+        local device_out="$RESULTS_DIR/test_${num}_device_data.${latest_device_csv#*_device_data.}"
+        local latency_out="" pairs_out=""
+        cp "$latest_device_csv" "$device_out"
+        if [ "$has_latency" = 1 ]; then
+            latency_out="$RESULTS_DIR/test_${num}_latency_measurement.${latest_latency_csv#*_latency_measurement.}"
+            cp "$latest_latency_csv" "$latency_out"
+        fi
+        if [ "$has_pairs" = 1 ]; then
+            pairs_out="$RESULTS_DIR/test_${num}_m2s_pairs.${latest_m2s_pairs_csv#*_m2s_pairs.}"
+            cp "$latest_m2s_pairs_csv" "$pairs_out"
+        fi
         
         # Copy analysis files already generated by apply_slice.sh (these use correlation_id and dedup logic)
         [ -f "$latest_summary" ] && cp "$latest_summary" "$RESULTS_DIR/test_${num}_summary.txt"
@@ -389,8 +467,8 @@ run_scenario() {
         merged_csv="$RESULTS_DIR/test_${num}.csv"
         {
             echo ",result,table,_start,_stop,_time,_value,_field,_measurement,direction,dt_id,request_id,sensor,source"
-            tail -n +2 "$latest_device_csv" | awk -F',' 'BEGIN{OFS=","} {print $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,"",$11,$12,$13}'
-            tail -n +2 "$latest_latency_csv"
+            cat_export "$latest_device_csv" | tail -n +2 | awk -F',' 'BEGIN{OFS=","} {print $1,$2,$3,$4,$5,$6,$7,$8,$9,$10,"",$11,$12,$13}'
+            if [ "$has_latency" = 1 ]; then cat_export "$latest_latency_csv" | tail -n +2; fi
         } > "$merged_csv"
         
         success "Resultados copiados para Teste $num (usando análise correta do apply_slice.sh)"
@@ -402,24 +480,30 @@ run_scenario() {
             --reports-dir "$reports_dir" \
             --profile "$profile" \
             --summary "$RESULTS_DIR/test_${num}_summary.txt" \
-            --device-csv "$RESULTS_DIR/test_${num}_device_data.csv" \
-            --latency-csv "$RESULTS_DIR/test_${num}_latency_measurement.csv" 2>/dev/null \
+            --device-csv "$device_out" \
+            --latency-csv "$latency_out" \
+            --m2s-pairs-csv "$pairs_out" \
+            $( [ -s "${latest_test_dir}/link_events.jsonl" ] && echo --link-events "${latest_test_dir}/link_events.jsonl" ) 2>/dev/null \
             || log "[AVISO] compute metrics falhou para teste ${num} (nao critico)"
     else
-        error "CSVs do teste ausentes ou vazios (device_data + latency_measurement)"
+        error "CSVs do teste ausentes ou vazios (device_data + latency_measurement/m2s_pairs)"
         scenario_failed=1
     fi
-    log "9. Limpando..."
-    screen -ls | grep -E "[0-9]+\.${CURRENT_SCREEN}[[:space:]]" | awk '{print $1}' | xargs -r -I{} screen -S {} -X quit 2>/dev/null || true
-    CURRENT_SCREEN=""
-    timeout 60 make clean >/dev/null 2>&1 || true
-    sleep 5
     if [ -f "$RESULTS_DIR/test_${num}_correlation.txt" ]; then
         success "Teste $num OK"
     else
         error "Teste $num FALHOU (sem correlation report)"
         scenario_failed=1
     fi
+    if [ "$WARM_TOPOLOGY" -eq 1 ] && [ "$scenario_failed" -eq 0 ] && [ "$num" -ne "$LAST_TEST" ]; then
+        log "9. [warm] Mantendo topologia ($CURRENT_SCREEN) para o próximo cenário"
+    else
+        log "9. Limpando..."
+        screen -ls | grep -E "[0-9]+\.${CURRENT_SCREEN}[[:space:]]" | awk '{print $1}' | xargs -r -I{} screen -S {} -X quit 2>/dev/null || true
+        CURRENT_SCREEN=""
+        timeout 60 make clean >/dev/null 2>&1 || true
+        sleep 5
+    fi
 
     if [ "$scenario_failed" -ne 0 ]; then
         return 1
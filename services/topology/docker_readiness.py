@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""Event-driven readiness waits for the Containernet topology.
+
+topo_qos.py used to poll ``docker inspect`` and ``ip -o link show`` in 0.25-1 s sleep
+loops for every service, one after the other. ``ReadinessWatcher`` subscribes once
+to two streams and wakes the waiters as soon as the state they wait for appears:
+
+- ``docker events`` (container start/die) -> running containers and their PIDs
+  (one ``docker inspect`` per container start, instead of one per poll);
+- ``ip -o monitor link`` (netlink RTM_NEWLINK/RTM_DELLINK) -> host interface names.
+
+If either stream cannot be started (no docker CLI, no iproute2) the corresponding
+waits fall back to the original polling, so callers do not need to care.
+
+``ContainerCache`` holds ``docker inspect`` output for every ``mn.*`` container,
+fetched in one ``docker inspect`` call per refresh. The watcher invalidates it on each
+start/die event, so PIDs, IPs and state are served from memory between events (with a
+short TTL instead when the event stream is unavailable).
+"""
+import json
+import os
+import re
+import subprocess
+import threading
+import time
+
+_LINK_RE = re.compile(r'^(Deleted\s+)?\d+:\s+([^:@\s]+)(?:@[^:\s]+)?:')
+
+
+class ContainerCache:
+    """In-memory ``docker inspect`` data for all containers whose name starts with ``prefix``."""
+
+    def __init__(self, prefix='mn.', ttl=None, min_refresh_interval=0.2):
+        self.prefix = prefix
+        self.ttl = ttl            # None: valid until invalidate()
+        self.min_refresh_interval = min_refresh_interval
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self._data = {}
+        self._stamp = None        # monotonic time of the last refresh, None when stale
+
+    def invalidate(self):
+        with self._lock:
+            self._stamp = None
+
+    def refresh(self):
+        """One ``docker ps`` + one ``docker inspect`` covering every matching container."""
+        with self._lock:
+            self._refresh_locked()
+
+    def _refresh_locked(self):
+        data = {}
+        try:
+            ps = subprocess.run(['docker', 'ps', '-aq', '--no-trunc', '--filter', f'name={self.prefix}'],
+                                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=15)
+            ids = ps.stdout.decode().split()
+            if ids:
+                # exits non-zero if a container vanished meanwhile; the others are still printed
+                p = subprocess.run(['docker', 'inspect'] + ids,
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30)
+                for entry in json.loads(p.stdout.decode() or '[]'):
+                    name = entry.get('Name', '').lstrip('/')
+                    if name.startswith(self.prefix):
+                        data[name] = entry
+        except Exception:
+            pass
+        self._data = data
+        self._stamp = time.monotonic()
+        self.refreshes += 1
+
+    def get(self, cname):
+        """Inspect dict for ``cname`` (None if unknown); refreshes only when stale or on a miss."""
+        if not cname.startswith(self.prefix):
+            return _inspect_one(cname)
+        with self._lock:
+            now = time.monotonic()
+            stale = self._stamp is None or (self.ttl is not None and now - self._stamp > self.ttl)
+            # a miss may be a container created since the last refresh (creation emits no event)
+            missing = cname not in self._data and now - (self._stamp or 0) > self.min_refresh_interval
+            if stale or missing:
+                self._refresh_locked()
+            return self._data.get(cname)
+
+    def names(self, running_only=True):
+        """Container names from the last refresh."""
+        with self._lock:
+            return [n for n, d in self._data.items()
+                    if not running_only or (d.get('State') or {}).get('Running')]
+
+    def running(self, cname):
+        entry = self.get(cname)
+        return bool(entry and (entry.get('State') or {}).get('Running'))
+
+    def pid(self, cname):
+        entry = self.get(cname)
+        pid = (entry.get('State') or {}).get('Pid') if entry else None
+        return pid if isinstance(pid, int) and pid > 0 else None
+
+    def ip(self, cname):
+        """``NetworkSettings.IPAddress`` (default bridge), or '' when not attached."""
+        entry = self.get(cname)
+        return ((entry or {}).get('NetworkSettings') or {}).get('IPAddress') or ''
+
+    def network_ips(self, cname):
+        """IPs of every docker network the container is attached to, in inspect order."""
+        entry = self.get(cname)
+        nets = ((entry or {}).get('NetworkSettings') or {}).get('Networks') or {}
+        return [v.get('IPAddress') for v in nets.values() if v.get('IPAddress')]
+
+
+class ReadinessWatcher:
+    def __init__(self, containers=None):
+        self._cond = threading.Condition()
+        self._running = set()     # container names (mn.<svc>) currently running
+        self._links = set()       # host interface names
+        self.containers = containers or ContainerCache()
+        self._procs = []
+        self._threads = []
+        self.docker_active = False
+        self.links_active = False
+
+    # -- lifecycle ---------------------------------------------------------
+    def start(self):
+        """Subscribe to the streams, then take one snapshot so nothing is missed."""
+        self.docker_active = self._spawn(
+            ['docker', 'events', '--format', '{{json .}}', '--filter', 'type=container',
+             '--filter', 'event=start', '--filter', 'event=die'], self._on_docker_event)
+        self.links_active = self._spawn(['ip', '-o', 'monitor', 'link'], self._on_link_line)
+        if self.docker_active:
+            self.containers.refresh()
+            with self._cond:
+                self._running.update(self.containers.names())
+                self._cond.notify_all()
+        else:
+            # no events to invalidate the cache: keep entries only briefly
+            self.containers.ttl = 0.5
+        if self.links_active:
+            try:
+                p = subprocess.run(['ip', '-o', 'link', 'show'],
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=15)
+                for line in p.stdout.decode().splitlines():
+                    self._on_link_line(line)
+            except Exception:
+                self.links_active = False
+        return self
+
+    def stop(self):
+        for proc in self._procs:
+            try:
+                proc.terminate()
+                proc.wait(timeout=3)
+            except Exception:
+                try:
+                    proc.kill()
+                except Exception:
+                    pass
+        self._procs = []
+        self.docker_active = self.links_active = False
+        self.containers.ttl = 0.5
+
+    def _spawn(self, cmd, handler):
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                    bufsize=1, universal_newlines=True)
+        except OSError:
+            return False
+        time.sleep(0.05)
+        if proc.poll() is not None:
+            return False
+        self._procs.append(proc)
+        t = threading.Thread(target=self._pump, args=(proc, handler), daemon=True)
+        t.start()
+        self._threads.append(t)
+        return True
+
+    def _pump(self, proc, handler):
+        for line in proc.stdout:
+            try:
+                handler(line.rstrip('\n'))
+            except Exception:
+                pass
+
+    # -- stream handlers ---------------------------------------------------
+    def _on_docker_event(self, line):
+        ev = json.loads(line)
+        actor = ev.get('Actor') or {}
+        name = (actor.get('Attributes') or {}).get('name', '')
+        action = ev.get('Action') or ev.get('status')
+        if not name:
+            return
+        if action not in ('start', 'die'):
+            return
+        self.containers.invalidate()
+        with self._cond:
+            if action == 'start':
+                self._running.add(name)
+            else:
+                self._running.discard(name)
+            self._cond.notify_all()
+
+    def _on_link_line(self, line):
+        m = _LINK_RE.match(line.strip())
+        if not m:
+            return
+        with self._cond:
+            if m.group(1):
+                self._links.discard(m.group(2))
+            else:
+                self._links.add(m.group(2))
+            self._cond.notify_all()
+
+    # -- waits -------------------------------------------------------------
+    def _wait(self, predicate, timeout):
+        with self._cond:
+            return self._cond.wait_for(predicate, timeout=timeout)
+
+    def wait_running(self, cname, timeout=15):
+        """True once container ``cname`` (e.g. 'mn.tb') is running."""
+        if not self.docker_active:
+            return _poll(lambda: self.containers.running(cname), timeout, 0.5)
+        return self._wait(lambda: cname in self._running, timeout)
+
+    def wait_pid(self, cname, timeout=15):
+        """PID of running container ``cname`` or None after ``timeout``."""
+        if not self.docker_active:
+            return _poll(lambda: self.containers.pid(cname), timeout, 1.0) or None
+        if not self._wait(lambda: cname in self._running, timeout):
+            return None
+        # the start event invalidated the cache: the first caller refreshes it for everyone
+        return self.containers.pid(cname)
+
+    def wait_link(self, fragment, timeout=20):
+        """True once a host interface whose name contains ``fragment`` exists."""
+        if not self.links_active:
+            return _poll(lambda: fragment in _ip_link_show(), timeout, 0.5)
+        return self._wait(lambda: any(fragment in name for name in self._links), timeout)
+
+
+def _poll(check, timeout, interval):
+    deadline = time.time() + timeout
+    while True:
+        try:
+            result = check()
+            if result:
+                return result
+        except Exception:
+            pass
+        if time.time() >= deadline:
+            return False
+        time.sleep(interval)
+
+
+def _inspect_one(cname):
+    try:
+        p = subprocess.run(['docker', 'inspect', cname],
+                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=10)
+        data = json.loads(p.stdout.decode() or '[]') if p.returncode == 0 else []
+    except Exception:
+        return None
+    return data[0] if data else None
+
+
+def _ip_link_show():
+    p = subprocess.run(['ip', '-o', 'link', 'show'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    return p.stdout.decode()
+
+
+def netns_exists(pid):
+    return bool(pid) and os.path.exists(f'/proc/{pid}/ns/net')
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""Slice profiles shared by topo_qos.py and the warm scenario reset.
+
+``PROFILE_LINK_PRESETS`` holds the TCLink parameters (bandwidth Mbps, delay, loss %)
+of each profile and ``tb_config_name`` picks the ThingsBoard YAML under ``config/``,
+so a topology that is already running can be switched to the exact values a fresh
+``make topo PROFILE=...`` would use.
+"""
+
+# URLLC profile optimized based on test results for <200ms latency goal
+PROFILE_LINK_PRESETS = {
+    'urllc': {'bw': 1000, 'delay': '0.05ms', 'loss': 0},
+    'eMBB': {'bw': 300, 'delay': '25ms', 'loss': 0.2},
+    'best_effort': {'bw': 200, 'delay': '50ms', 'loss': 0.5}
+}
+
+_TB_CONFIG_BASE = {
+    'urllc': 'thingsboard-urllc',
+    'embb': 'thingsboard-embb',
+    'best_effort': 'thingsboard-best-effort',
+}
+
+
+def resolve_profile(name):
+    """Preset key for ``name`` (case-insensitive, e.g. 'embb' -> 'eMBB'), or None."""
+    if name in PROFILE_LINK_PRESETS:
+        return name
+    key = str(name).lower().replace('-', '_')
+    for k in PROFILE_LINK_PRESETS:
+        if k.lower() == key:
+            return k
+    return None
+
+
+def tb_config_name(profile, raw=False, m2s_perf=False):
+    """ThingsBoard config file for ``profile``; URLLC config for unknown profiles.
+
+    The M2S performance config only exists for URLLC; RAW exists for every profile.
+    """
+    key = str(profile).lower().replace('-', '_')
+    if m2s_perf and key == 'urllc':
+        suffix = '-m2s-perf'
+    elif raw:
+        suffix = '-raw'
+    else:
+        suffix = ''
+    return f"{_TB_CONFIG_BASE.get(key, 'thingsboard-urllc')}{suffix}.yml"
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""Link-event scheduler for scripts/link_schedule.csv.
+
+apply_slice.sh used to walk the schedule in a bash subshell: each event slept with
+``sleep`` on the wall clock, ran one or more ``docker exec`` per target (so an event
+fired seconds late), and the end of a down/degrade window was another background
+``( sleep ...; ... ) &`` racing with the next event; a flap blocked every later row.
+
+``LinkScheduler`` expands the whole schedule into one sorted timeline of actions
+(down/up, degrade/restore, flap cycles, baseline markers), resolves the targets and
+their PIDs with one ``docker inspect`` before the first event, and keeps one
+``ip -batch -`` and one ``tc -batch -`` process open per container network namespace
+(``nsenter``, or ``docker exec -i`` when not root). Firing an action is a line written
+to those pipes at the planned time on a monotonic clock: the loop sleeps until ~2 ms
+before the deadline and spins for the rest.
+
+Each action is appended to ``link_events.jsonl`` in the run folder with the planned and
+actual fire times (``lag_ms``, taken per container), keeping the
+``timestamp/epoch/target/event`` fields of the old bash scheduler. A restore puts the
+profile tbf/netem back only on the containers apply_topo_profile shapes
+(``--shaped-containers``); the others (core services) just lose the degrade qdisc. On
+SIGTERM/SIGINT links that are still down are brought up and degraded links restored
+before exiting::
+
+  link_scheduler.py --schedule scripts/link_schedule.csv --start-epoch 1700000000 \\
+      --events-log outputs/results/test_X/link_events.jsonl --restore-rate-mbit 200 \\
+      --restore-delay 50ms --restore-loss 0.5 --shaped-containers mn.sim_001,mn.sim_002
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+# offset: seconds from the start epoch; kind: down | up | degrade | restore | baseline
+Action = namedtuple('Action', ('offset', 'kind', 'target', 'mode', 'params', 'row'))
+ScheduleRow = namedtuple('ScheduleRow', ('start_offset', 'duration', 'target', 'mode', 'params'))
+
+SPIN_SECONDS = 0.002
+
+
+def parse_params(text):
+    """``cycles=5;down=10;up=50`` -> dict."""
+    params = {}
+    for part in (text or '').split(';'):
+        key, sep, value = part.strip().partition('=')
+        if sep and key:
+            params[key.strip()] = value.strip()
+    return params
+
+
+def load_schedule(path):
+    rows = []
+    with open(path, newline='') as f:
+        for fields in csv.reader(f):
+            if not fields or not fields[0].strip() or fields[0].strip().startswith('#'):
+                continue
+            fields += [''] * (5 - len(fields))
+            try:
+                start = float(fields[0])
+                duration = float(fields[1] or 0)
+            except ValueError:
+                continue
+            rows.append(ScheduleRow(start, duration, fields[2].strip(), fields[3].strip().lower(),
+                                    parse_params(','.join(fields[4:]))))
+    return rows
+
+
+def expand_schedule(rows):
+    """Timeline of actions (sorted by offset, stable for equal offsets)."""
+    actions = []
+    for i, r in enumerate(rows):
+        if r.mode == 'down':
+            actions.append(Action(r.start_offset, 'down', r.target, r.mode, r.params, i))
+            actions.append(Action(r.start_offset + r.duration, 'up', r.target, r.mode, r.params, i))
+        elif r.mode == 'flap':
+            cycles = int(r.params.get('cycles', 5))
+            down_t = float(r.params.get('down', 10))
+            up_t = float(r.params.get('up', 50))
+            for c in range(cycles):
+                t = r.start_offset + c * (down_t + up_t)
+                actions.append(Action(t, 'down', r.target, r.mode, r.params, i))
+                actions.append(Action(t + down_t, 'up', r.target, r.mode, r.params, i))
+        elif r.mode == 'degrade':
+            actions.append(Action(r.start_offset, 'degrade', r.target, r.mode, r.params, i))
+            actions.append(Action(r.start_offset + r.duration, 'restore', r.target, r.mode, r.params, i))
+        elif r.mode == 'baseline':
+            actions.append(Action(r.start_offset, 'baseline', r.target, r.mode, r.params, i))
+        else:
+            print(f'[scheduler] unknown mode {r.mode!r} in row {i + 1}; ignored', file=sys.stderr)
+    return sorted(actions, key=lambda a: a.offset)
+
+
+def resolve_targets(pattern, names):
+    """Container names for a schedule target ('global', a regex, or a literal name)."""
+    if pattern == 'global':
+        return sorted(n for n in names if n.startswith('mn.'))
+    try:
+        matched = sorted(n for n in names if re.search(pattern, n))
+    except re.error:
+        matched = []
+    return matched or [pattern]
+
+
+def _netem_args(params):
+    args = []
+    for key in ('delay', 'jitter', 'loss'):
+        if params.get(key):
+            args.append(f'{key} {params[key]}')
+    return ' '.join(args) or 'delay 100ms'
+
+
+class _NetnsPipes:
+    """Persistent ``ip -batch -`` / ``tc -batch -`` processes inside one container netns."""
+
+    def __init__(self, cname, pid):
+        self.cname = cname
+        self.pid = pid
+        self.procs = {}
+
+    def _prefix(self):
+        if self.pid and os.geteuid() == 0 and shutil.which('nsenter'):
+            return ['nsenter', '-t', str(self.pid), '-n']
+        return ['docker', 'exec', '-i', self.cname]
+
+    def open(self):
+        for tool in ('ip', 'tc'):
+            self.procs[tool] = subprocess.Popen(
+                self._prefix() + [tool, '-force', '-batch', '-'], stdin=subprocess.PIPE,
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, universal_newlines=True, bufsize=1)
+        return self
+
+    def send(self, tool, *lines):
+        proc = self.procs[tool]
+        proc.stdin.write(''.join(f'{line}\n' for line in lines))
+        proc.stdin.flush()
+
+    def close(self):
+        for proc in self.procs.values():
+            try:
+                proc.stdin.close()
+                proc.wait(5)
+            except (OSError, subprocess.TimeoutExpired):
+                proc.kill()
+
+
+class LinkScheduler:
+    def __init__(self, actions, start_epoch, events_log=None, dev='eth0', restore=None,
+                 pid_resolver=None, names=(), shaped=None):
+        """``restore``: (rate_mbit, delay, loss) re-applied after a degrade on the ``shaped``
+        containers (all when None); the others, or all when ``restore`` is None, only get
+        the root qdisc deleted."""
+        self.actions = actions
+        self.dev = dev
+        self.restore = restore
+        self.shaped = None if shaped is None else set(shaped)
+        self.events_log = events_log
+        # wall-clock start epoch mapped onto the monotonic clock once
+        self.start_epoch = float(start_epoch)
+        self.t0 = time.monotonic() - (time.time() - self.start_epoch)
+        self.pid_resolver = pid_resolver
+        self.names = list(names)
+        self.targets = {}      # schedule target -> [container names]
+        self.pipes = {}        # container -> _NetnsPipes
+        self.down = set()      # containers whose link is down
+        self.degraded = set()  # containers with the degrade qdisc
+        self.lags = []
+        self._stop = False
+
+    def prepare(self):
+        """Resolve every target and open the namespace pipes before the first event."""
+        for action in self.actions:
+            if action.target not in self.targets:
+                self.targets[action.target] = resolve_targets(action.target, self.names)
+        for cname in sorted({c for cs in self.targets.values() for c in cs}):
+            try:
+                self.pipes[cname] = _NetnsPipes(cname, self.pid_resolver(cname)).open()
+            except OSError as e:
+                print(f'[scheduler] cannot open netns of {cname}: {e}', file=sys.stderr)
+        return self
+
+    def stop(self, *_):
+        self._stop = True
+
+    def run(self):
+        for action in self.actions:
+            deadline = self.t0 + action.offset
+            if not self._wait_until(deadline):
+                break
+            for cname in self.targets.get(action.target, []):
+                self._fire(action, cname, deadline)
+            if action.kind == 'baseline':
+                self._log(action, action.target, deadline, time.monotonic())
+        self.cleanup()
+        return self.lags
+
+    def _wait_until(self, deadline):
+        while not self._stop:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            if remaining > SPIN_SECONDS:
+                time.sleep(min(remaining - SPIN_SECONDS, 0.5))
+        return False
+
+    def _fire(self, action, cname, deadline):
+        pipes = self.pipes.get(cname)
+        if pipes is None:
+            return
+        dev = self.dev
+        fired = time.monotonic()
+        try:
+            if action.kind == 'down':
+                pipes.send('ip', f'link set dev {dev} down')
+                self.down.add(cname)
+            elif action.kind == 'up':
+                pipes.send('ip', f'link set dev {dev} up')
+                self.down.discard(cname)
+            elif action.kind == 'degrade':
+                rate = action.params.get('bw', '50mbit')
+                pipes.send('tc', f'qdisc del dev {dev} root',
+                           f'qdisc add dev {dev} root handle 1:0 tbf rate {rate} burst 32kbit latency 400ms',
+                           f'qdisc add dev {dev} parent 1:0 handle 10: netem {_netem_args(action.params)}')
+                self.degraded.add(cname)
+            elif action.kind == 'restore':
+                pipes.send('tc', *self._restore_lines(cname))
+                self.degraded.discard(cname)
+            else:
+                return
+        except OSError as e:
+            print(f'[scheduler] {action.kind} on {cname} failed: {e}', file=sys.stderr)
+            return
+        self._log(action, cname, deadline, fired)
+
+    def _restore_lines(self, cname):
+        lines = [f'qdisc del dev {self.dev} root']
+        if self.restore and (self.shaped is None or cname in self.shaped):
+            rate, delay, loss = self.restore
+            lines += [f'qdisc add dev {self.dev} root handle 1:0 tbf rate {rate}mbit burst 32kbit latency 400ms',
+                      f'qdisc add dev {self.dev} parent 1:0 handle 10: netem delay {delay} loss {loss}%']
+        return lines
+
+    def _log(self, action, target, deadline, fired):
+        planned = self.start_epoch + action.offset
+        actual = planned + (fired - deadline)
+        lag_ms = (fired - deadline) * 1000.0
+        self.lags.append(lag_ms)
+        event = 'baseline' if action.kind == 'baseline' else action.kind
+        print(f'[scheduler] {event:8s} {target} offset={action.offset:g}s lag={lag_ms:.2f}ms', flush=True)
+        if not self.events_log:
+            return
+        record = {
+            'timestamp': datetime.fromtimestamp(actual, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + 'Z',
+            'epoch': round(actual, 6),
+            'target': target,
+            'event': event,
+            'mode': action.mode,
+            'row': action.row,
+            'offset_s': action.offset,
+            'planned_epoch': round(planned, 6),
+            'lag_ms': round(lag_ms, 3),
+        }
+        if action.kind == 'degrade':
+            record['params'] = action.params
+        with open(self.events_log, 'a') as f:
+            f.write(json.dumps(record) + '\n')
+
+    def cleanup(self):
+        """Bring links up and restore degraded qdiscs left by an interrupted schedule."""
+        for cname in sorted(self.down):
+            try:
+                self.pipes[cname].send('ip', f'link set dev {self.dev} up')
+            except OSError:
+                pass
+        for cname in sorted(self.degraded):
+            try:
+                self.pipes[cname].send('tc', *self._restore_lines(cname))
+            except OSError:
+                pass
+        for pipes in self.pipes.values():
+            pipes.close()
+
+
+def main():
+    p = argparse.ArgumentParser(description='Fire link_schedule.csv events on a monotonic clock')
+    p.add_argument('--schedule', required=True)
+    p.add_argument('--start-epoch', type=float, default=None, help='wall-clock test start (default: now)')
+    p.add_argument('--events-log', default=None, help='link_events.jsonl to append to')
+    p.add_argument('--dev', default='eth0')
+    p.add_argument('--restore-rate-mbit', default=None)
+    p.add_argument('--restore-delay', default=None)
+    p.add_argument('--restore-loss', default=None)
+    p.add_argument('--shaped-containers', default=None,
+                   help='comma-separated containers the restore shaping applies to (default: all)')
+    args = p.parse_args()
+
+    actions = expand_schedule(load_schedule(args.schedule))
+    if not actions:
+        print(f'[scheduler] no events in {args.schedule}')
+        return 0
+    from docker_readiness import ContainerCache
+    cache = ContainerCache()
+    cache.refresh()
+    restore = None
+    if args.restore_rate_mbit and args.restore_delay and args.restore_loss is not None:
+        restore = (args.restore_rate_mbit, args.restore_delay, args.restore_loss)
+    shaped = None
+    if args.shaped_containers is not None:
+        shaped = [c for c in args.shaped_containers.split(',') if c]
+    sched = LinkScheduler(actions, args.start_epoch or time.time(), args.events_log, args.dev,
+                          restore, pid_resolver=cache.pid, names=cache.names(), shaped=shaped)
+    signal.signal(signal.SIGTERM, sched.stop)
+    signal.signal(signal.SIGINT, sched.stop)
+    sched.prepare()
+    print(f'[scheduler] {len(actions)} actions over {len(sched.pipes)} containers', flush=True)
+    lags = sched.run()
+    if lags:
+        print(f'[scheduler] fired {len(lags)} events: mean lag {sum(lags) / len(lags):.2f}ms, '
+              f'max {max(lags):.2f}ms', flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+"""Single asyncio log collector for the topology containers.
+
+topo_qos.py used to start one ``sh -c "docker logs -f ..."`` per container, plus a
+``while true; sleep 2`` shell watcher per container that did not exist yet.
+``LogCollector`` replaces those with one background thread running an asyncio loop
+that talks to the Docker Engine API over its UNIX socket:
+
+- ``GET /events`` (container start) attaches followers as soon as a registered
+  container starts or restarts; no polling for missing containers;
+- ``GET /containers/<name>/logs?follow=1`` streams stdout+stderr (demultiplexed for
+  non-TTY containers) into the host file, buffered and flushed in batches;
+- host files are rotated by size with copy-and-truncate (``path.1`` .. ``path.N``)
+  because the same files are bind-mounted into the containers, so renaming them would
+  leave the containers writing to the rotated copy.
+
+``LogCollector.start_if_available()`` returns None when the Docker socket is not
+usable; topo_qos then keeps its ``docker logs -f`` followers.
+"""
+import asyncio
+import json
+import os
+import shutil
+import threading
+import time
+from urllib.parse import quote
+
+DEFAULT_SOCKET = '/var/run/docker.sock'
+
+
+def docker_socket_path():
+    host = os.environ.get('DOCKER_HOST', '')
+    if host.startswith('unix://'):
+        return host[len('unix://'):]
+    return DEFAULT_SOCKET if not host else None
+
+
+class _LogFile:
+    """Append-only host log with a write buffer and size-based rotation."""
+
+    def __init__(self, path, max_bytes, backups):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.buf = bytearray()
+
+    def flush(self):
+        if not self.buf:
+            return
+        data, self.buf = bytes(self.buf), bytearray()
+        with open(self.path, 'ab') as f:
+            f.write(data)
+            size = f.tell()
+        if self.max_bytes and size >= self.max_bytes:
+            self.rotate()
+
+    def rotate(self):
+        for i in range(self.backups - 1, 0, -1):
+            src = f'{self.path}.{i}'
+            if os.path.exists(src):
+                os.replace(src, f'{self.path}.{i + 1}')
+        if self.backups:
+            shutil.copyfile(self.path, f'{self.path}.1')
+        with open(self.path, 'r+b') as f:
+            f.truncate(0)
+
+
+class LogCollector:
+    def __init__(self, socket_path=None, max_bytes=None, backups=3, flush_interval=0.5,
+                 flush_bytes=256 * 1024):
+        self.socket_path = socket_path or docker_socket_path()
+        if max_bytes is None:
+            max_bytes = int(os.environ.get('TOPO_LOG_MAX_BYTES', str(50 * 1024 * 1024)) or 0)
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.flush_interval = flush_interval
+        self.flush_bytes = flush_bytes
+        self._targets = {}        # container name -> _LogFile
+        self._following = set()   # container names with an open logs stream
+        self._since = {}          # container name -> unix time the last stream ended
+        self._loop = None
+        self._thread = None
+        self._tasks = set()
+
+    @classmethod
+    def start_if_available(cls, **kwargs):
+        path = docker_socket_path()
+        if not path or not os.path.exists(path) or not os.access(path, os.R_OK | os.W_OK):
+            return None
+        return cls(socket_path=path, **kwargs).start()
+
+    # -- thread-side API ---------------------------------------------------
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(ready,), daemon=True)
+        self._thread.start()
+        ready.wait(5)
+        return self
+
+    def follow(self, names, host_path):
+        """Append the logs of the first of ``names`` that runs to ``host_path``.
+
+        Containers that do not exist yet are attached when docker reports their start.
+        """
+        if isinstance(names, str):
+            names = [names]
+        self._loop.call_soon_threadsafe(self._register, list(names), host_path)
+
+    def stop(self, timeout=5):
+        if not self._loop or self._loop.is_closed():
+            return
+        fut = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        try:
+            fut.result(timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    # -- event loop ----------------------------------------------------------
+    def _run(self, ready):
+        asyncio.set_event_loop(self._loop)
+        self._spawn(self._watch_events())
+        self._spawn(self._flush_loop())
+        self._loop.call_soon(ready.set)
+        try:
+            self._loop.run_forever()
+        finally:
+            self._flush_all()
+            self._loop.run_until_complete(self._loop.shutdown_asyncgens())
+            self._loop.close()
+
+    def _spawn(self, coro):
+        task = self._loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _shutdown(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._flush_all()
+
+    def _register(self, names, host_path):
+        log_file = _LogFile(host_path, self.max_bytes, self.backups)
+        for name in names:
+            self._targets.setdefault(name, log_file)
+        self._spawn(self._attach_first_running(names))
+
+    async def _attach_first_running(self, names):
+        for name in names:
+            try:
+                status, _, body = await self._get(f'/containers/{quote(name)}/json')
+                info = json.loads(await _read_all(body)) if status == 200 else None
+            except (OSError, ValueError):
+                info = None
+            if info and (info.get('State') or {}).get('Running'):
+                self._attach(name, (info.get('Config') or {}).get('Tty', False))
+                return
+
+    def _attach(self, name, tty):
+        if name in self._following:
+            return
+        self._following.add(name)
+        self._spawn(self._stream_logs(name, tty))
+
+    async def _watch_events(self):
+        filters = quote(json.dumps({'type': ['container'], 'event': ['start']}))
+        while True:
+            try:
+                status, _, body = await self._get(f'/events?filters={filters}')
+                if status != 200:
+                    raise OSError(f'/events returned {status}')
+                pending = b''
+                async for chunk in body:
+                    pending += chunk
+                    *lines, pending = pending.split(b'\n')
+                    for line in lines:
+                        if line.strip():
+                            await self._on_event(json.loads(line))
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ValueError, asyncio.IncompleteReadError):
+                pass
+            await asyncio.sleep(1)
+
+    async def _on_event(self, ev):
+        attrs = (ev.get('Actor') or {}).get('Attributes') or {}
+        name = attrs.get('name', '')
+        if name in self._targets and name not in self._following:
+            # one inspect to learn whether the stream is multiplexed (non-TTY)
+            await self._attach_first_running([name])
+
+    async def _stream_logs(self, name, tty):
+        log_file = self._targets[name]
+        since = self._since.get(name, 0)
+        try:
+            status, _, body = await self._get(
+                f'/containers/{quote(name)}/logs?follow=1&stdout=1&stderr=1&since={since}')
+            if status == 200:
+                async for data in (body if tty else _demux(body)):
+                    log_file.buf += data
+                    if len(log_file.buf) >= self.flush_bytes:
+                        log_file.flush()
+        except (OSError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # the stream ends when the container stops; a restart re-attaches via /events
+            self._since[name] = int(time.time())
+            self._following.discard(name)
+            log_file.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self._flush_all()
+
+    def _flush_all(self):
+        for log_file in set(self._targets.values()):
+            try:
+                log_file.flush()
+            except OSError:
+                log_file.buf.clear()
+
+    async def _get(self, path):
+        """Minimal HTTP/1.1 GET over the Docker socket: (status, headers, body iterator)."""
+        reader, writer = await asyncio.open_unix_connection(self.socket_path)
+        writer.write(f'GET {path} HTTP/1.1\r\nHost: docker\r\nConnection: close\r\n\r\n'.encode())
+        await writer.drain()
+        parts = (await reader.readline()).split()
+        if len(parts) < 2 or not parts[1].isdigit():
+            writer.close()
+            raise OSError(f'bad response from docker for {path}')
+        status = int(parts[1])
+        headers = {}
+        while True:
+            line = (await reader.readline()).decode('latin-1').strip()
+            if not line:
+                break
+            key, _, value = line.partition(':')
+            headers[key.strip().lower()] = value.strip()
+        if status != 200:
+            # error bodies are not needed; release the connection right away
+            writer.close()
+            return status, headers, _empty()
+        return status, headers, _body(reader, writer, headers)
+
+
+async def _body(reader, writer, headers):
+    try:
+        if 'chunked' in headers.get('transfer-encoding', ''):
+            while True:
+                size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+                if size == 0:
+                    break
+                yield await reader.readexactly(size)
+                await reader.readline()
+        else:
+            while True:
+                data = await reader.read(65536)
+                if not data:
+                    break
+                yield data
+    finally:
+        writer.close()
+
+
+async def _empty():
+    return
+    yield
+
+
+async def _read_all(body):
+    return b''.join([chunk async for chunk in body])
+
+
+async def _demux(body):
+    """Payloads of Docker's multiplexed stream (8-byte header: stream, 0, 0, 0, size)."""
+    buf = b''
+    async for chunk in body:
+        buf += chunk
+        while len(buf) >= 8:
+            size = int.from_bytes(buf[4:8], 'big')
+            if len(buf) < 8 + size:
+                break
+            yield buf[8:8 + size]
+            buf = buf[8 + size:]
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Batched network configuration inside container network namespaces.
+
+topo_qos.py and apply_slice.sh used to run one ``nsenter -t <pid> -n ip ...`` (or
+``docker exec ... tc``) per change, with sleep-and-retry loops around them. Here each
+namespace is entered once per step and every change goes through a single
+``ip -batch`` / ``tc -batch`` process:
+
+- ``read_netns_state(pid)``: links, IPv4 addresses and routes in one call;
+- ``configure_netns(pid, up, addresses, routes)``: applies only what is missing and
+  reads the state back in the same batch, so success is checked against what the
+  kernel reports right after the change (at most two nsenter calls, none when the
+  namespace is already configured);
+- ``shape_netns(pid, dev, ...)``: tbf + netem shaping and a ``qdisc show`` in one batch,
+  returning what the kernel reports as applied;
+- ``reshape_tclinks(pid, ...)``: changes rate/delay/loss of the Mininet TCLink qdiscs
+  (htb 5: -> class 5:1 -> netem 10:) in place, for the host namespace (``pid=None``)
+  or a container, so a running topology can switch profile without being rebuilt.
+
+As a script it shapes several containers at once (used by apply_slice.sh): the PIDs of
+all targets come from one ``docker inspect`` and the namespaces are shaped concurrently::
+
+  netns_config.py shape --dev eth0 --rate-mbit 200 --delay 50ms --loss 0.5 mn.sim_001 mn.sim_002
+"""
+import argparse
+import re
+import subprocess
+import sys
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+NetnsState = namedtuple('NetnsState', ('links', 'addresses', 'routes'))
+
+_LINK_RE = re.compile(r'^\d+:\s+([^:@\s]+)(?:@\S+)?:\s+<([^>]*)>')
+_ADDR_RE = re.compile(r'^\d+:\s+(\S+)\s+inet\s+(\S+)')   # IPv4 only (not inet6)
+_TCLINK_RE = re.compile(r'^qdisc htb 5: dev (\S+) root')
+_NETEM_RE = re.compile(r'^qdisc netem 10: dev (\S+) parent 5:1')
+_APPLIED_RES = (('rate', re.compile(r'^qdisc tbf 1: .*\brate (\S+)', re.M)),
+                ('delay', re.compile(r'^qdisc netem 10: .*\bdelay (\S+)', re.M)),
+                ('loss', re.compile(r'^qdisc netem 10: .*\bloss (\S+)', re.M)))
+# batch lines take no global options: -o comes from the command line, route show is IPv4
+_SHOW_CMDS = ['link show', 'addr show', 'route show']
+
+
+def _nsenter_batch(pid, tool, commands, timeout=10):
+    """Run ``commands`` through one ``<tool> -force -batch -`` inside the netns of ``pid``.
+
+    ``pid=None`` runs them in the current (host) namespace.
+    """
+    cmd = [tool, '-force', '-batch', '-']
+    if tool == 'ip':
+        cmd.insert(1, '-o')
+    if pid is not None:
+        cmd = ['nsenter', '-t', str(pid), '-n'] + cmd
+    p = subprocess.run(cmd, input='\n'.join(commands) + '\n', stdout=subprocess.PIPE,
+                       stderr=subprocess.PIPE, universal_newlines=True, timeout=timeout)
+    return p.stdout, p.stderr
+
+
+def parse_state(output):
+    """NetnsState from the ``-o`` output of link/addr/route show commands."""
+    links, addresses, routes = {}, {}, set()
+    for line in output.splitlines():
+        m = _LINK_RE.match(line)
+        if m:
+            links[m.group(1)] = set(m.group(2).split(','))
+            continue
+        m = _ADDR_RE.match(line)
+        if m:
+            addresses.setdefault(m.group(1), []).append(m.group(2))
+            continue
+        if line.strip() and not line[0].isspace() and not re.match(r'^\d+:\s', line):
+            routes.add(line.split()[0])
+    return NetnsState(links, addresses, routes)
+
+
+def read_netns_state(pid, timeout=10):
+    out, _ = _nsenter_batch(pid, 'ip', _SHOW_CMDS, timeout)
+    return parse_state(out)
+
+
+def _route_key(dest):
+    return dest[:-3] if dest.endswith('/32') else dest
+
+
+def _has_ip(state, dev, cidr):
+    ip = cidr.split('/')[0]
+    return any(a.split('/')[0] == ip for a in state.addresses.get(dev, []))
+
+
+def _missing(state, up, addresses, routes):
+    missing = [dev for dev in up if 'UP' not in state.links.get(dev, ())]
+    missing += [(dev, cidr) for dev, cidr in addresses if not _has_ip(state, dev, cidr)]
+    missing += [r for r in routes if _route_key(r[0]) not in state.routes]
+    return missing
+
+
+def configure_netns(pid, up=(), addresses=(), routes=(), timeout=10):
+    """Bring ``up`` links up, add ``addresses`` ((dev, cidr)) and ``routes`` ((dest, dev, src)).
+
+    Existing addresses/routes are left untouched (like ``ip ... add`` failing with
+    "File exists"). A /32 route without ``src`` gets the device's first IPv4 address as
+    source. Returns ``(ok, state)`` where ``state`` was read after the changes.
+    """
+    state = read_netns_state(pid, timeout)
+    if not _missing(state, up, addresses, routes):
+        return True, state
+    ops = [f'link set dev {dev} up' for dev in up if 'UP' not in state.links.get(dev, ())]
+    ops += [f'addr add {cidr} dev {dev}' for dev, cidr in addresses if not _has_ip(state, dev, cidr)]
+    for dest, dev, src in routes:
+        if _route_key(dest) in state.routes:
+            continue
+        if not src and dest.endswith('/32'):
+            dev_addrs = state.addresses.get(dev) or [c for d, c in addresses if d == dev]
+            src = dev_addrs[0].split('/')[0] if dev_addrs else None
+        ops.append(f'route add {dest} dev {dev}' + (f' src {src}' if src else ''))
+    out, _ = _nsenter_batch(pid, 'ip', ops + _SHOW_CMDS, timeout)
+    state = parse_state(out)
+    return not _missing(state, up, addresses, routes), state
+
+
+def applied_shaping(qdisc_show):
+    """``rate=.. delay=.. loss=..`` as reported by ``qdisc show`` ('-' for absent fields)."""
+    fields = []
+    for key, regex in _APPLIED_RES:
+        m = regex.search(qdisc_show)
+        fields.append(f"{key}={m.group(1) if m else '-'}")
+    return ' '.join(fields)
+
+
+def shape_netns(pid, dev, rate_mbit, delay, loss, timeout=10):
+    """Replace the root qdisc of ``dev`` with tbf(rate) -> netem(delay, loss).
+
+    Returns ``(status, applied)``: status is 'ok', 'missing' (no such device) or
+    'failed'; ``applied`` is what the kernel reports (see ``applied_shaping``).
+    """
+    out, err = _nsenter_batch(pid, 'tc', [
+        f'qdisc del dev {dev} root',
+        f'qdisc add dev {dev} root handle 1:0 tbf rate {rate_mbit}mbit burst 32kbit latency 400ms',
+        f'qdisc add dev {dev} parent 1:0 handle 10: netem delay {delay} loss {loss}%',
+        f'qdisc show dev {dev}',
+    ], timeout)
+    if 'Cannot find device' in err:
+        return 'missing', ''
+    status = 'ok' if 'qdisc tbf 1:' in out and 'qdisc netem 10:' in out else 'failed'
+    return status, applied_shaping(out)
+
+
+def tclink_devices(pid=None, timeout=10):
+    """Devices shaped by Mininet's TCLink (root ``htb 5:``) in the netns of ``pid``."""
+    out, _ = _nsenter_batch(pid, 'tc', ['qdisc show'], timeout)
+    return [m.group(1) for m in map(_TCLINK_RE.match, out.splitlines()) if m]
+
+
+def reshape_tclinks(pid, rate_mbit, delay, loss, timeout=10):
+    """Set rate/delay/loss on every TCLink device of the netns of ``pid`` (None: host).
+
+    Uses the same class/qdisc handles as TCLink, so the links end up as if they had been
+    created with the new parameters. Returns ``(devices, failed)``.
+    """
+    devs = tclink_devices(pid, timeout)
+    if not devs:
+        return [], []
+    ops = []
+    for dev in devs:
+        ops.append(f'class change dev {dev} parent 5:0 classid 5:1 htb rate {rate_mbit}Mbit burst 15k')
+        ops.append(f'qdisc replace dev {dev} parent 5:1 handle 10: netem delay {delay} loss {loss}%')
+    out, _ = _nsenter_batch(pid, 'tc', ops + ['qdisc show'], timeout)
+    shaped = {m.group(1) for m in map(_NETEM_RE.match, out.splitlines()) if m}
+    return devs, [dev for dev in devs if dev not in shaped]
+
+
+def main():
+    p = argparse.ArgumentParser(description='Apply tc shaping inside container network namespaces')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sp = sub.add_parser('shape', help='tbf + netem on one device of each container')
+    sp.add_argument('containers', nargs='+', help='Docker container names (e.g. mn.sim_001)')
+    sp.add_argument('--dev', default='eth0')
+    sp.add_argument('--rate-mbit', required=True)
+    sp.add_argument('--delay', required=True)
+    sp.add_argument('--loss', required=True)
+    sp.add_argument('--jobs', type=int, default=16, help='namespaces shaped concurrently')
+    args = p.parse_args()
+
+    from docker_readiness import ContainerCache
+    started = time.monotonic()
+    cache = ContainerCache()
+    cache.refresh()
+
+    def shape_one(cname):
+        t0 = time.monotonic()
+        pid = cache.pid(cname)
+        if not pid:
+            return cname, 'no-pid', '', 0.0
+        try:
+            status, applied = shape_netns(pid, args.dev, args.rate_mbit, args.delay, args.loss)
+        except (OSError, subprocess.SubprocessError):
+            status, applied = 'failed', ''
+        return cname, status, applied, time.monotonic() - t0
+
+    counts = {}
+    # one "<container> <status> <dev> rate=.. delay=.. loss=.. <secs>s" line per container
+    # (status: ok | missing | failed | no-pid), then "total ok=N ... <secs>s"
+    with ThreadPoolExecutor(max_workers=max(1, min(args.jobs, len(args.containers)))) as pool:
+        for fut in as_completed([pool.submit(shape_one, c) for c in args.containers]):
+            cname, status, applied, secs = fut.result()
+            counts[status] = counts.get(status, 0) + 1
+            print(f'{cname} {status} {args.dev} {applied or "-"} {secs:.3f}s', flush=True)
+    summary = ' '.join(f'{k}={v}' for k, v in sorted(counts.items()))
+    print(f'total {summary} {time.monotonic() - started:.3f}s', flush=True)
+    return 1 if counts.get('failed') or counts.get('no-pid') else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""Asyncio supervisor for host TCP -> container UNIX-socket proxies.
+
+The previous helpers in topo_qos.py restarted dead socat processes in a single
+blocking pass: each restart slept ``backoff * restarts`` inline (stalling every other
+proxy), and the restarted proxy guessed its socket path and host port from a
+hardcoded table. ``ProxySupervisor`` runs one asyncio task per proxy on a background
+loop:
+
+- the original ``(container, socket path, host port)`` of each proxy is kept and
+  reused on restart; the container PID is resolved again each time, so a restarted
+  container is followed;
+- every ``health_interval`` seconds the forwarded endpoint is probed with a TCP
+  connect to the host port and a connect to the container socket; a dead forwarder or
+  ``health_failures`` failed probes in a row trigger a restart;
+- restarts wait ``backoff * restarts`` seconds with ``asyncio.sleep`` and stop after
+  ``max_restarts``, without blocking the other proxies;
+- a container that is not running yet, or whose socket does not accept connections
+  yet, is polled every ``health_interval`` seconds (state ``waiting``) before the
+  forwarder starts; that wait is not a restart. A proxy that stays healthy for
+  ``healthy_reset`` seconds gets its restart count back to zero.
+
+Forwarders are socat processes (``socat TCP-LISTEN:<port>,reuseaddr,fork
+UNIX-CONNECT:/proc/<pid>/root/<sock>``) or, with ``mode='inprocess'`` or when socat
+is not installed, an asyncio TCP server that splices each client to the socket.
+"""
+import asyncio
+import os
+import shutil
+import subprocess
+import threading
+from collections import namedtuple
+
+ProxySpec = namedtuple('ProxySpec', ('svc', 'container', 'sock_path', 'host_port', 'logfile'))
+
+
+class ProxySupervisor:
+    def __init__(self, pid_resolver, log=print, mode=None, max_restarts=5, backoff=2.0,
+                 health_interval=5.0, health_failures=2, probe_timeout=2.0, healthy_reset=60.0):
+        """``pid_resolver(container)`` returns the container's PID or None (may block)."""
+        self.pid_resolver = pid_resolver
+        self.log = log
+        mode = mode or os.environ.get('TOPO_PROXY_MODE', 'socat')
+        if mode == 'socat' and shutil.which('socat') is None:
+            mode = 'inprocess'
+        self.mode = mode
+        self.max_restarts = max_restarts
+        self.backoff = backoff
+        self.health_interval = health_interval
+        self.health_failures = health_failures
+        self.probe_timeout = probe_timeout
+        self.healthy_reset = healthy_reset
+        self._specs = {}      # svc -> ProxySpec
+        self._tasks = {}      # svc -> asyncio.Task
+        self._state = {}      # svc -> {'state', 'restarts', 'pid'}
+        self._loop = None
+        self._thread = None
+
+    # -- thread-side API ---------------------------------------------------
+    def start(self):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def add(self, svc, container, sock_path, host_port, logfile=None):
+        """Start supervising a proxy; no-op if ``svc`` is already supervised."""
+        spec = ProxySpec(svc, container, sock_path, int(host_port), logfile)
+        fut = asyncio.run_coroutine_threadsafe(self._add(spec), self._loop)
+        return fut.result(10)
+
+    def status(self):
+        """``{svc: {'state', 'restarts', 'pid'}}`` snapshot."""
+        fut = asyncio.run_coroutine_threadsafe(self._snapshot(), self._loop)
+        return fut.result(10)
+
+    def stop(self, timeout=10):
+        if not self._loop or not self._loop.is_running():
+            return
+        fut = asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        try:
+            fut.result(timeout)
+        except Exception:
+            pass
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+
+    # -- event loop ----------------------------------------------------------
+    async def _add(self, spec):
+        task = self._tasks.get(spec.svc)
+        if task and not task.done():
+            return False
+        self._specs[spec.svc] = spec
+        self._state[spec.svc] = {'state': 'starting', 'restarts': 0, 'pid': None}
+        self._tasks[spec.svc] = self._loop.create_task(self._supervise(spec))
+        return True
+
+    async def _snapshot(self):
+        return {svc: dict(st) for svc, st in self._state.items()}
+
+    async def _shutdown(self):
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+    async def _supervise(self, spec):
+        st = self._state[spec.svc]
+        while True:
+            forwarder = None
+            try:
+                pid = await self._loop.run_in_executor(None, self.pid_resolver, spec.container)
+                proc_sock = f"/proc/{pid}/root/{spec.sock_path.lstrip('/')}" if pid else None
+                if not pid or not await self._socket_ready(proc_sock):
+                    # container or socket not there yet: wait without spending a restart
+                    if st['state'] != 'waiting':
+                        self.log(f"[PROXY] {spec.svc}: waiting for {spec.container}:{spec.sock_path}")
+                    st['state'] = 'waiting'
+                    await asyncio.sleep(self.health_interval)
+                    continue
+                st['pid'] = pid
+                forwarder = await self._start_forwarder(spec, proc_sock)
+                st['state'] = 'running'
+                if st['restarts'] == 0:
+                    self.log(f"[PROXY] started proxy {spec.svc} -> pid={pid} host_port={spec.host_port} ({self.mode})")
+                await self._watch(spec, st, forwarder, proc_sock)
+                self.log(f"[PROXY] {spec.svc} unhealthy (port {spec.host_port} -> {spec.container}:{spec.sock_path})")
+            except Exception as e:
+                self.log(f"[PROXY] {spec.svc}: failed to start forwarder: {e}")
+            finally:
+                if forwarder is not None:
+                    await forwarder.close()
+            st['restarts'] += 1
+            if st['restarts'] > self.max_restarts:
+                st['state'] = 'failed'
+                self.log(f"[PROXY] {spec.svc} exceeded max restarts ({self.max_restarts}), not restarting")
+                return
+            delay = self.backoff * st['restarts']
+            st['state'] = 'backoff'
+            self.log(f"[PROXY] restarting {spec.svc} (attempt {st['restarts']}) after {delay}s")
+            await asyncio.sleep(delay)
+
+    async def _watch(self, spec, st, forwarder, proc_sock):
+        """Return once the forwarder died or failed ``health_failures`` probes in a row.
+
+        Resets ``st['restarts']`` once the proxy has been healthy for ``healthy_reset`` s.
+        """
+        failures = 0
+        healthy = 0.0
+        while True:
+            await asyncio.sleep(self.health_interval)
+            if not forwarder.alive():
+                return
+            if await self._probe(spec.host_port, proc_sock):
+                failures = 0
+                healthy += self.health_interval
+                if st['restarts'] and healthy >= self.healthy_reset:
+                    st['restarts'] = 0
+                continue
+            healthy = 0.0
+            failures += 1
+            if failures >= self.health_failures:
+                return
+
+    async def _socket_ready(self, proc_sock):
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_unix_connection(proc_sock), self.probe_timeout)
+        except (OSError, asyncio.TimeoutError):
+            return False
+        writer.close()
+        return True
+
+    async def _probe(self, host_port, proc_sock):
+        for opener in (lambda: asyncio.open_connection('127.0.0.1', host_port),
+                       lambda: asyncio.open_unix_connection(proc_sock)):
+            try:
+                _, writer = await asyncio.wait_for(opener(), self.probe_timeout)
+            except (OSError, asyncio.TimeoutError):
+                return False
+            writer.close()
+        return True
+
+    async def _start_forwarder(self, spec, proc_sock):
+        if self.mode == 'inprocess':
+            return await _InprocForwarder.start(spec.host_port, proc_sock)
+        return await _SocatForwarder.start(spec.host_port, proc_sock, spec.logfile)
+
+
+class _SocatForwarder:
+    def __init__(self, proc, logfile):
+        self.proc = proc
+        self.logfile = logfile
+
+    @classmethod
+    async def start(cls, host_port, proc_sock, logfile_path=None):
+        lf = None
+        if logfile_path:
+            os.makedirs(os.path.dirname(logfile_path), exist_ok=True)
+            lf = open(logfile_path, 'ab')
+        out = lf if lf else subprocess.DEVNULL
+        # reuseaddr,fork so multiple clients are handled and socat can be restarted safely
+        proc = await asyncio.create_subprocess_exec(
+            'socat', f'TCP-LISTEN:{host_port},reuseaddr,fork', f'UNIX-CONNECT:{proc_sock}',
+            stdout=out, stderr=out)
+        return cls(proc, lf)
+
+    def alive(self):
+        return self.proc.returncode is None
+
+    async def close(self):
+        if self.proc.returncode is None:
+            self.proc.terminate()
+            try:
+                await asyncio.wait_for(self.proc.wait(), 3)
+            except asyncio.TimeoutError:
+                self.proc.kill()
+                await self.proc.wait()
+        if self.logfile:
+            self.logfile.close()
+
+
+class _InprocForwarder:
+    def __init__(self, server, proc_sock):
+        self.server = server
+        self.proc_sock = proc_sock
+
+    @classmethod
+    async def start(cls, host_port, proc_sock):
+        self = cls(None, proc_sock)
+        self.server = await asyncio.start_server(self._handle, port=host_port, reuse_address=True)
+        return self
+
+    def alive(self):
+        return self.server.sockets is not None and len(self.server.sockets) > 0
+
+    async def _handle(self, client_r, client_w):
+        try:
+            up_r, up_w = await asyncio.open_unix_connection(self.proc_sock)
+        except OSError:
+            client_w.close()
+            return
+        try:
+            await asyncio.gather(_pipe(client_r, up_w), _pipe(up_r, client_w))
+        finally:
+            client_w.close()
+            up_w.close()
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+
+async def _pipe(reader, writer):
+    """Copy until EOF, then half-close ``writer`` so the other direction keeps flowing."""
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+        if writer.can_write_eof():
+            writer.write_eof()
+    except OSError:
+        pass
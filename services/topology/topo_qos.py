@@ -5,18 +5,151 @@ import subprocess
 import argparse
 import sys
 import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from mininet.net import Containernet
-from mininet.node import Controller
+from mininet.node import Controller, Docker
 from mininet.link import TCLink
 from mininet.cli import CLI
 from mininet.log import setLogLevel, info
+from mininet.util import ipAdd, macColonHex
 import json
+import atexit
+import csv
+from contextlib import contextmanager
+from docker_readiness import ReadinessWatcher, netns_exists
+from netns_config import configure_netns
+from log_collector import LogCollector
+from proxy_supervisor import ProxySupervisor
+from link_profiles import PROFILE_LINK_PRESETS, resolve_profile, tb_config_name
+from volume_snapshot import SnapshotError, restore_snapshot
 
 # CLI-controlled verbosity flags (module defaults)
 QUIET = True
 VERBOSE = False
+# Containers created concurrently during bring-up (TOPO_PARALLEL_WORKERS=1 restores serial creation)
+TOPO_PARALLEL_WORKERS = int(os.environ.get('TOPO_PARALLEL_WORKERS', '8') or 1)
+
+
+class PhaseTimer:
+    """Wall-clock time spent in each bring-up phase (time since the previous mark).
+
+    ``with timer.span(name):`` times a block inside the current phase; spans nest, and
+    are attached to the phase that the next ``mark()`` closes. ``write()`` saves the
+    whole timeline (phases at depth 0, spans below them) as JSON and CSV, with ``meta``
+    (set as the bring-up learns it) in the JSON.
+    """
+
+    FIELDS = ('name', 'parent', 'depth', 'start_s', 'duration_s')
+
+    def __init__(self):
+        self.start = self.last = time.monotonic()
+        self.started_at = time.time()
+        self.phases = []
+        self.entries = []
+        self._stack = []
+        self._pending = []   # finished spans whose phase is not closed yet
+        self.meta = {}
+        self.written = None  # path of the last write()
+
+    def mark(self, name):
+        now = time.monotonic()
+        self.phases.append((name, now - self.last))
+        self.entries.append({'name': name, 'parent': '', 'depth': 0,
+                             'start_s': round(self.last - self.start, 3), 'duration_s': round(now - self.last, 3)})
+        for entry in self._pending:
+            entry['depth'] += 1
+            entry['parent'] = entry['parent'] or name
+            self.entries.append(entry)
+        self._pending = []
+        self.last = now
+
+    @contextmanager
+    def span(self, name):
+        t0 = time.monotonic()
+        entry = {'name': name, 'parent': self._stack[-1]['name'] if self._stack else '',
+                 'depth': len(self._stack), 'start_s': round(t0 - self.start, 3), 'duration_s': None}
+        self._stack.append(entry)
+        try:
+            yield entry
+        finally:
+            self._stack.pop()
+            entry['duration_s'] = round(time.monotonic() - t0, 3)
+            self._pending.append(entry)
+
+    def timeline(self):
+        return sorted(self.entries, key=lambda e: (e['start_s'], e['depth']))
+
+    def report(self, table=False):
+        total = time.monotonic() - self.start
+        print("[TIMING] " + ", ".join(f"{name}={secs:.1f}s" for name, secs in self.phases) + f" | total={total:.1f}s")
+        if table:
+            print(f"[TIMING] {'phase':<36} {'seconds':>8} {'share':>6}")
+            for e in self.timeline():
+                label = '  ' * e['depth'] + e['name']
+                print(f"[TIMING] {label:<36} {e['duration_s']:>8.1f} {100.0 * e['duration_s'] / max(total, 1e-9):>5.1f}%")
+
+    def write(self, out_dir, **meta):
+        """Write topo_timing_<ts>.json/.csv into ``out_dir``; returns the JSON path."""
+        stamp = time.strftime('%Y%m%d_%H%M%S', time.localtime(self.started_at))
+        base = os.path.join(out_dir, f'topo_timing_{stamp}')
+        doc = dict(self.meta, **meta)
+        doc.update(started_at=time.strftime('%Y-%m-%dT%H:%M:%S%z', time.localtime(self.started_at)),
+                   total_s=round(time.monotonic() - self.start, 3), timeline=self.timeline())
+        os.makedirs(out_dir, exist_ok=True)
+        with open(base + '.json', 'w') as f:
+            json.dump(doc, f, indent=2)
+        with open(base + '.csv', 'w', newline='') as f:
+            w = csv.DictWriter(f, fieldnames=self.FIELDS)
+            w.writeheader()
+            w.writerows(doc['timeline'])
+        self.written = base + '.json'
+        return self.written
+
+
+def _list_containers():
+    """``{name: id}`` of every container (running or not), or None if docker failed."""
+    try:
+        p = subprocess.run(['docker', 'ps', '-a', '--format', '{{.ID}} {{.Names}}'],
+                           stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, timeout=30)
+    except Exception:
+        return None
+    if p.returncode != 0:
+        return None
+    found = {}
+    for line in p.stdout.decode().splitlines():
+        parts = line.split(None, 1)
+        if len(parts) == 2:
+            found[parts[1].strip()] = parts[0]
+    return found
+
+
+def precleanup_containers(names):
+    """Remove leftover mn.<name> containers with one `docker ps` + one `docker rm -f` (volumes kept).
+
+    Returns the names confirmed absent afterwards (a second `docker ps` when something
+    was removed), so safe_add can skip its own per-container lookup for those only.
+    """
+    found = _list_containers()
+    if found is None:
+        return set()
+    ids = [found[f"mn.{n}"] for n in names if f"mn.{n}" in found]
+    if not ids:
+        return set(names)
+    info(f"[PRECLEAN] removing {len(ids)} existing container(s) in one call (volumes preserved)\n")
+    try:
+        subprocess.run(['docker', 'rm', '-f'] + ids, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False, timeout=120)
+    except Exception:
+        pass
+    remaining = _list_containers()
+    if remaining is None:
+        return set()
+    left = [n for n in names if f"mn.{n}" in remaining]
+    if left:
+        info(f"[PRECLEAN][WARN] still present after docker rm -f: {left}; safe_add will retry them\n")
+    return set(names) - set(left)
+
 
-# Remove containers e volumes antigos antes de iniciar
 def cleanup_containers():
     info("[🧹] Removendo containers e volumes antigos tb/db\n")
     subprocess.run("docker rm -f mn.tb mn.db", shell=True)
@@ -87,7 +220,29 @@ def wait_for_thingsboard(host='10.0.0.2', port=8080, timeout=180, interval=3):
     info(f"[tb][wait] Timeout aguardando ThingsBoard em {url}\n")
     return False
 
+DEPLOY_LOGS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../deploy/logs'))
+
+
 def run_topo(num_sims=5):
+    """Bring the topology up; the timing timeline is written even when bring-up aborts."""
+    timer = PhaseTimer()
+    timer.meta['num_sims'] = num_sims
+    try:
+        _run_topo(num_sims, timer)
+    finally:
+        if timer.written is None:
+            # early return or exception before the normal write: keep the partial timeline,
+            # with the time since the last mark (and its open spans) closed as 'aborted'
+            last = timer.phases[-1][0] if timer.phases else 'start'
+            timer.mark('aborted')
+            try:
+                path = timer.write(DEPLOY_LOGS_DIR, status='aborted', aborted_after=last)
+                print(f"[TIMING] bring-up aborted after {last}; partial timeline written to {path} (+ .csv)")
+            except Exception as e:
+                print(f"[timing][WARN] failed to write timing report: {e}")
+
+
+def _run_topo(num_sims, timer):
     setLogLevel('info')
     # When running, honor QUIET/VERBOSE globals set at module import
     # If QUIET is True, suppress low-level info messages (they will be replaced by concise prints)
@@ -107,9 +262,29 @@ def run_topo(num_sims=5):
         # replace info globally in this module
         globals()['info'] = _noop_info
     cleanup_containers()
+    # subscribe to docker events / link notifications before any container is created;
+    # readiness waits below resolve on those events instead of polling
+    readiness = ReadinessWatcher().start()
+    atexit.register(readiness.stop)
+    if not (readiness.docker_active and readiness.links_active):
+        print("[WARN] docker events / ip monitor unavailable; readiness waits fall back to polling")
+    # one batched lookup/removal for every container this topology will create
+    precleaned = precleanup_containers(
+        ['db', 'influxdb', 'neo4j', 'tb', 'middts'] + [f'sim_{i:03d}' for i in range(1, num_sims + 1)])
+    timer.mark('cleanup')
     # Summary: CLEANUP
     if QUIET:
         print("[CLEANUP] removed old containers/volumes (best-effort)")
+    # Optional: recreate the data volumes from a provisioned snapshot (volume_snapshot.py save),
+    # so the ThingsBoard install and the device provisioning below are skipped
+    snapshot_name = os.environ.get('TOPO_SNAPSHOT')
+    if snapshot_name:
+        try:
+            secs = restore_snapshot(snapshot_name)
+            print(f"[SNAPSHOT] volumes restored from '{snapshot_name}' in {secs:.1f}s")
+        except (SnapshotError, OSError, subprocess.SubprocessError) as e:
+            print(f"[SNAPSHOT][WARN] restore of '{snapshot_name}' failed ({e}); using the current volumes")
+        timer.mark('snapshot_restore')
     # Garante que o volume tb_logs existe e está limpo, com permissões corretas
     info("[logs] Garantindo volumes de logs limpos e permissões corretas\n")
     # volumes list mirrors the named volumes we will mount into containers
@@ -131,22 +306,12 @@ def run_topo(num_sims=5):
 
     # Helper: link profile defaults (bandwidth Mbps, delay ms, loss %)
     # Profiles: urllc (low latency, lower bw), best_effort (balanced), eMBB (high bandwidth)
-    # URLLC profile optimized based on test results for <200ms latency goal
-    PROFILE_LINK_PRESETS = {
-        'urllc': {'bw': 1000, 'delay': '0.05ms', 'loss': 0},
-        'eMBB': {'bw': 300, 'delay': '25ms', 'loss': 0.2}, 
-        'best_effort': {'bw': 200, 'delay': '50ms', 'loss': 0.5}
-    }
+    # Presets live in link_profiles.py so a warm suite run can reshape links to the same values
 
     # Determine profile from env TOPO_PROFILE or default to 'best_effort'
     topo_profile = os.environ.get('TOPO_PROFILE') or os.environ.get('PROFILE') or 'urllc'
-    topo_profile = topo_profile if topo_profile in PROFILE_LINK_PRESETS else topo_profile.lower()
-    if topo_profile not in PROFILE_LINK_PRESETS:
-        # try common case-insensitive names
-        for k in PROFILE_LINK_PRESETS:
-            if k.lower() == str(topo_profile).lower():
-                topo_profile = k
-                break
+    topo_profile = resolve_profile(topo_profile) or topo_profile.lower()
+    timer.meta['profile'] = topo_profile
     profile_params = PROFILE_LINK_PRESETS.get(topo_profile, PROFILE_LINK_PRESETS['urllc'])
 
     def add_link(a, b, **kwargs):
@@ -170,37 +335,61 @@ def run_topo(num_sims=5):
             # fallback: older Mininet might accept the args without cls
             return net.addLink(a, b, **link_kwargs)
 
-    def safe_add(name, **kwargs):
+    next_ip_lock = threading.Lock()
+
+    def start_docker_unregistered(name, **kwargs):
+        """net.addDocker without the registration, for worker threads.
+
+        Same defaults as Mininet's addHost (next free IP/MAC, reserved under a lock);
+        the Docker node creates and starts the container and its shell. The caller
+        appends it to net.hosts/net.nameToNode, from a single thread.
+        """
+        with next_ip_lock:
+            params = {'ip': ipAdd(net.nextIP, ipBaseNum=net.ipBaseNum, prefixLen=net.prefixLen)
+                      + f'/{net.prefixLen}'}
+            if net.autoSetMacs:
+                params['mac'] = macColonHex(net.nextIP)
+            net.nextIP += 1
+        params.update(kwargs)
+        return Docker(name, **params)
+
+    def safe_add(name, register=True, **kwargs):
         try:
             # If a container with this name already exists, remove only the
             # container (do not remove named volumes) so Containernet can
             # recreate it attached to the correct network namespace.
             cname = f"mn.{name}"
-            try:
-                # list any matching container id(s)
-                p = subprocess.run(['docker', 'ps', '-a', '--filter', f'name={cname}', '-q'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-                ids = p.stdout.decode().strip().split() if p.stdout else []
-                if ids:
-                    info(f"[SAFE_ADD] found existing container(s) {ids} for {cname}; removing container(s) to allow Containernet to recreate (volumes preserved)\n")
-                    # remove all matching containers
-                    for cid in ids:
-                        try:
-                            subprocess.run(['docker', 'rm', '-f', cid], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
-                        except Exception:
-                            pass
-            except Exception:
-                # best-effort: continue if docker not available or command fails
-                pass
+            if name in precleaned:
+                # already removed by precleanup_containers(); a later re-create checks again
+                precleaned.discard(name)
+            else:
+                try:
+                    # list any matching container id(s)
+                    p = subprocess.run(['docker', 'ps', '-a', '--filter', f'name={cname}', '-q'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+                    ids = p.stdout.decode().strip().split() if p.stdout else []
+                    if ids:
+                        info(f"[SAFE_ADD] found existing container(s) {ids} for {cname}; removing container(s) to allow Containernet to recreate (volumes preserved)\n")
+                        # remove all matching containers
+                        for cid in ids:
+                            try:
+                                subprocess.run(['docker', 'rm', '-f', cid], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False)
+                            except Exception:
+                                pass
+                except Exception:
+                    # best-effort: continue if docker not available or command fails
+                    pass
 
             info(f"➕ Criando {name} — {kwargs}\n")
+            if not register:
+                return start_docker_unregistered(name, **kwargs)
             return net.addDocker(name=name, **kwargs)
         except Exception as e:
             info(f"[WARN] erro criando {name}: {e}\n")
             return None
 
     # Wrap safe_add to produce concise output when QUIET
-    def safe_add_with_status(name, **kwargs):
-        c = safe_add(name, **kwargs)
+    def safe_add_with_status(name, register=True, **kwargs):
+        c = safe_add(name, register=register, **kwargs)
         if QUIET:
             if c:
                 print(f"[CREATE] {name}: OK")
@@ -208,9 +397,27 @@ def run_topo(num_sims=5):
                 print(f"[CREATE] {name}: FAILED")
         return c
 
+    def safe_add_many(specs):
+        """Create independent containers concurrently; specs = [(name, kwargs)].
+
+        Returns the nodes in the order of ``specs``. Only container creation/start
+        runs in parallel: the nodes are registered in Mininet (net.hosts,
+        net.nameToNode) afterwards, from this thread and in spec order, so net.hosts
+        is the same as with serial creation. Links are still added one by one.
+        """
+        if TOPO_PARALLEL_WORKERS <= 1 or len(specs) < 2:
+            return [safe_add_with_status(name, **kwargs) for name, kwargs in specs]
+        with ThreadPoolExecutor(max_workers=min(TOPO_PARALLEL_WORKERS, len(specs))) as pool:
+            nodes = list(pool.map(lambda spec: safe_add_with_status(spec[0], register=False, **spec[1]), specs))
+        for node in nodes:
+            if node:
+                net.hosts.append(node)
+                net.nameToNode[node.name] = node
+        return nodes
+
     info("*** Serviços principais: PostgreSQL, InfluxDB, Neo4j, Parser\n")
     # Diretório central de logs (visível no host) para todos os hosts da topologia
-    deploy_logs_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../deploy/logs'))
+    deploy_logs_dir = DEPLOY_LOGS_DIR
     try:
         os.makedirs(deploy_logs_dir, exist_ok=True)
     except Exception as e:
@@ -312,8 +519,9 @@ def run_topo(num_sims=5):
                         break
     except Exception:
         pass
-    # Serviços centrais
-    pg = safe_add_with_status('db',
+    timer.mark('prepare')
+    # Serviços centrais (independentes entre si: criados em paralelo)
+    core_specs = [('db', dict(
         dimage='postgres:13-tools',
         ip='10.0.0.10',
         environment={
@@ -329,8 +537,7 @@ def run_topo(num_sims=5):
         port_bindings={POSTGRES_PORT: POSTGRES_PORT},
         dcmd="docker-entrypoint.sh postgres",
         privileged=True
-    )
-    influxdb = safe_add_with_status('influxdb',
+    )), ('influxdb', dict(
         dimage=os.getenv('INFLUXDB_IMAGE','influxdb:2.7'),
         # use the daemon executable expected by official images
         dcmd='influxd',
@@ -355,8 +562,7 @@ def run_topo(num_sims=5):
             f"{host_logs.get('influxdb')}:/var/log/influxdb_start.log",
         ],
         privileged=True
-    )
-    neo4j = safe_add_with_status('neo4j',
+    )), ('neo4j', dict(
         dimage='neo4j-tools:latest',
         # Start Neo4j in foreground (console) so logs are streamable and
         # the process binds correctly to the container network. Ensure the
@@ -379,7 +585,9 @@ def run_topo(num_sims=5):
             f"{host_logs.get('neo4j')}:/var/log/neo4j_start.log",
         ],
         privileged=True
-    )
+    ))]
+    pg, influxdb, neo4j = safe_add_many(core_specs)
+    timer.mark('core_services')
     # The parser is intentionally NOT created inside the Containernet topology.
     # It depends on platform-specific components and should run as a regular
     # Docker container on the host (outside Mininet). Example:
@@ -394,12 +602,26 @@ def run_topo(num_sims=5):
     # stdout/stderr instead of the mapped file paths.
     LOG_FOLLOW_PROCS = []
     LOG_FOLLOW_NAMES = set()
+    # one asyncio collector on the Docker API socket for every follower; None when the
+    # socket is not accessible, in which case each follower is a `docker logs -f` shell
+    log_collector = LogCollector.start_if_available()
+    if log_collector:
+        atexit.register(log_collector.stop)
     def follow_container_logs(name, host_path):
         """Follow docker logs for container 'mn.<name>' and append them to host_path."""
         try:
             if not host_path:
                 return
             os.makedirs(os.path.dirname(host_path), exist_ok=True)
+            if log_collector:
+                if name not in LOG_FOLLOW_NAMES:
+                    # prefer mn.<name>, else a plain container name (externally-run parser);
+                    # attached now if running, otherwise as soon as docker reports its start
+                    log_collector.follow([f"mn.{name}", name], host_path)
+                    LOG_FOLLOW_NAMES.add(name)
+                    if QUIET:
+                        print(f"[LOG] collecting docker logs for mn.{name} -> {host_path}")
+                return
             # prefer Containernet-managed container name mn.<name>; if not present,
             # try a plain container name (useful for externally-run parser)
             docker_name = f"mn.{name}"
@@ -460,140 +682,41 @@ def run_topo(num_sims=5):
             info(f"[logs][WARN] falha ao seguir logs de {name}: {e}\n")
 
     # --- proxy supervisor helpers -------------------------------------------------
-    # Keep track of proxy subprocesses and restart attempts
-    PROXY_PROCS = {}  # svc_name -> subprocess.Popen
-    PROXY_RESTARTS = {}  # svc_name -> int
+    # Host TCP -> container UNIX-socket proxies, supervised on a background asyncio loop
+    # (health probes, non-blocking backoff, original port/socket reused on restart).
+    # Nothing in the bring-up calls start_proxy_safe today: restore_docker_port_forwarding
+    # forwards TCP to container IPs, not UNIX sockets.
     PROXY_MAX_RESTARTS = 5
     PROXY_RESTART_BACKOFF = 2.0  # seconds, multiplied per restart
 
     def _get_container_pid(name, timeout=15):
         """Return PID of docker container mn.<name> or None if not found within timeout."""
-        cname = f"mn.{name}"
-        for _ in range(timeout):
-            try:
-                p = subprocess.run(['docker', 'inspect', '--format', '{{.State.Pid}}', cname], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-                if p.stdout:
-                    pid = p.stdout.decode().strip()
-                    if pid and pid.isdigit() and int(pid) > 0:
-                        return int(pid)
-            except Exception:
-                pass
-            time.sleep(1)
-        return None
+        return readiness.wait_pid(f"mn.{name}", timeout=timeout)
 
-    def _start_host_socat_to_container_unix(pid, container_sock_path, host_port, logfile_path=None):
-        """Start a host socat process forwarding TCP localhost:host_port -> /proc/<pid>/root/<container_sock_path>.
-        Returns subprocess.Popen or raises Exception on failure.
-        """
-        # Build absolute path inside host procfs
-        proc_sock = f"/proc/{pid}/root/{container_sock_path.lstrip('/')}"
-        # Use reuseaddr,fork so multiple clients are handled and socat can be restarted safely
-        cmd = ['socat', f'TCP-LISTEN:{host_port},reuseaddr,fork', f'UNIX-CONNECT:{proc_sock}']
-        # Open logfile if provided
-        stdout = subprocess.DEVNULL
-        stderr = subprocess.DEVNULL
-        lf = None
-        if logfile_path:
-            try:
-                os.makedirs(os.path.dirname(logfile_path), exist_ok=True)
-                lf = open(logfile_path, 'ab')
-                stdout = lf
-                stderr = lf
-            except Exception:
-                lf = None
-        p = subprocess.Popen(cmd, stdout=stdout, stderr=stderr)
-        # attach logfile to proc tuple so caller can close it later
-        return (p, lf)
+    def _proxy_log(msg):
+        if QUIET:
+            print(msg)
+
+    proxy_supervisor = None
 
     def start_proxy_safe(container_name, svc_name, container_sock_path, host_port, host_logpath=None):
-        """Ensure a host socat proxy exists forwarding to container's UNIX socket.
-        This function is idempotent: if proxy already running for svc_name, it does nothing.
+        """Ensure a supervised host proxy forwards TCP host_port to the container's UNIX socket.
+        This function is idempotent: if a proxy is already supervised for svc_name, it does nothing.
         """
-        if svc_name in PROXY_PROCS and PROXY_PROCS[svc_name] and PROXY_PROCS[svc_name][0].poll() is None:
-            # already running
-            return PROXY_PROCS[svc_name][0]
-
-        pid = _get_container_pid(container_name, timeout=15)
-        if not pid:
+        nonlocal proxy_supervisor
+        if not _get_container_pid(container_name, timeout=15):
             raise RuntimeError(f"container {container_name} PID not found or container not started yet")
-
-        # Try starting host socat and supervise it
-        try:
-            p, lf = _start_host_socat_to_container_unix(pid, container_sock_path, host_port, logfile_path=host_logpath)
-            PROXY_PROCS[svc_name] = (p, lf)
-            PROXY_RESTARTS[svc_name] = 0
-            if QUIET:
-                print(f"[PROXY] started proxy {svc_name} -> pid={pid} host_port={host_port}")
-            return p
-        except Exception as e:
-            raise
+        if proxy_supervisor is None:
+            proxy_supervisor = ProxySupervisor(lambda c: _get_container_pid(c, timeout=5), log=_proxy_log,
+                                               max_restarts=PROXY_MAX_RESTARTS,
+                                               backoff=PROXY_RESTART_BACKOFF).start()
+            atexit.register(proxy_supervisor.stop)
+        return proxy_supervisor.add(svc_name, container_name, container_sock_path, host_port, host_logpath)
 
     def stop_all_proxies():
-        """Terminate all running proxy processes and close logfiles."""
-        for svc, tup in list(PROXY_PROCS.items()):
-            try:
-                p, lf = tup
-                if p and p.poll() is None:
-                    p.terminate()
-                    try:
-                        p.wait(timeout=3)
-                    except Exception:
-                        p.kill()
-                if lf:
-                    try:
-                        lf.close()
-                    except Exception:
-                        pass
-            except Exception:
-                pass
-            PROXY_PROCS.pop(svc, None)
-            PROXY_RESTARTS.pop(svc, None)
-
-    def _supervise_proxies_once():
-        """Single-pass supervisor that restarts any stopped proxies with backoff and caps."""
-        for svc, tup in list(PROXY_PROCS.items()):
-            try:
-                p, lf = tup
-                if p.poll() is None:
-                    continue
-                # process terminated; consider restart
-                restarts = PROXY_RESTARTS.get(svc, 0) + 1
-                if restarts > PROXY_MAX_RESTARTS:
-                    if QUIET:
-                        print(f"[PROXY] {svc} exceeded max restarts ({PROXY_MAX_RESTARTS}), not restarting")
-                    PROXY_PROCS.pop(svc, None)
-                    PROXY_RESTARTS.pop(svc, None)
-                    continue
-                # exponential backoff
-                backoff = PROXY_RESTART_BACKOFF * restarts
-                if QUIET:
-                    print(f"[PROXY] restarting {svc} (attempt {restarts}) after {backoff}s")
-                time.sleep(backoff)
-                # try to restart by re-obtaining container name mapping stored in svc name convention
-                # svc name format expected: '<svc>' previously mapped to container mn.<container_name>
-                # We assume the container name equals svc or 'mn.' prefix is used elsewhere.
-                # Attempt a best-effort restart: try mn.<svc> then <svc>
-                container_try = f"mn.{svc}"
-                pid = _get_container_pid(svc, timeout=5) or _get_container_pid(container_try, timeout=5)
-                if not pid:
-                    PROXY_RESTARTS[svc] = restarts
-                    continue
-                # default UDS path placed under /tmp/<svc>.sock inside container
-                container_sock_path = f"/tmp/{svc}.sock"
-                host_port = None
-                # attempt to infer host_port by scanning previous process command; fallback to well-known ports
-                # For robustness, user should call start_proxy_safe with explicit host_port; here we fallback to common ports
-                common_ports = {'influxdb': 8086, 'middts': 8000, 'tb': 8080, 'neo4j': 7474}
-                host_port = common_ports.get(svc, None)
-                try:
-                    p2, lf2 = _start_host_socat_to_container_unix(pid, container_sock_path, host_port, logfile_path=None)
-                    PROXY_PROCS[svc] = (p2, lf2)
-                    PROXY_RESTARTS[svc] = restarts
-                except Exception:
-                    PROXY_RESTARTS[svc] = restarts
-                    continue
-            except Exception:
-                continue
+        """Terminate all supervised proxies and close their logfiles."""
+        if proxy_supervisor is not None:
+            proxy_supervisor.stop()
 
 
     # Start followers for the three services of interest if their host paths exist
@@ -679,27 +802,25 @@ def run_topo(num_sims=5):
     use_raw = os.environ.get('USE_RAW_CONFIG', '').lower() in ('true', '1', 'yes')
     use_m2s_perf = os.environ.get('USE_M2S_PERF', '').lower() in ('true', '1', 'yes')
 
-    config_suffix = ''
-    config_mode = 'optimized'
-    if use_m2s_perf and str(topo_profile).lower() == 'urllc':
-        config_suffix = '-m2s-perf'
+    tb_config_file = tb_config_name(topo_profile, raw=use_raw, m2s_perf=use_m2s_perf)
+    if tb_config_file.endswith('-m2s-perf.yml'):
         config_mode = 'm2s-perf'
     elif use_raw:
-        config_suffix = '-raw'
         config_mode = 'raw'
-    
-    # Map profile to config file
-    tb_config_map = {
-        'urllc': f'thingsboard-urllc{config_suffix}.yml',
-        'eMBB': f'thingsboard-embb{config_suffix if config_suffix == "-raw" else ""}.yml',
-        'embb': f'thingsboard-embb{config_suffix if config_suffix == "-raw" else ""}.yml',
-        'best_effort': f'thingsboard-best-effort{config_suffix if config_suffix == "-raw" else ""}.yml',
-        'best-effort': f'thingsboard-best-effort{config_suffix if config_suffix == "-raw" else ""}.yml'
-    }
-    
-    tb_config_file = tb_config_map.get(topo_profile.lower(), f'thingsboard-urllc{config_suffix}.yml')
+    else:
+        config_mode = 'optimized'
     info(f"[tb][config] Using ThingsBoard config: {tb_config_file} (profile={topo_profile}, mode={config_mode}, raw={use_raw}, m2s_perf={use_m2s_perf})\n")
+    # Mount a runtime copy instead of config/<file>: warm_reset.py overwrites it in place
+    # (same inode, so the bind mount sees it) when the suite switches scenarios.
+    tb_runtime_config = os.path.join(repo_root, 'deploy', 'config', 'thingsboard.yml')
+    try:
+        os.makedirs(os.path.dirname(tb_runtime_config), exist_ok=True)
+        shutil.copyfile(os.path.join(repo_root, 'config', tb_config_file), tb_runtime_config)
+    except Exception as e:
+        info(f"[tb][config][WARN] falha ao preparar {tb_runtime_config}: {e}; montando config/{tb_config_file}\n")
+        tb_runtime_config = f"{repo_root}/config/{tb_config_file}"
 
+    timer.mark('core_ready')
     # Hosts principais
     tb = safe_add_with_status('tb', 
         dimage='tb-node-custom:latest',  # Usar latest ao invés de urllc
@@ -715,7 +836,7 @@ def run_topo(num_sims=5):
             'tb_assets:/data',
             'tb_logs:/var/log/thingsboard',
             f"{host_logs.get('tb')}:/var/log/thingsboard/manual_start.log",
-            f"{repo_root}/config/{tb_config_file}:/usr/share/thingsboard/conf/thingsboard.yml",
+            f"{tb_runtime_config}:/usr/share/thingsboard/conf/thingsboard.yml",
         ],
         ports=[8080, 1883],
         port_bindings={8080: 8080, 1883: 1883},
@@ -873,7 +994,7 @@ def run_topo(num_sims=5):
         pass
 
     # Diretório central de logs (visível no host) para todos os hosts da topologia
-    deploy_logs_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../deploy/logs'))
+    deploy_logs_dir = DEPLOY_LOGS_DIR
     try:
         os.makedirs(deploy_logs_dir, exist_ok=True)
     except Exception as e:
@@ -948,18 +1069,12 @@ def run_topo(num_sims=5):
     # Helper: wait until the underlying Docker container for mn.<name> is Running
     def wait_for_docker_running(name, timeout=15):
         cname = f"mn.{name}"
-        for i in range(timeout * 2):
-            try:
-                p = subprocess.run(["docker", "inspect", "-f", "{{.State.Running}}", cname], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                out = p.stdout.decode().strip()
-                if out == 'true':
-                    return True
-            except Exception:
-                pass
-            time.sleep(0.5)
+        if readiness.wait_running(cname, timeout=timeout):
+            return True
         print(f"[WARN] container {cname} not running after {timeout}s")
         return False
 
+    timer.mark('tb')
     # Agora sim, sobe o middts já com o .env correto
     middts = safe_add_with_status('middts',
         dimage=os.getenv('MIDDTS_IMAGE', 'middts-custom:latest'),
@@ -1089,6 +1204,8 @@ def run_topo(num_sims=5):
     except Exception:
         pass
 
+    timer.mark('middts')
+    sim_specs = []
     for i in range(1, num_sims + 1):
         name = f'sim_{i:03d}'
         vols = [
@@ -1129,8 +1246,7 @@ def run_topo(num_sims=5):
             # special-case: sim_001 has a custom host entrypoint (runserver 8001)
             vols.insert(0, f"{host_sim_entry}:/entrypoint.sh")
             env['ALLOWED_HOSTS'] = '*'
-            sim = safe_add_with_status(
-                name,
+            sim_specs.append((name, dict(
                 dimage=os.getenv('SIM_IMAGE','iot_simulator:latest'),
                 environment=env,
                 volumes=vols,
@@ -1139,20 +1255,22 @@ def run_topo(num_sims=5):
                 port_bindings={8001: 8001},
                 privileged=True,
                 **({'entrypoint': entrypoint_arg} if entrypoint_arg else {})
-            )
+            )))
         else:
-            sim = safe_add_with_status(
-                name,
+            sim_specs.append((name, dict(
                 dimage=os.getenv('SIM_IMAGE','iot_simulator:latest'),
                 environment=env,
                 volumes=vols,
                 ip=f'10.0.{10+i}.2',
                 privileged=True,
                 **({'entrypoint': entrypoint_arg} if entrypoint_arg else {})
-            )
+            )))
+    # simuladores são independentes entre si: criação/start em paralelo
+    for sim in safe_add_many(sim_specs):
         if sim:
             simuladores.append(sim)
             info(f"[sim] {sim.name} criado — restore_db será executado antes do entrypoint, se disponível.\n")
+    timer.mark('simulators')
 
     # Ligações: cada host ao seu switch
     # Ensure the underlying Docker containers are up and running before
@@ -1254,8 +1372,10 @@ def run_topo(num_sims=5):
     # Parser runs outside the Containernet topology; no in-topology IPs configured.
 
 
+    timer.mark('links')
     # Agora sim, inicia a rede
     net.start()
+    timer.mark('net_start')
 
     # Restore Docker port forwarding rules that may be overridden by Mininet
     def restore_docker_port_forwarding():
@@ -1292,15 +1412,7 @@ def run_topo(num_sims=5):
             
             # Get container IPs for socat fallback
             def get_container_ip(container_name):
-                try:
-                    result = subprocess.run(['docker', 'inspect', container_name], 
-                                          capture_output=True, text=True)
-                    if result.returncode == 0:
-                        data = json.loads(result.stdout)[0]
-                        return data['NetworkSettings']['IPAddress']
-                except:
-                    pass
-                return None
+                return readiness.containers.ip(container_name) or None
             
             # Kill any existing socat processes
             subprocess.run(['pkill', '-f', 'socat.*900'], check=False)
@@ -1372,17 +1484,13 @@ def run_topo(num_sims=5):
                 ]
                 
                 for container, orig_port, fallback_port in services:
-                    result = subprocess.run(['docker', 'inspect', container], 
-                                          capture_output=True, text=True)
-                    if result.returncode == 0:
-                        data = json.loads(result.stdout)[0]
-                        container_ip = data['NetworkSettings']['IPAddress']
-                        if container_ip:
-                            cmd = ['socat', 
-                                   f'TCP-LISTEN:{fallback_port},bind=0.0.0.0,fork,reuseaddr', 
-                                   f'TCP:{container_ip}:{orig_port}']
-                            subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                            info(f"[net] Emergency socat: {fallback_port} -> {container_ip}:{orig_port}\n")
+                    container_ip = readiness.containers.ip(container)
+                    if container_ip:
+                        cmd = ['socat',
+                               f'TCP-LISTEN:{fallback_port},bind=0.0.0.0,fork,reuseaddr',
+                               f'TCP:{container_ip}:{orig_port}']
+                        subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                        info(f"[net] Emergency socat: {fallback_port} -> {container_ip}:{orig_port}\n")
             except Exception as e2:
                 info(f"[net][WARN] Emergency socat setup failed: {e2}\n")
 
@@ -1392,7 +1500,8 @@ def run_topo(num_sims=5):
     try:
         info('[net] aguardando containers docker estarem Running após net.start()...\n')
         for svc in ('tb', 'middts', 'db', 'influxdb', 'neo4j'):
-            ok = wait_for_docker_running(svc, timeout=30)
+            with timer.span(f'docker_running.{svc}'):
+                ok = wait_for_docker_running(svc, timeout=30)
             if not ok:
                 info(f"[net][ERROR] container mn.{svc} not running after wait; aborting topology start to avoid moveIntf failures\n")
                 # stop network and exit early
@@ -1405,7 +1514,8 @@ def run_topo(num_sims=5):
             time.sleep(0.1)
             
         # Restore Docker port forwarding after all containers are running
-        restore_docker_port_forwarding()
+        with timer.span('port_forwarding'):
+            restore_docker_port_forwarding()
         
     except Exception:
         # non-fatal: proceed and let later checks catch issues
@@ -1413,29 +1523,15 @@ def run_topo(num_sims=5):
 
     # Additional check: verify container network namespace exists and host-side veth peer is present.
     def wait_for_container_net_ready(name, iface_hint=None, timeout=20):
-        cname = f"mn.{name}"
         deadline = time.time() + timeout
-        while time.time() < deadline:
-            try:
-                # get PID of container
-                p = subprocess.run(['docker', 'inspect', '-f', '{{.State.Pid}}', cname], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                pid = p.stdout.decode().strip()
-                if pid and pid != '0':
-                    # check that /proc/<pid>/ns/net exists
-                    ns_path = f'/proc/{pid}/ns/net'
-                    if os.path.exists(ns_path):
-                        # optionally check host-side interface presence if hint provided
-                        if iface_hint:
-                            # look for a host link whose name contains the service iface_hint
-                            out = subprocess.run(['ip', '-o', 'link', 'show'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-                            if iface_hint in out.stdout.decode():
-                                return True
-                        else:
-                            return True
-            except Exception:
-                pass
-            time.sleep(0.5)
-        return False
+        # PID (and thus /proc/<pid>/ns/net) is known once the start event arrives
+        pid = readiness.wait_pid(f"mn.{name}", timeout=timeout)
+        if not netns_exists(pid):
+            return False
+        # optionally wait for the host-side interface (netlink RTM_NEWLINK) if hint provided
+        if iface_hint:
+            return readiness.wait_link(iface_hint, timeout=max(0.0, deadline - time.time()))
+        return True
 
     try:
         # For the services that previously failed with moveIntf, perform an extra readiness check
@@ -1451,25 +1547,13 @@ def run_topo(num_sims=5):
         """Wait until docker reports mn.<svc> running and the expected veth peer appears on host.
         veth_suffix: when provided, look for a host veth that contains this suffix (e.g., 'neo4j-eth0')
         """
-        cname = f"mn.{svc}"
         end = time.time() + timeout
-        while time.time() < end:
-            try:
-                p = subprocess.run(['docker', 'inspect', '-f', '{{.State.Running}}', cname], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                if p.returncode == 0 and p.stdout.decode().strip() == 'true':
-                    # if veth_suffix provided, check host ip link for peer name
-                    if veth_suffix:
-                        # host veth names often include the container interface name as suffix; try to find it
-                        out = subprocess.run(['ip', '-o', 'link', 'show'], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-                        links = out.stdout.decode()
-                        if veth_suffix in links:
-                            return True
-                    else:
-                        return True
-            except Exception:
-                pass
-            time.sleep(0.25)
-        return False
+        if not readiness.wait_running(f"mn.{svc}", timeout=timeout):
+            return False
+        # host veth names often include the container interface name as suffix
+        if veth_suffix:
+            return readiness.wait_link(veth_suffix, timeout=max(0.0, end - time.time()))
+        return True
 
     try:
         # wait longer for influxdb and neo4j network peers specifically
@@ -1480,13 +1564,15 @@ def run_topo(num_sims=5):
     except Exception:
         pass
 
+    timer.mark('readiness')
     # Ensure critical container interfaces are actually UP and have the expected IP
     # inside their network namespace. This avoids the need for manual nsenter
     # when moveIntf or net.start() leaves the container-side veth down or
     # missing the assigned IP (race observed in practice).
     def ensure_container_iface_up(name, iface, ip_cidr, route_cidr='10.0.0.0/16', retries=6, delay=0.5):
         """Idempotently ensure that container mn.<name> has `iface` UP and `ip_cidr` assigned.
-        Uses nsenter against the container PID obtained via _get_container_pid.
+        Link, address and route changes go through one batched ip call inside the
+        container netns (see netns_config.configure_netns), verified in the same call.
         Returns True if successful or already configured, False otherwise.
         """
         try:
@@ -1496,18 +1582,10 @@ def run_topo(num_sims=5):
                 return False
             for attempt in range(retries):
                 try:
-                    # Check if the IP is already present on the iface
-                    p = subprocess.run(['nsenter', '-t', str(pid), '-n', 'ip', '-o', 'addr', 'show', 'dev', iface], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-                    out = p.stdout.decode().strip()
-                    if ip_cidr.split('/')[0] in out:
-                        # ensure link up and route present
-                        subprocess.run(['nsenter', '-t', str(pid), '-n', 'ip', 'link', 'set', iface, 'up'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                        subprocess.run(['nsenter', '-t', str(pid), '-n', 'ip', 'route', 'add', route_cidr, 'dev', iface], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    ok, _ = configure_netns(pid, up=[iface], addresses=[(iface, ip_cidr)],
+                                            routes=[(route_cidr, iface, None)])
+                    if ok:
                         return True
-                    # attempt to bring link up and add ip/route
-                    subprocess.run(['nsenter', '-t', str(pid), '-n', 'ip', 'link', 'set', iface, 'up'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    subprocess.run(['nsenter', '-t', str(pid), '-n', 'ip', 'addr', 'add', ip_cidr, 'dev', iface], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                    subprocess.run(['nsenter', '-t', str(pid), '-n', 'ip', 'route', 'add', route_cidr, 'dev', iface], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
                 except Exception:
                     # ignore and retry
                     pass
@@ -1538,7 +1616,10 @@ def run_topo(num_sims=5):
     # interface so they can reach Influx (10.0.1.20) even if Docker's default route
     # points at the bridge (172.17.x.x). This is idempotent and will be applied
     # on each topology start.
-    def ensure_container_route(name, dest_cidr, dev, src=None, retries=6, delay=0.5):
+    def ensure_container_routes(name, routes, retries=6, delay=0.5):
+        """Ensure every (dest_cidr, dev, src) route exists in mn.<name>, in one batched ip call.
+        Existing routes are kept; a /32 without src gets the device's IPv4 address as source.
+        """
         try:
             pid = _get_container_pid(name, timeout=10)
             if not pid:
@@ -1546,66 +1627,41 @@ def run_topo(num_sims=5):
                 return False
             for attempt in range(retries):
                 try:
-                    # check if route already exists
-                    p = subprocess.run(['nsenter', '-t', str(pid), '-n', 'ip', 'route', 'show', dest_cidr], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-                    out = p.stdout.decode().strip()
-                    if out:
+                    ok, _ = configure_netns(pid, routes=routes)
+                    if ok:
                         return True
-                    # If src not provided and dest is a single host, attempt to derive src from the device IP
-                    add_cmd = ['nsenter', '-t', str(pid), '-n', 'ip', 'route', 'add', dest_cidr, 'dev', dev]
-                    if not src and dest_cidr.endswith('/32'):
-                        try:
-                            p2 = subprocess.run(['nsenter', '-t', str(pid), '-n', 'ip', '-o', '-4', 'addr', 'show', 'dev', dev], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
-                            out2 = p2.stdout.decode().strip()
-                            if out2:
-                                # extract the first IPv4 address
-                                ip4 = out2.split()[-1].split('/')[0]
-                                if ip4:
-                                    add_cmd += ['src', ip4]
-                        except Exception:
-                            pass
-                    elif src:
-                        add_cmd += ['src', src]
-                    # add route via device (optionally with src)
-                    subprocess.run(add_cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
                 except Exception:
                     pass
                 time.sleep(delay * (attempt + 1))
-            info(f"[net][WARN] failed to add route {dest_cidr} via {dev} in container {name}\n")
+            for dest_cidr, dev, _src in routes:
+                info(f"[net][WARN] failed to add route {dest_cidr} via {dev} in container {name}\n")
             return False
         except Exception:
             return False
 
+    def ensure_container_route(name, dest_cidr, dev, src=None, retries=6, delay=0.5):
+        return ensure_container_routes(name, [(dest_cidr, dev, src)], retries=retries, delay=delay)
+
     try:
         for i in range(1, num_sims + 1):
             sim_name = f"sim_{i:03d}"
             sim_iface = f"{sim_name}-eth0"
-            ensure_container_route(sim_name, '10.0.0.0/16', sim_iface)
             # Also add a specific host route for the Influx address so the kernel
             # selects the simulator's 10.0.x.x source when connecting to 10.0.1.20.
-            ensure_container_route(sim_name, '10.0.1.20/32', sim_iface)
+            ensure_container_routes(sim_name, [('10.0.0.0/16', sim_iface, None),
+                                               ('10.0.1.20/32', sim_iface, None)])
     except Exception:
         pass
 
+    timer.mark('net_config')
     # After network start, discover container IPs and inject into .env files
     try:
         # helper to resolve Mininet/Containernet container objects to docker names/IPs
         def container_ip(container_obj):
             try:
-                name = container_obj.name
-                # docker inspect
-                import subprocess, json
-                out = subprocess.check_output(['docker', 'inspect', name])
-                data = json.loads(out)
-                # get first network IP
-                ip = None
-                if data and isinstance(data, list):
-                    nets = data[0].get('NetworkSettings', {}).get('Networks', {})
-                    for v in nets.values():
-                        ip = v.get('IPAddress')
-                        if ip:
-                            break
-                return ip
+                # first network IP, from the shared inspect cache
+                ips = readiness.containers.network_ips(container_obj.name)
+                return ips[0] if ips else None
             except Exception:
                 return None
 
@@ -1696,6 +1752,7 @@ def run_topo(num_sims=5):
     if QUIET:
         print(f"[NET] network started; hosts: {len(simuladores)+6} (including core services)")
 
+    timer.mark('env_injection')
     # Apply URLLC optimizations automatically after network start
     def apply_urllc_optimizations():
         """Apply network and system optimizations for URLLC performance"""
@@ -1718,6 +1775,7 @@ def run_topo(num_sims=5):
 
     # Apply optimizations after network is fully started
     apply_urllc_optimizations()
+    timer.mark('urllc')
 
     # Ensure Influx bucket exists and token is valid. This runs after network start
     # so container is reachable via docker-proxy on localhost.
@@ -1834,6 +1892,7 @@ def run_topo(num_sims=5):
     except Exception:
         pass
 
+    timer.mark('influx_bucket')
     # SEÇÃO REMOVIDA: Pós-configuração estava sobrescrevendo IPs corretos 10.0.x.x
     # As configurações corretas já foram aplicadas anteriormente na seção "=== IPs e rotas ==="
     info("[net] IPs já configurados corretamente na seção anterior\n")
@@ -1899,9 +1958,12 @@ def run_topo(num_sims=5):
     info("[tb] arp:\n" + tb.cmd("arp -n") + "\n")
     info("[middts] arp:\n" + middts.cmd("arp -n") + "\n")
 
+    timer.mark('sim_prepare')
     # Agora sim, aguarde o banco subir
     info("⏳ Aguardando PostgreSQL dentro do container...\n")
-    if not wait_for_pg_tcp(pg, timeout=60, pg_user=POSTGRES_USER):
+    with timer.span('pg_wait'):
+        pg_ok = wait_for_pg_tcp(pg, timeout=60, pg_user=POSTGRES_USER)
+    if not pg_ok:
         info("[ERRO] PostgreSQL não aceitou conexões TCP. Abortando.\n")
         net.stop()
         return
@@ -1944,6 +2006,7 @@ def run_topo(num_sims=5):
         info("[middts] EntryPoint lançado em background (log em /var/log/middts_start.log dentro do container).\n")
 
 
+    timer.mark('db_ready')
     # Inicialização simplificada do ThingsBoard
     info("[tb] Verificando se já existem tabelas ThingsBoard no PostgreSQL...\n")
     has_tables = tb_has_any_table(pg)
@@ -1951,7 +2014,8 @@ def run_topo(num_sims=5):
     if not has_tables:
         info("[tb] Nenhuma (ou poucas) tabelas detectadas -> executando install.sh...\n")
         tb.cmd('rm -f /data/.tb_initialized')
-        install_output = tb.cmd('/usr/share/thingsboard/bin/install/install.sh --loadDemo 2>&1 | tee /tmp/install.log')
+        with timer.span('tb_install'):
+            install_output = tb.cmd('/usr/share/thingsboard/bin/install/install.sh --loadDemo 2>&1 | tee /tmp/install.log')
         info("[tb] Saída do install.sh:\n" + install_output + "\n")
         if ('already present in database' in install_output or 'User with email' in install_output):
             info("[tb] Instalação pré-existente detectada durante install.sh, marcando como inicializado.\n")
@@ -1965,10 +2029,12 @@ def run_topo(num_sims=5):
     info("*** Aguarde ThingsBoard inicializar (+-30s)\n")
 
     # Wait for ThingsBoard HTTP to start answering before launching simulators' entrypoints
-    tb_ready = wait_for_thingsboard(host='10.0.0.2', port=8080, timeout=180, interval=3)
+    with timer.span('tb_http_wait'):
+        tb_ready = wait_for_thingsboard(host='10.0.0.2', port=8080, timeout=180, interval=3)
     if not tb_ready:
         info("[tb] ThingsBoard não respondeu no tempo esperado; simuladores serão iniciados mesmo assim (risco de conflitos).\n")
 
+    timer.mark('tb_start')
     # Launch simulator entrypoints now that TB is responding (or timeout reached)
     info("[sim] Lançando entrypoints dos simuladores agora que ThingsBoard parece pronto...\n")
     for idx, sim in enumerate(simuladores, 1):
@@ -2034,9 +2100,21 @@ def run_topo(num_sims=5):
         _smoke_test_influx('sim_001')
     except Exception:
         pass
+    timer.mark('post_start')
+    timer.report(table=QUIET)
+    try:
+        timing_path = timer.write(deploy_logs_dir, status='complete')
+        if QUIET:
+            print(f"[TIMING] timeline written to {timing_path} (+ .csv)")
+    except Exception as e:
+        info(f"[timing][WARN] failed to write timing report: {e}\n")
 
     CLI(net)
     net.stop()
+    readiness.stop()
+    if log_collector:
+        log_collector.stop()
+    stop_all_proxies()
     # Attempt to remove the reset marker so subsequent topo runs don't force simulator DB restore.
     try:
         repo_root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
@@ -2054,6 +2132,7 @@ if __name__ == '__main__':
     group.add_argument('--verbose', action='store_true', help='Run with verbose debug output')
     parser.add_argument('--sims', type=int, default=1, help='Number of simulator nodes to create')
     parser.add_argument('--profile', type=str, default=None, help='Link profile to use: urllc | best_effort | eMBB')
+    parser.add_argument('--snapshot', type=str, default=None, help='Restore data volumes from this snapshot first (volume_snapshot.py)')
     args = parser.parse_args()
     # Configure module-level flags
     QUIET = args.quiet or not args.verbose
@@ -2061,6 +2140,8 @@ if __name__ == '__main__':
     # Propagate profile into environment so run_topo() can pick it up early
     if args.profile:
         os.environ['TOPO_PROFILE'] = args.profile
+    if args.snapshot:
+        os.environ['TOPO_SNAPSHOT'] = args.snapshot
     # If verbose, restore info to original by setting mininet log level higher
     if VERBOSE:
         # restore info printing by setting loglevel and not overriding
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""Snapshot / restore of a provisioned ThingsBoard + Postgres + Influx + Neo4j volume set.
+
+After ``make reset-db`` (or on a new machine) every start pays ThingsBoard's
+``install.sh --loadDemo`` into Postgres plus the Influx/Neo4j setup and the device
+provisioning again. This module captures the named volumes of a stack that has already
+been through all of that as a template and recreates the volumes from it:
+
+- ``save``: one helper container tars every volume in parallel into
+  ``deploy/snapshots/<name>/<volume>.tar`` (plain tar, numeric owners), plus copies of
+  the host-side simulator DB, and writes ``manifest.json``;
+- ``restore``: one helper container empties the volumes and extracts the archives in
+  parallel; the host files are copied back.
+
+topo_qos.py restores ``TOPO_SNAPSHOT=<name>`` right after removing the old containers,
+so ``tb_has_any_table`` finds the ThingsBoard schema and install.sh is skipped::
+
+  volume_snapshot.py save base [--stop]
+  volume_snapshot.py restore base
+  volume_snapshot.py list
+
+The volumes must not be in use while saving (``--stop`` stops the containers using
+them, so Postgres is shut down cleanly) or restoring.
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+SNAPSHOT_DIR = os.environ.get('TOPO_SNAPSHOT_DIR') or os.path.join(REPO_ROOT, 'deploy', 'snapshots')
+# any image with sh + GNU tar; tb-node-custom is already used for the log volume helpers
+HELPER_IMAGE = os.environ.get('TOPO_SNAPSHOT_IMAGE', 'tb-node-custom')
+
+# named volumes mounted by topo_qos.py that hold provisioned state (log volumes excluded)
+SNAPSHOT_VOLUMES = ['db_data', 'tb_assets', 'influxdb2_data', 'influxdb2_config',
+                    'influx_cli_config', 'neo4j_data']
+# host files mounted into the simulators (device provisioning)
+SNAPSHOT_FILES = ['services/iot_simulator/db.sqlite3']
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def snapshot_path(name):
+    return os.path.join(SNAPSHOT_DIR, name)
+
+
+def load_manifest(name):
+    """Manifest dict of snapshot ``name``, or None if it does not exist."""
+    try:
+        with open(os.path.join(snapshot_path(name), 'manifest.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def containers_using(volumes, running_only=True):
+    """Names of containers that mount any of ``volumes``."""
+    names = set()
+    for vol in volumes:
+        cmd = ['docker', 'ps', '--filter', f'volume={vol}', '--format', '{{.Names}}']
+        if not running_only:
+            cmd.insert(2, '-a')
+        p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                           universal_newlines=True, timeout=30)
+        names.update(p.stdout.split())
+    return sorted(names)
+
+
+def _run_helper(volumes, snap_dir, script, timeout):
+    """Run ``script`` in one helper container with each volume at /vol/<name> and /snap."""
+    cmd = ['docker', 'run', '--rm', '-u', '0', '--entrypoint', 'sh', '-v', f'{snap_dir}:/snap']
+    for vol in volumes:
+        cmd += ['-v', f'{vol}:/vol/{vol}']
+    cmd += [HELPER_IMAGE, '-c', script]
+    p = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                       universal_newlines=True, timeout=timeout)
+    if p.returncode != 0:
+        raise SnapshotError(f'helper container failed ({p.returncode}): {p.stdout.strip()[-500:]}')
+    return p.stdout
+
+
+def _parallel(volumes, job):
+    """sh snippet running ``job`` (with $v set) for every volume in the background."""
+    return ('rc=0; pids=""; '
+            f'for v in {" ".join(volumes)}; do ({job}) & pids="$pids $!"; done; '
+            'for p in $pids; do wait $p || rc=1; done; exit $rc')
+
+
+def save_snapshot(name, stop=False, timeout=1800):
+    busy = containers_using(SNAPSHOT_VOLUMES)
+    if busy and not stop:
+        raise SnapshotError(f"volumes in use by {', '.join(busy)} (stop them or pass --stop)")
+    if busy:
+        subprocess.run(['docker', 'stop', '-t', '60'] + busy, stdout=subprocess.DEVNULL,
+                       stderr=subprocess.DEVNULL, timeout=300)
+    snap_dir = snapshot_path(name)
+    os.makedirs(snap_dir, exist_ok=True)
+    started = time.time()
+    _run_helper(SNAPSHOT_VOLUMES, snap_dir, _parallel(
+        SNAPSHOT_VOLUMES,
+        'tar --numeric-owner -C /vol/$v -cpf /snap/$v.tar.tmp . && mv /snap/$v.tar.tmp /snap/$v.tar'),
+        timeout)
+    files = []
+    for rel in SNAPSHOT_FILES:
+        src = os.path.join(REPO_ROOT, rel)
+        if os.path.exists(src):
+            dst = os.path.join(snap_dir, 'files', rel)
+            os.makedirs(os.path.dirname(dst), exist_ok=True)
+            shutil.copy2(src, dst)
+            files.append(rel)
+    manifest = {
+        'name': name,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'volumes': {v: os.path.getsize(os.path.join(snap_dir, f'{v}.tar')) for v in SNAPSHOT_VOLUMES},
+        'files': files,
+        'save_seconds': round(time.time() - started, 1),
+    }
+    with open(os.path.join(snap_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def restore_snapshot(name, timeout=900):
+    """Recreate the snapshot volumes and host files; returns the restore time in seconds."""
+    manifest = load_manifest(name)
+    if manifest is None:
+        raise SnapshotError(f'snapshot {name!r} not found in {SNAPSHOT_DIR}')
+    volumes = list(manifest.get('volumes', {}))
+    busy = containers_using(volumes, running_only=False)
+    if busy:
+        raise SnapshotError(f"volumes in use by {', '.join(busy)}")
+    snap_dir = snapshot_path(name)
+    started = time.time()
+    _run_helper(volumes, snap_dir, _parallel(
+        volumes, 'find /vol/$v -mindepth 1 -delete && tar --numeric-owner -C /vol/$v -xpf /snap/$v.tar'),
+        timeout)
+    for rel in manifest.get('files', []):
+        shutil.copy2(os.path.join(snap_dir, 'files', rel), os.path.join(REPO_ROOT, rel))
+    return time.time() - started
+
+
+def main():
+    p = argparse.ArgumentParser(description='Snapshot/restore the provisioned TB/Postgres/Influx/Neo4j volumes')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    sp = sub.add_parser('save', help='capture the volumes as snapshot NAME')
+    sp.add_argument('name')
+    sp.add_argument('--stop', action='store_true', help='stop the containers using the volumes first')
+    rp = sub.add_parser('restore', help='recreate the volumes from snapshot NAME')
+    rp.add_argument('name')
+    sub.add_parser('list', help='list snapshots')
+    args = p.parse_args()
+
+    try:
+        if args.cmd == 'save':
+            m = save_snapshot(args.name, stop=args.stop)
+            total = sum(m['volumes'].values()) / 1e6
+            print(f"[snapshot] saved {args.name}: {len(m['volumes'])} volumes, {total:.1f} MB, "
+                  f"{len(m['files'])} files in {m['save_seconds']}s -> {snapshot_path(args.name)}")
+        elif args.cmd == 'restore':
+            secs = restore_snapshot(args.name)
+            print(f'[snapshot] restored {args.name} in {secs:.1f}s')
+        else:
+            names = sorted(os.listdir(SNAPSHOT_DIR)) if os.path.isdir(SNAPSHOT_DIR) else []
+            for name in names:
+                m = load_manifest(name)
+                if m:
+                    total = sum(m.get('volumes', {}).values()) / 1e6
+                    print(f"{name}\t{m.get('created', '?')}\t{total:.1f} MB\t{', '.join(m.get('volumes', {}))}")
+    except (SnapshotError, OSError, subprocess.SubprocessError) as e:
+        print(f'[snapshot] {args.cmd} failed: {e}', file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
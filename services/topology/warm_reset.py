@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""Switch a running topology to the next suite scenario without rebuilding it.
+
+run_scenario_suite.sh --warm brings the Containernet topology and the databases up
+once and, between scenarios, calls this script instead of ``make clean && make topo``:
+
+1. links: every TCLink (host side and container side) gets the rate/delay/loss of the
+   new profile in place (``netns_config.reshape_tclinks``);
+2. ThingsBoard: the profile's YAML is copied over ``deploy/config/thingsboard.yml``
+   (bind-mounted by topo_qos.py) and the ThingsBoard JVM is restarted inside mn.tb,
+   skipped when the config is unchanged;
+3. InfluxDB: all points of the measurement bucket are deleted;
+4. MidDiTS: ``manage.py reset_digital_twins --force`` recreates the digital twins.
+
+The middts ``NETWORK_PROFILE`` (adaptive RPC timeouts) is exported by apply_slice.sh
+each time it launches listen_gateway/update_causal_property, so it follows the new
+profile. Other creation-time container state is kept on purpose: environment
+(INFLUXDB_TOKEN, ENABLE_INFLUX_LATENCY_MEASUREMENTS, the simulators' .env), IPs, port
+bindings, volumes and the processes started by the entrypoints, none of which depend
+on the profile.
+
+Usage::
+
+  warm_reset.py --profile embb [--raw] [--m2s-perf]
+
+Each step prints ``[warm] <step> ok|failed|skipped``; the exit status is 1 when a step
+failed, so the suite can fall back to a cold bring-up.
+"""
+import argparse
+import filecmp
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from docker_readiness import ContainerCache
+from link_profiles import PROFILE_LINK_PRESETS, resolve_profile, tb_config_name
+from netns_config import reshape_tclinks
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+TB_RUNTIME_CONFIG = os.path.join(REPO_ROOT, 'deploy', 'config', 'thingsboard.yml')
+TB_START_CMD = ('java -jar /usr/share/thingsboard/bin/thingsboard.jar '
+                '>> /var/log/thingsboard/manual_start.log 2>&1')
+
+
+def read_repo_env(path=os.path.join(REPO_ROOT, '.env')):
+    values = {}
+    try:
+        with open(path) as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith('#') and '=' in line:
+                    key, _, value = line.partition('=')
+                    values[key.strip()] = value.strip()
+    except OSError:
+        pass
+    return values
+
+
+def _docker_exec(container, script, timeout=60, detach=False):
+    cmd = ['docker', 'exec'] + (['-d'] if detach else []) + [container, 'bash', '-c', script]
+    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          universal_newlines=True, timeout=timeout)
+
+
+def reshape_links(profile):
+    """Reshape the host-side TCLinks and those of every running mn.* container."""
+    params = PROFILE_LINK_PRESETS[profile]
+    targets = [(None, 'host')]
+    cache = ContainerCache()
+    cache.refresh()
+    for cname in cache.names():
+        pid = cache.pid(cname)
+        if pid:
+            targets.append((pid, cname))
+    changed, failed = 0, []
+    for pid, label in targets:
+        try:
+            devs, bad = reshape_tclinks(pid, params['bw'], params['delay'], params['loss'])
+        except (OSError, subprocess.SubprocessError) as e:
+            failed.append(f'{label} ({e})')
+            continue
+        changed += len(devs) - len(bad)
+        failed += [f'{label}:{dev}' for dev in bad]
+    detail = f"{changed} links -> bw={params['bw']}Mbit delay={params['delay']} loss={params['loss']}%"
+    if failed:
+        detail += f"; failed: {', '.join(failed)}"
+    return not failed, detail
+
+
+def _http_responds(url, timeout=2):
+    try:
+        urllib.request.urlopen(url, timeout=timeout)
+        return True
+    except urllib.error.HTTPError:
+        # any HTTP response means the service is up
+        return True
+    except (OSError, ValueError):
+        return False
+
+
+def swap_tb_config(config_file, container='mn.tb', url='http://localhost:8080/api/status', timeout=600):
+    src = os.path.join(REPO_ROOT, 'config', config_file)
+    if not os.path.exists(src):
+        return False, f'config/{config_file} not found'
+    if os.path.exists(TB_RUNTIME_CONFIG) and filecmp.cmp(src, TB_RUNTIME_CONFIG, shallow=False):
+        return None, f'{config_file} already active'
+    # copyfile rewrites the existing file, keeping the inode the container has mounted
+    shutil.copyfile(src, TB_RUNTIME_CONFIG)
+    _docker_exec(container, 'pkill -f thingsboard.jar; for i in $(seq 1 30); do '
+                            'pgrep -f thingsboard.jar >/dev/null || exit 0; sleep 1; done; '
+                            'pkill -9 -f thingsboard.jar', timeout=60)
+    started = time.time()
+    _docker_exec(container, TB_START_CMD, detach=True)
+    # give the old JVM's listener time to go away before probing
+    time.sleep(5)
+    while time.time() - started < timeout:
+        if _http_responds(url):
+            return True, f'{config_file} active, ThingsBoard up after {time.time() - started:.0f}s'
+        time.sleep(3)
+    return False, f'ThingsBoard did not answer {url} within {timeout}s'
+
+
+def reset_influx(url, org, bucket, token):
+    stop = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+    body = json.dumps({'start': '1970-01-01T00:00:00Z', 'stop': stop}).encode()
+    req = urllib.request.Request(
+        f'{url}/api/v2/delete?org={quote(org)}&bucket={quote(bucket)}',
+        data=body, method='POST',
+        headers={'Authorization': f'Token {token}', 'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(req, timeout=120) as resp:
+            return resp.status == 204, f'bucket {bucket} emptied'
+    except urllib.error.HTTPError as e:
+        return False, f'delete on {bucket} returned {e.code}: {e.read()[:200]!r}'
+    except OSError as e:
+        return False, f'{url} unreachable: {e}'
+
+
+def reset_digital_twins(container='mn.middts', timeout=600):
+    p = _docker_exec(container, 'cd /middleware-dt && python manage.py reset_digital_twins --force',
+                     timeout=timeout)
+    tail = ' | '.join(p.stdout.strip().splitlines()[-2:])
+    return p.returncode == 0, tail
+
+
+def main():
+    p = argparse.ArgumentParser(description='Reset a running topology for the next scenario')
+    p.add_argument('--profile', required=True)
+    p.add_argument('--raw', action='store_true')
+    p.add_argument('--m2s-perf', action='store_true')
+    p.add_argument('--tb-timeout', type=int, default=600)
+    args = p.parse_args()
+
+    profile = resolve_profile(args.profile)
+    if profile is None:
+        print(f'[warm] unknown profile {args.profile!r}', file=sys.stderr)
+        return 2
+    env = read_repo_env()
+    influx_url = 'http://{}:{}'.format(
+        os.environ.get('INFLUXDB_HOST') or os.environ.get('INFLUX_HOST') or 'localhost',
+        os.environ.get('INFLUXDB_PORT') or os.environ.get('INFLUX_PORT') or '8086')
+    influx_org = env.get('INFLUXDB_ORG') or env.get('INFLUXDB_ORGANIZATION') or 'org'
+    influx_bucket = env.get('INFLUXDB_BUCKET') or 'iot_data'
+    influx_token = env.get('INFLUXDB_TOKEN') or 'token'
+
+    steps = [
+        ('links', lambda: reshape_links(profile)),
+        ('tb_config', lambda: swap_tb_config(tb_config_name(profile, args.raw, args.m2s_perf),
+                                             timeout=args.tb_timeout)),
+        ('influx', lambda: reset_influx(influx_url, influx_org, influx_bucket, influx_token)),
+        ('digital_twins', reset_digital_twins),
+    ]
+    failed = 0
+    for name, step in steps:
+        t0 = time.time()
+        try:
+            ok, detail = step()
+        except (OSError, subprocess.SubprocessError) as e:
+            ok, detail = False, str(e)
+        status = 'skipped' if ok is None else ('ok' if ok else 'failed')
+        failed += ok is False
+        print(f'[warm] {name} {status} ({time.time() - t0:.1f}s): {detail}', flush=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())